@@ -0,0 +1,109 @@
+"""
+audioop Benchmark
+Compares the NumPy audioop in src.audio_compat with the C module on 16 kHz streams
+
+Run from the repository root on a Python that still ships audioop (3.12 or older):
+
+    python -m benchmarks.audioop_bench --chunk 1024 --seconds 10
+
+The NumPy version is not at least as fast as C on every stream. On 1 s chunks
+most operations match or beat C (u-law/A-law encoding by about 6x), but
+u-law/A-law decoding runs at about 0.5x even with the two-bytes-per-lookup
+tables. On 20-64 ms chunks (320-1024 samples) C is 2-10x faster: NumPy's fixed
+cost of a few microseconds per call outweighs the work on so few samples.
+Every operation still runs thousands of times faster than real time there.
+"""
+
+import argparse
+import json
+import sys
+import timeit
+import warnings
+
+import numpy as np
+
+from src import audio_compat
+
+SAMPLE_RATE = 16000
+
+
+def make_stream(seconds: float, width: int = 2, channels: int = 1) -> bytes:
+    """Speech-like test audio: a few tones plus noise at a moderate level."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.2 * np.sin(2 * np.pi * 1250 * t) + 0.05 * rng.standard_normal(len(t))
+    samples = np.clip(signal * (1 << (8 * width - 1)), -(1 << (8 * width - 1)), (1 << (8 * width - 1)) - 1)
+    samples = np.repeat(samples[:, None], channels, axis=1).reshape(-1)
+    return samples.astype(f"<i{width}").tobytes()
+
+
+def cases(width: int):
+    """(name, callable taking the audioop module and one chunk pair) for every benchmarked operation."""
+    return [
+        ("rms", lambda m, c, s: m.rms(c, width)),
+        ("max", lambda m, c, s: m.max(c, width)),
+        ("avg", lambda m, c, s: m.avg(c, width)),
+        ("mul", lambda m, c, s: m.mul(c, width, 0.8)),
+        ("add", lambda m, c, s: m.add(c, c, width)),
+        ("bias", lambda m, c, s: m.bias(c, width, 100)),
+        ("tomono", lambda m, c, s: m.tomono(s, width, 0.5, 0.5)),
+        ("lin2lin", lambda m, c, s: m.lin2lin(c, width, 1)),
+        ("ratecv", lambda m, c, s: m.ratecv(c, width, 1, SAMPLE_RATE, 8000, None)),
+        ("lin2ulaw", lambda m, c, s: m.lin2ulaw(c, width)),
+        ("ulaw2lin", lambda m, c, s: m.ulaw2lin(c[:len(c) // width], width)),
+        ("lin2alaw", lambda m, c, s: m.lin2alaw(c, width)),
+        ("alaw2lin", lambda m, c, s: m.alaw2lin(c[:len(c) // width], width)),
+    ]
+
+
+def time_stream(module, func, chunks, repeat: int) -> float:
+    """Best-of-`repeat` seconds to run func over every chunk of the stream."""
+    def run():
+        for chunk, stereo_chunk in chunks:
+            func(module, chunk, stereo_chunk)
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NumPy audioop against the C module.")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of the 16 kHz test stream")
+    parser.add_argument("--chunk", type=int, nargs="+", default=[1024, SAMPLE_RATE], help="Samples per call")
+    parser.add_argument("--width", type=int, default=2, help="Sample width in bytes")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (the best one is kept)")
+    args = parser.parse_args()
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            import audioop as c_audioop
+    except ImportError:
+        c_audioop = None
+    if c_audioop is not None and c_audioop.rms is audio_compat.rms:
+        c_audioop = None  # only the NumPy stand-in is available
+    if c_audioop is None:
+        print("The C audioop module is not available on this Python; timing the NumPy version only", file=sys.stderr)
+
+    stream = make_stream(args.seconds, args.width)
+    stereo = make_stream(args.seconds, args.width, channels=2)
+    results = []
+    for chunk_samples in args.chunk:
+        size = chunk_samples * args.width
+        chunks = [(stream[i:i + size], stereo[2 * i:2 * i + 2 * size]) for i in range(0, len(stream) - size + 1, size)]
+        for name, func in cases(args.width):
+            numpy_seconds = time_stream(audio_compat, func, chunks, args.repeat)
+            result = {
+                "op": name,
+                "chunk_samples": chunk_samples,
+                "numpy_realtime_factor": round(args.seconds / numpy_seconds, 1),
+            }
+            if c_audioop is not None:
+                c_seconds = time_stream(c_audioop, func, chunks, args.repeat)
+                result["c_realtime_factor"] = round(args.seconds / c_seconds, 1)
+                result["speedup"] = round(c_seconds / numpy_seconds, 2)
+            results.append(result)
+
+    print(json.dumps({"sample_rate": SAMPLE_RATE, "width": args.width, "seconds": args.seconds, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Load Benchmark
+Drives /interact, /chat, /stt and /tts with concurrent traffic and reports throughput and latency percentiles
+
+Both apps run in-process behind httpx's ASGI transport, in MOCK_MODE, so the
+benchmark needs no LLM, STT or TTS service. Give --interact-url / --api-url to
+load running servers over HTTP instead. Requests replay the Kaelen scenarios
+from test_client.py, mixed by --mix weights. With --concurrency each client
+sends its next request as soon as the previous one returns (closed loop); with
+--rate requests arrive at that Poisson rate whatever the response times (open
+loop), and latency is measured from each request's scheduled arrival.
+
+Run from the repository root:
+
+    python -m benchmarks.load_bench --mix interact=4,chat=2,stt=1,tts=1 --concurrency 32 --duration 10
+    python -m benchmarks.load_bench --mix interact=1 --rate 500 --mock-latency 0.2 --no-cache
+    python -m benchmarks.load_bench --interact-url http://localhost:8000 --mix interact=1 --output load.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from test_client import TEST_CASES
+
+ENDPOINTS = ("interact", "chat", "stt", "tts")
+
+# Which app serves each endpoint: src.backend_server ("backend") or src.main ("api")
+ENDPOINT_APPS = {"interact": "backend", "chat": "api", "stt": "api", "tts": "api"}
+
+STT_SAMPLE_RATE = 16000
+
+# (path, httpx request keyword arguments)
+Call = Tuple[str, Dict[str, Any]]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'interact=4,chat=1' -> {'interact': 4.0, 'chat': 1.0}; a bare name has weight 1."""
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r} (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("The mix needs at least one endpoint with a positive weight")
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def speech_pcm(seconds: float) -> bytes:
+    """16-bit mono test audio: a voiced tone with a little noise."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * STT_SAMPLE_RATE)) / STT_SAMPLE_RATE
+    signal = 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 3 * t)) / 2 + 0.02 * rng.standard_normal(len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def scenario_calls(stt_seconds: float) -> Dict[str, List[Call]]:
+    """The requests each endpoint is sent, built from the Kaelen test cases."""
+    npc_lines = sorted({
+        line.split(": ", 1)[1]
+        for case in TEST_CASES
+        for line in case["conversation_history"]
+        if line.startswith("Kaelen: ")
+    })
+    audio = speech_pcm(stt_seconds)
+    return {
+        "interact": [
+            ("/interact", {"json": {
+                "npc_id": case["npc_id"],
+                "player_input": case["player_input"],
+                "conversation_history": case["conversation_history"],
+                "environment": {
+                    "nearby_objects": case["nearby_objects"],
+                    "available_actions": case["available_actions"],
+                },
+            }})
+            for case in TEST_CASES
+        ],
+        "chat": [
+            ("/chat", {"json": {"text": case["player_input"], "context": {"npc_name": "Kaelen", "location": "forge"}}})
+            for case in TEST_CASES
+        ],
+        "stt": [
+            ("/stt", {
+                "content": audio,
+                "headers": {"content-type": "audio/pcm"},
+                "params": {"rate": STT_SAMPLE_RATE},
+            })
+        ],
+        "tts": [("/tts", {"json": {"text": line}}) for line in npc_lines],
+    }
+
+
+def fallback_checks() -> Dict[str, Callable[[Dict[str, Any]], bool]]:
+    """Per endpoint, whether a successful response body is the server's fallback instead of a real answer."""
+    from src.ai_response_model import FALLBACK_REPLY
+    from src.backend_server import fallback_response
+
+    fallback_dialogue = fallback_response().dialogue
+    return {
+        "interact": lambda body: body.get("dialogue") == fallback_dialogue,
+        "chat": lambda body: body.get("reply") == FALLBACK_REPLY,
+        "stt": lambda body: not body.get("text"),
+        "tts": lambda body: False,
+    }
+
+
+class EndpointStats:
+    """Latencies and outcomes of one endpoint's requests."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.fallbacks = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        requests = self.requests
+        report = {
+            "requests": requests,
+            "throughput": round(requests / seconds, 2) if seconds else 0.0,
+            "error_rate": round(sum(self.errors.values()) / requests, 4) if requests else 0.0,
+            "fallback_rate": round(self.fallbacks / len(self.latencies), 4) if self.latencies else 0.0,
+            "errors": dict(sorted(self.errors.items())),
+        }
+        if self.latencies:
+            latencies = np.array(self.latencies) * 1000
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            report["latency_ms"] = {
+                "mean": round(float(latencies.mean()), 2),
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "p99": round(float(p99), 2),
+                "max": round(float(latencies.max()), 2),
+            }
+        return report
+
+
+class LoadRunner:
+    """Sends the scenario mix to the apps' clients and records each request's outcome."""
+
+    def __init__(self, clients: Dict[str, httpx.AsyncClient], mix: Dict[str, float], calls: Dict[str, List[Call]],
+                 is_fallback: Dict[str, Callable[[Dict[str, Any]], bool]], seed: int = 0):
+        self.clients = clients
+        self.endpoints = list(mix)
+        self.weights = [mix[name] for name in self.endpoints]
+        self.calls = calls
+        self.is_fallback = is_fallback
+        self.rng = random.Random(seed)
+        self.stats = {name: EndpointStats() for name in self.endpoints}
+
+    def next_call(self) -> Tuple[str, Call]:
+        endpoint = self.rng.choices(self.endpoints, self.weights)[0]
+        return endpoint, self.rng.choice(self.calls[endpoint])
+
+    async def send(self, endpoint: str, call: Call, started_at: Optional[float] = None, record: bool = True):
+        """One request; latency counts from `started_at` (the scheduled arrival) when given."""
+        path, kwargs = call
+        if started_at is None:
+            started_at = time.perf_counter()
+        try:
+            response = await self.clients[ENDPOINT_APPS[endpoint]].post(path, **kwargs)
+            latency = time.perf_counter() - started_at
+        except httpx.HTTPError as e:
+            if record:
+                self.stats[endpoint].error(type(e).__name__)
+            return
+        if not record:
+            return
+        stats = self.stats[endpoint]
+        if response.status_code >= 400:
+            stats.error(f"HTTP {response.status_code}")
+            return
+        stats.latencies.append(latency)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if self.is_fallback[endpoint](body):
+            stats.fallbacks += 1
+
+    async def warm_up(self):
+        """One unrecorded request per scenario, so model loading and worker start-up are not measured."""
+        for endpoint in self.endpoints:
+            for call in self.calls[endpoint]:
+                await self.send(endpoint, call, record=False)
+
+    async def closed_loop(self, concurrency: int, duration: float, max_requests: Optional[int]):
+        deadline = time.perf_counter() + duration
+        remaining = [max_requests if max_requests is not None else float("inf")]
+
+        async def client():
+            while time.perf_counter() < deadline and remaining[0] > 0:
+                remaining[0] -= 1
+                await self.send(*self.next_call())
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+    async def open_loop(self, rate: float, duration: float, max_requests: Optional[int]):
+        started_at = time.perf_counter()
+        arrival = started_at
+        tasks = []
+        while max_requests is None or len(tasks) < max_requests:
+            arrival += self.rng.expovariate(rate)
+            if arrival - started_at >= duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(self.send(*self.next_call(), started_at=arrival)))
+        await asyncio.gather(*tasks)
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        total = EndpointStats()
+        for stats in self.stats.values():
+            total.latencies.extend(stats.latencies)
+            total.fallbacks += stats.fallbacks
+            for kind, count in stats.errors.items():
+                total.errors[kind] = total.errors.get(kind, 0) + count
+        return {
+            "seconds": round(seconds, 3),
+            "total": total.report(seconds),
+            "endpoints": {name: stats.report(seconds) for name, stats in self.stats.items()},
+        }
+
+
+def configure_in_process(args: argparse.Namespace):
+    """Settings for the in-process apps; must run before anything imports src.config."""
+    os.environ["MOCK_MODE"] = "TRUE"
+    os.environ["NPC_MOCK_LATENCY"] = str(args.mock_latency)
+    if args.no_cache:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "FALSE"
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    urls = {"backend": args.interact_url, "api": args.api_url}
+    needed = {ENDPOINT_APPS[name] for name in args.mix}
+    if any(urls[app] is None for app in needed):
+        configure_in_process(args)
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with contextlib.AsyncExitStack() as stack:
+        clients = {}
+        stack_quiet = False
+        for app_name in sorted(needed):
+            if urls[app_name] is not None:
+                clients[app_name] = await stack.enter_async_context(
+                    httpx.AsyncClient(base_url=urls[app_name], timeout=timeout, limits=limits)
+                )
+                continue
+            if not stack_quiet:
+                # The mock LLM and the servers print per request; keep stdout for the report
+                stack.enter_context(contextlib.redirect_stdout(open(os.devnull, "w")))
+                stack_quiet = True
+            if app_name == "backend":
+                from src.backend_server import app
+            else:
+                from src.main import app
+            # Runs the apps' startup and shutdown hooks, which the ASGI transport skips
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            clients[app_name] = await stack.enter_async_context(
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=f"http://{app_name}", timeout=timeout)
+            )
+
+        runner = LoadRunner(clients, args.mix, scenario_calls(args.stt_seconds), fallback_checks(), seed=args.seed)
+        if args.warmup:
+            await runner.warm_up()
+        started_at = time.perf_counter()
+        if args.rate:
+            await runner.open_loop(args.rate, args.duration, args.requests)
+        else:
+            await runner.closed_loop(args.concurrency, args.duration, args.requests)
+        seconds = time.perf_counter() - started_at
+
+    return {
+        "config": {
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate,
+            "concurrency": None if args.rate else args.concurrency,
+            "duration": args.duration,
+            "max_requests": args.requests,
+            "mix": args.mix,
+            "targets": {app_name: urls[app_name] or "in-process" for app_name in sorted(needed)},
+            "mock_latency": args.mock_latency if any(urls[app] is None for app in needed) else None,
+            "response_cache": not args.no_cache,
+            "seed": args.seed,
+        },
+        **runner.report(seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load /interact, /chat, /stt and /tts and report latency percentiles.")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("interact,chat,stt,tts"),
+                        help="Endpoint weights, e.g. interact=4,chat=2,stt=1,tts=1")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients in the closed loop")
+    parser.add_argument("--rate", type=float, default=None, help="Arrivals per second; switches to the open loop")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load for")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds before a request counts as an error")
+    parser.add_argument("--mock-latency", type=float, default=float(os.getenv("NPC_MOCK_LATENCY", "0")),
+                        help="Simulated LLM seconds per call for the in-process /interact (NPC_MOCK_LATENCY)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the in-process /interact response cache")
+    parser.add_argument("--stt-seconds", type=float, default=2.0, help="Length of the audio sent to /stt")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="Measure the first requests too")
+    parser.add_argument("--interact-url", default=None, help="Running backend server; default runs it in-process")
+    parser.add_argument("--api-url", default=None, help="Running /chat, /stt and /tts server; default runs it in-process")
+    parser.add_argument("--seed", type=int, default=0, help="Seeds the scenario choice and the arrival times")
+    parser.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if report["total"]["requests"] == 0:
+        print("No requests completed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,7 @@ def main():
         # Initialize AI NPC
         print("Initializing AI NPC system...")
         ai_npc = AINPC(language="en-US")
+        ai_npc.wait_until_ready()
         
         print("System ready!\n")
         
@@ -1,14 +1,21 @@
 """
 __init__.py for src package
+
+The exported classes are imported on first access, so importing the package
+(or a single submodule, as the servers and STT worker processes do) does not
+load the speech, TTS and LLM stacks.
 """
 
-# Import audio compatibility first
-from src import audio_compat
+import importlib
+
+from src.startup import STARTUP
 
-from src.speech_recognizer import SpeechRecognizer
-from src.text_generator import TextGenerator
-from src.speech_synthesizer import SpeechSynthesizer
-from src.ai_npc import AINPC
+_EXPORTS = {
+    'SpeechRecognizer': 'src.speech_recognizer',
+    'TextGenerator': 'src.text_generator',
+    'SpeechSynthesizer': 'src.speech_synthesizer',
+    'AINPC': 'src.ai_npc',
+}
 
 __all__ = [
     'SpeechRecognizer',
@@ -16,3 +23,17 @@ __all__ = [
     'SpeechSynthesizer',
     'AINPC'
 ]
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module 'src' has no attribute {name!r}")
+    with STARTUP.phase(f"import {module_name}"):
+        value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
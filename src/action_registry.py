@@ -0,0 +1,189 @@
+"""
+Action Registry Module
+Parses action signature strings once and validates the actions an NPC chooses
+"""
+
+import ast
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+
+from src.config import ACTION_REGISTRY_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Always allowed, so an NPC can decline to act even if the game did not list it
+IDLE_ACTION = "idle"
+
+_TYPE_NAMES = {"str": str, "int": int, "float": float, "bool": bool}
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+
+class ActionCall(BaseModel):
+    """One action the NPC performs, as in backend.json."""
+    action_type: str
+    parameters: Dict[str, Any] = Field(default_factory=dict)
+
+
+@dataclass
+class ActionParameter:
+    """A parameter of an action: its type and, if the signature fixed one, the values it may take."""
+    name: str
+    type: type
+    allowed: FrozenSet[Any] = frozenset()  # empty means any value of `type`
+
+    def check(self, value: Any) -> Optional[str]:
+        """Returns why `value` is not acceptable, or None if it is."""
+        if self.type is float:
+            valid_type = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif self.type is int:
+            valid_type = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid_type = isinstance(value, self.type)
+        if not valid_type:
+            return f"{self.name} must be {self.type.__name__}, got {type(value).__name__}"
+        if self.allowed and value not in self.allowed:
+            return f"{self.name}={value!r} is not one of {sorted(self.allowed, key=repr)}"
+        return None
+
+
+@dataclass
+class ActionSpec:
+    """Everything the game allows for one action name, merged across its signatures."""
+    name: str
+    parameters: Dict[str, ActionParameter] = field(default_factory=dict)
+
+
+def parse_signature(signature: str) -> Tuple[str, Dict[str, ActionParameter]]:
+    """
+    Parses one signature such as "give_item(item_name='Magic_Sword')", "idle" or
+    "offer_trade(item_to_give=str, quantity=int)". A literal fixes the value;
+    a type name only fixes the type.
+
+    Raises:
+        ValueError: If the signature is not a name or a call with keyword arguments
+    """
+    try:
+        node = ast.parse(signature.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid action signature {signature!r}: {e.msg}") from e
+
+    if isinstance(node, ast.Name):
+        return node.id, {}
+    if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Name) or node.args:
+        raise ValueError(f"Invalid action signature {signature!r}: expected name(param=value, ...)")
+
+    parameters = {}
+    for keyword in node.keywords:
+        value = keyword.value
+        if isinstance(value, ast.Name) and value.id in _TYPE_NAMES:
+            parameters[keyword.arg] = ActionParameter(keyword.arg, _TYPE_NAMES[value.id])
+        elif isinstance(value, ast.Constant) and type(value.value) in _TYPE_NAMES.values():
+            parameters[keyword.arg] = ActionParameter(keyword.arg, type(value.value), frozenset([value.value]))
+        else:
+            raise ValueError(f"Invalid action signature {signature!r}: {keyword.arg} must be a literal or a type name")
+    return node.func.id, parameters
+
+
+class ActionRegistry:
+    """
+    Typed index of the actions available in one situation.
+
+    Action names are matched case-insensitively (the model may answer
+    "GIVE_ITEM" for "give_item"). Several signatures for the same action are
+    merged, so "give_item(item_name='Sword')" and "give_item(item_name='Shield')"
+    allow either item.
+    """
+
+    def __init__(self, signatures: Iterable[str]):
+        self.specs: Dict[str, ActionSpec] = {IDLE_ACTION: ActionSpec(IDLE_ACTION)}
+        self.invalid_signatures: List[str] = []
+        self._schema: Optional[Dict[str, Any]] = None
+        for signature in signatures:
+            try:
+                name, parameters = parse_signature(signature)
+            except ValueError as e:
+                logger.warning(str(e))
+                self.invalid_signatures.append(signature)
+                continue
+            spec = self.specs.setdefault(name.lower(), ActionSpec(name))
+            for parameter in parameters.values():
+                known = spec.parameters.get(parameter.name)
+                if known is None:
+                    spec.parameters[parameter.name] = parameter
+                elif known.allowed and parameter.allowed:
+                    known.allowed = known.allowed | parameter.allowed
+                else:
+                    # One of the signatures accepts any value
+                    known.allowed = frozenset()
+
+    def __contains__(self, action_type: str) -> bool:
+        return action_type.lower() in self.specs
+
+    def json_schema(self) -> Dict[str, Any]:
+        """JSON schema for one entry of an `actions` list, allowing exactly the registered actions."""
+        if self._schema is None:
+            variants = []
+            for spec in self.specs.values():
+                properties = {}
+                for name, parameter in spec.parameters.items():
+                    prop = {"type": _JSON_TYPES[parameter.type]}
+                    if parameter.allowed:
+                        prop["enum"] = sorted(parameter.allowed, key=repr)
+                    properties[name] = prop
+                variants.append({
+                    "type": "object",
+                    "properties": {
+                        "action_type": {"const": spec.name},
+                        "parameters": {
+                            "type": "object",
+                            "properties": properties,
+                            "required": list(properties),
+                            "additionalProperties": False,
+                        },
+                    },
+                    "required": ["action_type", "parameters"],
+                })
+            self._schema = {"anyOf": variants}
+        return self._schema
+
+    def validate(self, actions: Sequence[ActionCall]) -> Tuple[List[ActionCall], List[str]]:
+        """
+        Checks each action against the registry in one pass.
+
+        Returns:
+            (valid actions with canonical names, one reason per rejected action)
+        """
+        valid = []
+        rejected = []
+        for action in actions:
+            spec = self.specs.get(action.action_type.lower())
+            if spec is None:
+                rejected.append(f"{action.action_type}: not an available action")
+                continue
+            problems = [f"unexpected parameter {name}" for name in action.parameters if name not in spec.parameters]
+            for name, parameter in spec.parameters.items():
+                if name not in action.parameters:
+                    problems.append(f"missing parameter {name}")
+                else:
+                    problem = parameter.check(action.parameters[name])
+                    if problem:
+                        problems.append(problem)
+            if problems:
+                rejected.append(f"{action.action_type}: {'; '.join(problems)}")
+            else:
+                valid.append(ActionCall(action_type=spec.name, parameters=action.parameters))
+        return valid, rejected
+
+
+@lru_cache(maxsize=ACTION_REGISTRY_CACHE_SIZE)
+def _registry_for(signatures: Tuple[str, ...]) -> ActionRegistry:
+    return ActionRegistry(signatures)
+
+
+def get_action_registry(available_actions: Iterable[str]) -> ActionRegistry:
+    """Registry for a set of signatures, parsed once and shared by every request with the same set."""
+    return _registry_for(tuple(sorted(set(available_actions))))
@@ -4,10 +4,13 @@ Orchestrates speech recognition, text generation, and speech synthesis
 """
 
 import logging
-from typing import Optional
-from src.speech_recognizer import SpeechRecognizer
-from src.text_generator import TextGenerator
-from src.speech_synthesizer import SpeechSynthesizer
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+from src.config import OLLAMA_STREAM, SPEECH_CONTINUOUS
+from src.metrics import TIME_TO_FIRST_AUDIO, TURN_SECONDS
+from src.startup import STARTUP
 
 # Configure logging
 logging.basicConfig(
@@ -18,24 +21,102 @@ logger = logging.getLogger(__name__)
 
 
 class AINPC:
-    """Main AI NPC system that combines all modules."""
+    """
+    Main AI NPC system that combines all modules.
+
+    The recognizer, text generator and synthesizer are imported and
+    initialized in parallel on background threads, so the constructor returns
+    at once. `ready` holds a future per component; using a component waits
+    for it, and `wait_until_ready()` waits for all of them.
+    """
     
-    def __init__(self, language: str = "en-US"):
+    def __init__(self, language: str = "en-US", stream_responses: bool = OLLAMA_STREAM,
+                 continuous_listening: bool = SPEECH_CONTINUOUS, model_tier: Optional[str] = None):
         """
         Initialize the AI NPC system.
         
         Args:
             language: Language for speech recognition
+            stream_responses: Speak each sentence as soon as it is generated
+            continuous_listening: Keep the microphone open during a conversation,
+                                  so the next phrase is captured while this one is answered
+            model_tier: Ollama model tier for this NPC (see OLLAMA_ENDPOINTS), e.g. a small one for minor characters
         """
-        try:
-            self.speech_recognizer = SpeechRecognizer(language=language)
-            self.text_generator = TextGenerator()
-            self.speech_synthesizer = SpeechSynthesizer()
-            self.is_running = False
-            logger.info("AI NPC system initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize AI NPC: {e}")
-            raise
+        self.stream_responses = stream_responses
+        self.continuous_listening = continuous_listening
+        self.is_running = False
+        self._generation_cancel = None
+
+        startup = ThreadPoolExecutor(max_workers=3, thread_name_prefix="npc-init")
+        self.ready: Dict[str, Future] = {
+            "speech_recognizer": startup.submit(self._init_speech_recognizer, language),
+            "text_generator": startup.submit(self._init_text_generator, model_tier),
+            "speech_synthesizer": startup.submit(self._init_speech_synthesizer),
+        }
+        startup.shutdown(wait=False)
+        logger.info("AI NPC system initializing in the background")
+
+    def _init_speech_recognizer(self, language: str):
+        with STARTUP.phase("import src.speech_recognizer"):
+            from src.speech_recognizer import SpeechRecognizer
+        with STARTUP.phase("init speech_recognizer"):
+            speech_recognizer = SpeechRecognizer(language=language)
+        # Stop talking as soon as the VAD hears the player, not after their phrase is recognized
+        speech_recognizer.on_speech_start = self._on_speech_start
+        return speech_recognizer
+
+    def _init_text_generator(self, model_tier: Optional[str]):
+        with STARTUP.phase("import src.text_generator"):
+            from src.text_generator import TextGenerator
+        # Ollama health checks run on the router's background thread, not here
+        with STARTUP.phase("init text_generator"):
+            return TextGenerator(tier=model_tier)
+
+    def _init_speech_synthesizer(self):
+        with STARTUP.phase("import src.speech_synthesizer"):
+            from src.speech_synthesizer import SpeechSynthesizer
+        with STARTUP.phase("init speech_synthesizer"):
+            return SpeechSynthesizer()
+
+    @property
+    def speech_recognizer(self):
+        return self.ready["speech_recognizer"].result()
+
+    @property
+    def text_generator(self):
+        return self.ready["text_generator"].result()
+
+    @property
+    def speech_synthesizer(self):
+        return self.ready["speech_synthesizer"].result()
+
+    def wait_until_ready(self, timeout: Optional[float] = None):
+        """
+        Wait for every component to finish initializing, then log the startup time report.
+
+        Args:
+            timeout: Seconds to wait in total (None waits as long as it takes)
+
+        Raises:
+            TimeoutError: If some components are still initializing after `timeout`;
+                          the message names them
+            The first component's initialization error, if any failed
+        """
+        _, not_done = wait(self.ready.values(), timeout)
+        logger.info(STARTUP.format())
+        if not_done:
+            pending = [name for name, future in self.ready.items() if future in not_done]
+            raise TimeoutError(f"AI NPC not ready after {timeout}s, still initializing: {', '.join(pending)}")
+        for name, future in self.ready.items():
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Failed to initialize AI NPC ({name}): {error}")
+                raise error
+        logger.info("AI NPC system initialized successfully")
+
+    def startup_report(self) -> Dict[str, Any]:
+        """Seconds spent per import and init phase (see src.startup)."""
+        return STARTUP.report()
     
     def process_speech_to_response(self) -> Optional[str]:
         """
@@ -50,13 +131,34 @@ class AINPC:
             if not user_input:
                 return None
             
-            # Step 2: Generate AI response
-            response = self.text_generator.generate_response(user_input)
-            if not response:
-                return None
+            # The player talked over the NPC: drop the rest of the previous reply
+            if self.speech_synthesizer.is_speaking:
+                self.barge_in()
+            
+            # The player's wait starts when they stop talking, so recognition counts towards it
+            turn_started_at = self.speech_recognizer.phrase_ended_at or time.perf_counter()
+            on_first_audio = lambda: TIME_TO_FIRST_AUDIO.observe(time.perf_counter() - turn_started_at)
+            
+            # Steps 2 and 3 overlap in streaming mode
+            if self.stream_responses:
+                response, spoken = self._stream_and_speak(user_input, on_first_audio)
+            else:
+                # Step 2: Generate AI response
+                response = self.text_generator.generate_response(user_input)
+                if not response:
+                    return None
+                
+                # Step 3: Speak the response (played on the synthesizer's worker thread)
+                spoken = self.speech_synthesizer.speak_async(response, on_start=on_first_audio)
+            if spoken is not None:
+                # The turn ends when its last sentence has played; interrupted or failed turns are not recorded
+                spoken.add_done_callback(
+                    lambda future: TURN_SECONDS.observe(time.perf_counter() - turn_started_at) if future.result() else None
+                )
             
-            # Step 3: Speak the response
-            self.speech_synthesizer.speak(response)
+            # With continuous listening the next turn is captured while the NPC is still talking
+            if not self.continuous_listening:
+                self.speech_synthesizer.wait_until_done()
             
             return response
             
@@ -64,6 +166,40 @@ class AINPC:
             logger.error(f"Error in speech-to-response pipeline: {e}")
             return None
     
+    def _stream_and_speak(self, user_input: str,
+                          on_first_audio: Optional[Callable[[], None]] = None) -> Tuple[Optional[str], Optional[Future]]:
+        """
+        Generate a streamed response and queue each sentence for speech as soon as it is complete.
+        
+        Playback runs on the synthesizer's worker thread, so the next sentence is
+        generated while the current one is being spoken.
+        
+        Args:
+            user_input: Recognized user text
+            on_first_audio: Called when the first sentence starts playing
+            
+        Returns:
+            The response text (None if nothing was generated) and the future of its last sentence's playback
+        """
+        self._generation_cancel = threading.Event()
+        sentences = []
+        spoken = None
+        for sentence in self.text_generator.generate_response_stream(user_input, cancel_event=self._generation_cancel):
+            spoken = self.speech_synthesizer.speak_async(sentence, on_start=None if sentences else on_first_audio)
+            sentences.append(sentence)
+        return " ".join(sentences) or None, spoken
+    
+    def barge_in(self):
+        """Stop the NPC mid-reply: cancel any streaming generation and cut off queued speech."""
+        if self._generation_cancel is not None:
+            self._generation_cancel.set()
+        self.speech_synthesizer.interrupt()
+    
+    def _on_speech_start(self):
+        if self.speech_synthesizer.is_speaking:
+            logger.info("Player started talking, interrupting the NPC")
+            self.barge_in()
+    
     def start_conversation(self, max_exchanges: Optional[int] = None):
         """
         Start an interactive conversation loop.
@@ -80,6 +216,9 @@ class AINPC:
         print("="*50 + "\n")
         
         try:
+            if self.continuous_listening:
+                self.speech_recognizer.start_stream()
+            
             while self.is_running:
                 if max_exchanges and exchange_count >= max_exchanges:
                     print("Maximum exchanges reached. Ending conversation.")
@@ -105,6 +244,11 @@ class AINPC:
     def stop(self):
         """Stop the AI NPC system."""
         self.is_running = False
-        self.text_generator.reset_conversation()
-        self.speech_synthesizer.stop()
+        wait(self.ready.values())
+        if not self.ready["speech_recognizer"].exception():
+            self.speech_recognizer.stop_stream()
+        if not self.ready["text_generator"].exception():
+            self.text_generator.reset_conversation()
+        if not self.ready["speech_synthesizer"].exception():
+            self.speech_synthesizer.stop()
         logger.info("AI NPC system stopped")
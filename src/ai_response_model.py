@@ -1,43 +1,109 @@
-from typing import Dict
-from .config import MOCK_MODE, OPENAI_API_KEY, MODEL_NAME
+import json
+from typing import Dict, Iterator
+from .config import MOCK_MODE, OPENAI_API_KEY, MODEL_NAME, OPENAI_BASE_URL, RESPONSE_CACHE_ENABLED
+from .http_transport import get_transport
+from .metrics import FALLBACKS, stage_timer
+from .response_cache import ResponseCache
 from .utils import ts
 
-# Optional: real API (won't run in MOCK_MODE)
-try:
-    from openai import OpenAI
-    _client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-except Exception:
-    _client = None
+# Repeated lines to the same NPC in the same context skip the API call
+_reply_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
 
 SYSTEM_PROMPT = (
     "You are an in-game NPC. Keep replies short (1-2 lines), "
     "context-aware, and friendly."
 )
 
-def generate_reply(user_text: str, npc_context: Dict) -> str:
-    if MOCK_MODE or not OPENAI_API_KEY or _client is None:
-        # Simple rule-based mock so demo always works
-        name = npc_context.get("npc_name", "NPC")
-        loc = npc_context.get("location", "village square")
-        if "hello" in user_text.lower():
-            return f"{name}: Hello, traveler! It's {ts()} at the {loc}."
-        if "quest" in user_text.lower():
-            return f"{name}: I have a small task—find 3 herbs near the river."
-        if "bye" in user_text.lower():
-            return f"{name}: Farewell! May your path be clear."
-        return f"{name}: I heard rumors about bandits near the old bridge."
-    # Real call (if keys present and MOCK_MODE=False)
+# Said instead of a reply when the API call fails
+FALLBACK_REPLY = "NPC: (whispers) The winds are quiet…"
+
+def _mock_reply(user_text: str, npc_context: Dict) -> str:
+    # Simple rule-based mock so demo always works
+    name = npc_context.get("npc_name", "NPC")
+    loc = npc_context.get("location", "village square")
+    if "hello" in user_text.lower():
+        return f"{name}: Hello, traveler! It's {ts()} at the {loc}."
+    if "quest" in user_text.lower():
+        return f"{name}: I have a small task—find 3 herbs near the river."
+    if "bye" in user_text.lower():
+        return f"{name}: Farewell! May your path be clear."
+    return f"{name}: I heard rumors about bandits near the old bridge."
+
+def _completion_request(user_text: str, npc_context: Dict, stream: bool) -> Dict:
     msg = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": f"Context:{npc_context}\nPlayer:{user_text}"},
     ]
+    return {
+        "url": f"{OPENAI_BASE_URL}/chat/completions",
+        "headers": {"Authorization": f"Bearer {OPENAI_API_KEY}"},
+        "json": {
+            "model": MODEL_NAME,
+            "messages": msg,
+            "temperature": 0.7,
+            "max_tokens": 80,
+            "stream": stream,
+        },
+        "stream": stream,
+    }
+
+@stage_timer("chat")
+def generate_reply(user_text: str, npc_context: Dict) -> str:
+    if MOCK_MODE or not OPENAI_API_KEY:
+        return _mock_reply(user_text, npc_context)
+    # Real call (if keys present and MOCK_MODE=False), over the shared keep-alive pool
+    npc_id = npc_context.get("npc_name", "NPC")
+    context_key = [json.dumps(npc_context, sort_keys=True, default=str)]
+    if _reply_cache is not None:
+        cached = _reply_cache.get(npc_id, user_text, context_key)
+        if cached is not None:
+            return cached
+    try:
+        resp = get_transport().post(**_completion_request(user_text, npc_context, stream=False))
+        resp.raise_for_status()
+        reply = resp.json()["choices"][0]["message"]["content"].strip()
+    except Exception:
+        FALLBACKS.inc(reason="llm_error")
+        return FALLBACK_REPLY
+    if _reply_cache is not None:
+        _reply_cache.put(npc_id, user_text, reply, context_key)
+    return reply
+
+def stream_reply(user_text: str, npc_context: Dict) -> Iterator[str]:
+    """Like generate_reply, but yields the reply in pieces as the API streams its tokens."""
+    if MOCK_MODE or not OPENAI_API_KEY:
+        yield _mock_reply(user_text, npc_context)
+        return
+    npc_id = npc_context.get("npc_name", "NPC")
+    context_key = [json.dumps(npc_context, sort_keys=True, default=str)]
+    if _reply_cache is not None:
+        cached = _reply_cache.get(npc_id, user_text, context_key)
+        if cached is not None:
+            yield cached
+            return
+    pieces = []
     try:
-        resp = _client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=msg,
-            temperature=0.7,
-            max_tokens=80,
-        )
-        return resp.choices[0].message.content.strip()
+        with get_transport().post(**_completion_request(user_text, npc_context, stream=True)) as resp:
+            resp.raise_for_status()
+            # Server-sent events: one `data: {chunk}` line per token, then `data: [DONE]`
+            for line in resp.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[len(b"data:"):].strip()
+                if data == b"[DONE]":
+                    break
+                piece = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if piece:
+                    pieces.append(piece)
+                    yield piece
     except Exception:
-        return "NPC: (whispers) The winds are quiet…"
+        FALLBACKS.inc(reason="llm_error")
+        if not pieces:
+            yield FALLBACK_REPLY
+        return
+    reply = "".join(pieces).strip()
+    if not reply:
+        FALLBACKS.inc(reason="llm_error")
+        yield FALLBACK_REPLY
+    elif _reply_cache is not None:
+        _reply_cache.put(npc_id, user_text, reply, context_key)
@@ -0,0 +1,268 @@
+"""
+Audio Cache Module
+Content-addressed on-disk cache of synthesized speech
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.audio_io import AudioBuffer
+from src.config import TTS_CACHE_DIR, TTS_CACHE_ENABLED, TTS_CACHE_MAX_MB
+from src.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_HIT = CACHE_LOOKUPS.labels(cache="tts", result="hit")
+_MISS = CACHE_LOOKUPS.labels(cache="tts", result="miss")
+
+
+def audio_key(text: str, voice: Optional[str], rate: Optional[float] = None, volume: Optional[float] = None) -> str:
+    """Content address of one rendering: the same text, voice, rate and volume always map to the same key."""
+    payload = json.dumps([text, voice, rate, volume], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Size-bounded LRU cache of rendered audio files.
+
+    Files are named by the hash of (text, voice, rate, volume) and fanned out
+    into 256 subdirectories. Reads are memory-mapped, so a hit is served from
+    the page cache without copying the file into the Python heap. Recency is
+    kept in the file modification times, so the LRU order survives restarts and
+    several processes can share one directory.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024)):
+        """
+        Initialize the cache and index any files already on disk.
+
+        Args:
+            directory: Cache directory (created if missing)
+            max_bytes: Total size allowed before least-recently-used files are deleted
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._files: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._files
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.wav")
+
+    def get(self, key: str) -> Optional[AudioBuffer]:
+        """
+        Look up rendered audio.
+
+        Returns:
+            A read-only memory-mapped view of the file, or None on a miss
+        """
+        with self._lock:
+            if key not in self._files:
+                self.misses += 1
+                _MISS.inc()
+                return None
+            self._files.move_to_end(key)
+            self.hits += 1
+            _HIT.inc()
+
+        path = self.path(key)
+        try:
+            os.utime(path)
+            with open(path, "rb") as f:
+                if not os.fstat(f.fileno()).st_size:
+                    return b""
+                # The mapping keeps its own handle, so the file can be closed (or evicted) while it is read
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except OSError as e:
+            logger.warning(f"Cached audio {key} is unreadable, dropping it: {e}")
+            with self._lock:
+                self._forget(key)
+            return None
+
+    def put(self, key: str, audio: AudioBuffer):
+        """Store rendered audio, evicting the least recently used files beyond max_bytes."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Failed to write cached audio {key}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._files[key] = len(audio)
+            self._total_bytes += len(audio)
+            self._evict()
+
+    def get_or_render(self, key: str, render: Callable[[], AudioBuffer]) -> AudioBuffer:
+        """
+        Return cached audio, rendering and storing it on a miss.
+
+        Args:
+            key: Cache key from audio_key()
+            render: Produces the audio when it is not cached
+
+        Returns:
+            The audio, memory-mapped on a hit
+        """
+        audio = self.get(key)
+        if audio is None:
+            audio = render()
+            self.put(key, audio)
+        return audio
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._files):
+                self._delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """File count, bytes used and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "files": len(self._files),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _scan(self):
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".wav"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._total_bytes += size
+        with self._lock:
+            self._evict()
+        if found:
+            logger.info(f"Audio cache: {len(self._files)} files, {self._total_bytes} bytes in {self.directory}")
+
+    def _evict(self):
+        """Deletes the oldest files until within max_bytes. Caller holds the lock."""
+        # Always keep the newest file, even if it alone exceeds the limit
+        while len(self._files) > 1 and self._total_bytes > self.max_bytes:
+            self._delete(next(iter(self._files)))
+
+    def _delete(self, key: str):
+        self._forget(key)
+        try:
+            os.unlink(self.path(key))
+        except OSError:
+            # Already gone, or still mapped on a platform that refuses to delete it;
+            # it is picked up again by the next scan
+            pass
+
+    def _forget(self, key: str):
+        size = self._files.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+
+def prewarm_lines() -> List[str]:
+    """Every fixed line an NPC can say: the client and server fallbacks plus each NPC's canned lines."""
+    from src.backend_server import fallback_response, npc_profiles
+    from src.text_generator import FALLBACK_MESSAGES
+
+    lines = list(FALLBACK_MESSAGES.values())
+    lines.append(fallback_response().dialogue)
+    for _, profile in npc_profiles.profiles():
+        lines.extend(profile.canned_lines)
+    # Keep the order stable but render each line once
+    return list(dict.fromkeys(lines))
+
+
+def prewarm(lines: Iterable[str], voices: Iterable[Optional[str]], local: bool = False) -> int:
+    """
+    Render lines into the cache ahead of time.
+
+    Args:
+        lines: Text to render
+        voices: /tts voices to render each line with
+        local: Also render through the local pyttsx3 synthesizer
+
+    Returns:
+        Number of renderings that were not cached yet
+    """
+    from src.text_to_speech import render_voice, tts_cache
+
+    lines = list(lines)
+    rendered = 0
+    if tts_cache is None:
+        logger.warning("The /tts audio cache is disabled (MOCK_MODE or TTS_CACHE_ENABLED=FALSE), skipping /tts voices")
+        voices = []
+    for voice in voices:
+        for text in lines:
+            if audio_key(text, voice) not in tts_cache:
+                render_voice(text, voice)
+                rendered += 1
+
+    if local and not TTS_CACHE_ENABLED:
+        logger.warning("The local audio cache is disabled (TTS_CACHE_ENABLED=FALSE), skipping the local voice")
+        local = False
+    if local:
+        from src.speech_synthesizer import SpeechSynthesizer
+
+        synthesizer = SpeechSynthesizer()
+        try:
+            for text in lines:
+                if synthesizer.cache_key(text) not in synthesizer.cache:
+                    synthesizer.synthesize(text)
+                    rendered += 1
+        finally:
+            synthesizer.close()
+    return rendered
+
+
+# Run from the repository root at deploy time: python -m src.audio_cache --voice female_hero
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render fallback and canned NPC lines into the audio cache.")
+    parser.add_argument("--voice", action="append", help="/tts voice to render (repeatable, default: female_hero)")
+    parser.add_argument("--local", action="store_true", help="also render with the local pyttsx3 voice")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    count = prewarm(prewarm_lines(), args.voice or ["female_hero"], local=args.local)
+    print(f"Rendered {count} new audio files into {TTS_CACHE_DIR}")
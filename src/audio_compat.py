@@ -1,28 +1,443 @@
 """
-Audio compatibility module for Python 3.14+
-Provides mock modules for deprecated audio libraries
+Audio compatibility module for Python 3.13+
+Provides a NumPy implementation of audioop and stand-ins for other removed audio modules
 """
 
+import functools
+import math
 import sys
 import types
+import warnings
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+
+class error(Exception):
+    """Raised for invalid fragments and parameters, like audioop.error."""
+
+
+_DTYPES = {1: np.dtype("i1"), 2: np.dtype("=i2"), 4: np.dtype("=i4")}
+_UNSIGNED = {1: np.dtype("u1"), 2: np.dtype("=u2"), 4: np.dtype("=u4")}
+_BYTES = _UNSIGNED[1]
+_MAXVALS = {width: (1 << (8 * width - 1)) - 1 for width in (1, 2, 3, 4)}
+_MINVALS = {width: -(1 << (8 * width - 1)) for width in (1, 2, 3, 4)}
+# 24-bit samples are stored in native byte order, like the other widths
+_INT24_ORDER = [0, 1, 2] if sys.byteorder == "little" else [2, 1, 0]
+
+# Sums of this many full-scale samples (or their squares) are still exact in a double,
+# so an exact integer sum gives the same result as audioop's running double sum
+_EXACT_DOUBLE = 1 << 53
+
+
+def _check_size(width: int):
+    if width not in (1, 2, 3, 4):
+        raise error("Size should be 1, 2, 3 or 4")
+
+
+def _check_parameters(fragment, width: int) -> memoryview:
+    _check_size(width)
+    view = memoryview(fragment)
+    if view.nbytes % width:
+        raise error("not a whole number of frames")
+    return view
+
+
+def _samples(view: memoryview, width: int) -> np.ndarray:
+    """Signed samples of a fragment, read in place for widths 1, 2 and 4."""
+    if width != 3:
+        return np.frombuffer(view, dtype=_DTYPES[width])
+    raw = np.frombuffer(view, dtype=_BYTES).reshape(-1, 3)[:, _INT24_ORDER].astype(np.int32)
+    # Shift the 24-bit value to the top of the int32 and back down to sign-extend it
+    return ((raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)) << 8) >> 8
+
+
+def _to_bytes(samples: np.ndarray, width: int) -> bytes:
+    """Packs integer samples (already in range, or to be wrapped) into a fragment."""
+    if width != 3:
+        return samples.astype(_DTYPES[width]).tobytes()
+    values = samples.astype(np.int64) & 0xFFFFFF
+    packed = np.empty((len(values), 3), dtype=np.uint8)
+    for byte, position in enumerate(_INT24_ORDER):
+        packed[:, position] = (values >> (8 * byte)) & 0xFF
+    return packed.tobytes()
+
+
+def _scaled(samples: np.ndarray, width: int) -> np.ndarray:
+    """Samples as 32-bit values (audioop's GETSAMPLE32)."""
+    return samples.astype(np.int64) << (32 - 8 * width)
+
+
+def _unscaled(values: np.ndarray, width: int) -> np.ndarray:
+    """32-bit values back to samples of `width` (audioop's SETSAMPLE32, an arithmetic shift)."""
+    return values >> (32 - 8 * width)
+
+
+def _clip(values: np.ndarray, width: int) -> np.ndarray:
+    """Clamps values to the sample range, in place."""
+    # Two ufunc calls cost a fraction of np.clip's per-call overhead on 20-64 ms chunks
+    np.maximum(values, _MINVALS[width], out=values)
+    return np.minimum(values, _MAXVALS[width], out=values)
+
+
+def _bound(values: np.ndarray, width: int) -> np.ndarray:
+    """Clamps doubles to the sample range and rounds towards minus infinity (audioop's fbound), in place."""
+    return np.floor(_clip(values, width), out=values)
+
+
+def _top_bits(samples: np.ndarray, width: int, bits: int) -> np.ndarray:
+    """The `bits` most significant bits of every sample, as signed values."""
+    if 8 * width >= bits:
+        return samples >> (8 * width - bits)
+    return samples.astype(np.int32) << (bits - 8 * width)
+
+
+def rms(fragment, width: int) -> int:
+    """Root-mean-square of the samples, a measure of power."""
+    view = _check_parameters(fragment, width)
+    samples = _samples(view, width)
+    if not len(samples):
+        return 0
+    values = samples.astype(np.float64)
+    if len(samples) * (1 << (16 * width - 2)) < _EXACT_DOUBLE:
+        # Every partial sum is an exact integer, so the summation order does not matter
+        total = float(np.dot(values, values))
+    else:
+        total = float(np.cumsum(values * values)[-1])
+    return int(math.sqrt(total / len(samples)))
+
+
+def max(fragment, width: int) -> int:
+    """Largest absolute sample value."""
+    view = _check_parameters(fragment, width)
+    samples = _samples(view, width)
+    if not len(samples):
+        return 0
+    low, high = int(np.minimum.reduce(samples)), int(np.maximum.reduce(samples))
+    return -low if -low > high else high
+
+
+def avg(fragment, width: int) -> int:
+    """Average of the samples, rounded down."""
+    view = _check_parameters(fragment, width)
+    samples = _samples(view, width)
+    if not len(samples):
+        return 0
+    if len(samples) << (8 * width - 1) < _EXACT_DOUBLE:
+        total = float(samples.sum(dtype=np.int64))
+    else:
+        total = float(np.cumsum(samples, dtype=np.float64)[-1])
+    return int(math.floor(total / len(samples)))
+
+
+def mul(fragment, width: int, factor: float) -> bytes:
+    """Samples multiplied by `factor`, clipped to the sample range."""
+    view = _check_parameters(fragment, width)
+    return _to_bytes(_bound(_samples(view, width) * float(factor), width), width)
+
+
+def add(fragment1, fragment2, width: int) -> bytes:
+    """Sample-wise sum of two fragments of the same length, clipped to the sample range."""
+    view1 = _check_parameters(fragment1, width)
+    view2 = _check_parameters(fragment2, width)
+    if view1.nbytes != view2.nbytes:
+        raise error("Lengths should be the same")
+    total = np.add(_samples(view1, width), _samples(view2, width), dtype=np.int64 if width == 4 else np.int32)
+    return _to_bytes(_clip(total, width), width)
+
+
+def bias(fragment, width: int, bias: int) -> bytes:
+    """Samples plus `bias`, wrapping around on overflow."""
+    view = _check_parameters(fragment, width)
+    if width == 3:
+        return _to_bytes(_samples(view, width).astype(np.int64) + bias, width)
+    samples = np.frombuffer(view, dtype=_UNSIGNED[width])
+    return (samples + np.array(bias & ((1 << (8 * width)) - 1), dtype=_UNSIGNED[width])).tobytes()
+
+
+def byteswap(fragment, width: int) -> bytes:
+    """Fragment with the byte order of every sample reversed."""
+    view = _check_parameters(fragment, width)
+    return np.frombuffer(view, dtype=_BYTES).reshape(-1, width)[:, ::-1].tobytes()
+
+
+def tomono(fragment, width: int, lfactor: float, rfactor: float) -> bytes:
+    """Mixes a stereo fragment down to mono as left * lfactor + right * rfactor."""
+    view = _check_parameters(fragment, width)
+    samples = _samples(view, width)
+    if len(samples) % 2:
+        raise error("not a whole number of frames")
+    frames = samples.reshape(-1, 2).astype(np.float64)
+    return _to_bytes(_bound(frames[:, 0] * float(lfactor) + frames[:, 1] * float(rfactor), width), width)
+
+
+def tostereo(fragment, width: int, lfactor: float, rfactor: float) -> bytes:
+    """Stereo fragment with the left channel mono * lfactor and the right mono * rfactor."""
+    view = _check_parameters(fragment, width)
+    samples = _samples(view, width).astype(np.float64)
+    stereo = np.empty((len(samples), 2), dtype=np.float64)
+    stereo[:, 0] = _bound(samples * float(lfactor), width)
+    stereo[:, 1] = _bound(samples * float(rfactor), width)
+    return _to_bytes(stereo.reshape(-1), width)
+
+
+def lin2lin(fragment, width: int, newwidth: int) -> bytes:
+    """Converts samples to another width, keeping the most significant bits."""
+    view = _check_parameters(fragment, width)
+    _check_size(newwidth)
+    if width == newwidth:
+        return bytes(view)
+    if width == 3 or newwidth == 3:
+        return _to_bytes(_unscaled(_scaled(_samples(view, width), width), newwidth), newwidth)
+    samples = _samples(view, width)
+    if newwidth < width:
+        return (samples >> (8 * (width - newwidth))).astype(_DTYPES[newwidth]).tobytes()
+    return (samples.astype(_DTYPES[newwidth]) << (8 * (newwidth - width))).tobytes()
+
+
+RatecvState = Tuple[int, Tuple[Tuple[int, int], ...]]
+
+
+@functools.lru_cache(maxsize=64)
+def _ratecv_positions(d: int, n_in: int, inrate: int, outrate: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    For every output frame, the input frames consumed before it and the weight
+    of the older of the two frames it lies between. A stream cut into equal
+    chunks cycles through a few (d, n_in) pairs, so these are cached.
+
+    Returns:
+        (consumed, weights, d after the last input frame)
+    """
+    end = d + n_in * outrate
+    n_out = end // inrate + 1 if end >= 0 else 0
+    positions = np.arange(n_out, dtype=np.int64) * inrate
+    # The fewest input frames that bring d to >= 0 at this output position
+    consumed = np.maximum(0, -((d - positions) // outrate))
+    weights = (d + consumed * outrate - positions).astype(np.float64)[:, None]
+    consumed.flags.writeable = False
+    weights.flags.writeable = False
+    return consumed, weights, end - n_out * inrate
+
+
+def ratecv(fragment, width: int, nchannels: int, inrate: int, outrate: int, state: Optional[RatecvState],
+           weightA: int = 1, weightB: int = 0) -> Tuple[bytes, RatecvState]:
+    """
+    Converts the frame rate by linear interpolation, like audioop.ratecv.
+
+    Output frame m falls between the last two input frames consumed once
+    m * inrate has been reached, so every output frame is computed at once
+    from its position. Pass the returned state into the next call when
+    converting a stream in pieces. A non-zero weightB adds audioop's one-pole
+    smoothing filter, which is applied sample by sample.
+
+    Returns:
+        (converted fragment, state for the next call)
+    """
+    _check_size(width)
+    if nchannels < 1:
+        raise error("# of channels should be >= 1")
+    frame_bytes = width * nchannels
+    if weightA < 1 or weightB < 0:
+        raise error("weightA should be >= 1, weightB should be >= 0")
+    view = memoryview(fragment)
+    if view.nbytes % frame_bytes:
+        raise error("not a whole number of frames")
+    if inrate <= 0 or outrate <= 0:
+        raise error("sampling rate not > 0")
+
+    divisor = math.gcd(inrate, outrate)
+    inrate //= divisor
+    outrate //= divisor
+    divisor = math.gcd(weightA, weightB)
+    weightA //= divisor
+    weightB //= divisor
+
+    if state is None:
+        d = -outrate
+        history = np.zeros((2, nchannels), dtype=np.int64)
+    else:
+        if not isinstance(state, tuple):
+            raise TypeError("state must be a tuple or None")
+        d, channel_states = state
+        if len(channel_states) != nchannels:
+            raise error("illegal state argument")
+        history = np.array(channel_states, dtype=np.int64).reshape(nchannels, 2).T
+
+    frames = _scaled(_samples(view, width), width).reshape(-1, nchannels)
+    if weightB:
+        filtered = np.empty_like(frames)
+        previous = history[1].tolist()
+        for i, frame in enumerate(frames.tolist()):
+            for channel, value in enumerate(frame):
+                previous[channel] = int((weightA * value + weightB * previous[channel]) / (weightA + weightB))
+            filtered[i] = previous
+        frames = filtered
+
+    # Frame history: the state's (previous, current) frames followed by the new input
+    frames = np.concatenate([history, frames])
+    consumed, weights, d = _ratecv_positions(int(d), len(frames) - 2, inrate, outrate)
+
+    if len(consumed):
+        previous = frames[consumed].astype(np.float64)
+        current = frames[consumed + 1].astype(np.float64)
+        # Truncation towards zero, like the C cast in audioop
+        out = np.trunc((previous * weights + current * (outrate - weights)) / outrate).astype(np.int64)
+        converted = _to_bytes(_unscaled(out, width).reshape(-1), width)
+    else:
+        converted = b""
+
+    new_state = (int(d), tuple((int(p), int(c)) for p, c in zip(frames[-2], frames[-1])))
+    return converted, new_state
+
+
+# --- G.711 u-law and A-law ---
+_SEG_UEND = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_SEG_AEND = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _linear2ulaw_table() -> np.ndarray:
+    """u-law byte for every 14-bit sample, indexed by sample + 8192."""
+    pcm = np.arange(-8192, 8192, dtype=np.int64)
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm), 32635) + (0x84 >> 2)
+    seg = np.searchsorted(_SEG_UEND, magnitude)
+    code = np.where(seg >= 8, 0x7F, (seg << 4) | ((magnitude >> (np.minimum(seg, 7) + 1)) & 0xF))
+    return (code ^ mask).astype(np.uint8)
+
+
+def _linear2alaw_table() -> np.ndarray:
+    """A-law byte for every 13-bit sample, indexed by sample + 4096."""
+    pcm = np.arange(-4096, 4096, dtype=np.int64)
+    mask = np.where(pcm >= 0, 0xD5, 0x55)
+    magnitude = np.where(pcm >= 0, pcm, -pcm - 1)
+    seg = np.searchsorted(_SEG_AEND, magnitude)
+    shift = np.where(seg < 2, 1, np.minimum(seg, 7))
+    code = np.where(seg >= 8, 0x7F, (seg << 4) | ((magnitude >> shift) & 0xF))
+    return (code ^ mask).astype(np.uint8)
+
+
+def _ulaw2linear_table() -> np.ndarray:
+    """16-bit sample for every u-law byte."""
+    code = ~np.arange(256, dtype=np.int64) & 0xFF
+    magnitude = (((code & 0x0F) << 3) + 0x84) << ((code & 0x70) >> 4)
+    return np.where(code & 0x80, 0x84 - magnitude, magnitude - 0x84).astype(np.int64)
+
+
+def _alaw2linear_table() -> np.ndarray:
+    """16-bit sample for every A-law byte."""
+    code = np.arange(256, dtype=np.int64) ^ 0x55
+    seg = (code & 0x70) >> 4
+    magnitude = ((code & 0x0F) << 4) + np.where(seg == 0, 8, 0x108)
+    magnitude = np.where(seg > 1, magnitude << np.maximum(seg - 1, 0), magnitude)
+    return np.where(code & 0x80, magnitude, -magnitude).astype(np.int64)
+
+
+_LIN2ULAW = _linear2ulaw_table()
+_LIN2ALAW = _linear2alaw_table()
+
+# Decoding tables, per output width, hold finished samples
+_ULAW2LIN = {width: _unscaled(_ulaw2linear_table() << 16, width) for width in (1, 2, 3, 4)}
+_ALAW2LIN = {width: _unscaled(_alaw2linear_table() << 16, width) for width in (1, 2, 3, 4)}
+for _width in (1, 2, 4):
+    _ULAW2LIN[_width] = _ULAW2LIN[_width].astype(_DTYPES[_width])
+    _ALAW2LIN[_width] = _ALAW2LIN[_width].astype(_DTYPES[_width])
+
+
+_DECODE_TABLES = {"ulaw": _ULAW2LIN, "alaw": _ALAW2LIN}
+_PAIR_DTYPES = {1: np.dtype("=u2"), 2: np.dtype("=u4"), 4: np.dtype("=u8")}
+
+
+@functools.lru_cache(maxsize=None)
+def _pair_table(law: str, width: int) -> np.ndarray:
+    """
+    Both decoded samples for every pair of code bytes, indexed by the pair read
+    as one native uint16. Decoding two bytes per lookup halves the index array
+    np.take has to convert, which dominates on long fragments. Built on first
+    use (at most 512 KiB per law and width).
+    """
+    codes = np.arange(1 << 16, dtype=np.uint16).view(_BYTES).reshape(-1, 2)
+    return np.ascontiguousarray(_DECODE_TABLES[law][width][codes]).view(_PAIR_DTYPES[width]).reshape(-1)
+
+
+def _decode(law: str, fragment, width: int) -> bytes:
+    _check_size(width)
+    codes = np.frombuffer(fragment, dtype=_BYTES)
+    table = _DECODE_TABLES[law][width]
+    if width == 3:
+        return _to_bytes(table.take(codes), width)
+    pairs = np.frombuffer(fragment, dtype=_UNSIGNED[2], count=len(codes) // 2)
+    decoded = _pair_table(law, width).take(pairs).tobytes()
+    if len(codes) % 2:
+        decoded += table.take(codes[-1:]).tobytes()
+    return decoded
+
+
+def lin2ulaw(fragment, width: int) -> bytes:
+    """Encodes samples as 8-bit u-law."""
+    view = _check_parameters(fragment, width)
+    return _LIN2ULAW.take(_top_bits(_samples(view, width), width, 14).astype(np.intp) + 8192).tobytes()
+
+
+def ulaw2lin(fragment, width: int) -> bytes:
+    """Decodes 8-bit u-law into samples of `width`."""
+    return _decode("ulaw", fragment, width)
+
+
+def lin2alaw(fragment, width: int) -> bytes:
+    """Encodes samples as 8-bit A-law."""
+    view = _check_parameters(fragment, width)
+    return _LIN2ALAW.take(_top_bits(_samples(view, width), width, 13).astype(np.intp) + 4096).tobytes()
+
+
+def alaw2lin(fragment, width: int) -> bytes:
+    """Decodes 8-bit A-law into samples of `width`."""
+    return _decode("alaw", fragment, width)
+
+
+AUDIOOP_FUNCTIONS = (
+    "add", "alaw2lin", "avg", "bias", "byteswap", "lin2alaw", "lin2lin", "lin2ulaw", "max", "mul",
+    "ratecv", "rms", "tomono", "tostereo", "ulaw2lin",
+)
+
+
+def _import_or_none(name: str) -> Optional[types.ModuleType]:
+    try:
+        with warnings.catch_warnings():
+            # audioop, aifc and sunau warn on import before their removal in 3.13
+            warnings.simplefilter("ignore", DeprecationWarning)
+            return __import__(name)
+    except ImportError:
+        return None
+
+
+def _aifc_open(*args, **kwargs):
+    raise _AIFCError("AIFF files are not supported on this Python version")
+
+
+class _AIFCError(Exception):
+    pass
+
 
-# Create mock modules for deprecated audio libraries
 def setup_audio_compat():
-    """Setup compatibility modules for Python 3.14+"""
-    
-    # Mock aifc module
-    if 'aifc' not in sys.modules:
-        aifc = types.ModuleType('aifc')
-        sys.modules['aifc'] = aifc
-    
-    # Mock audioop module
-    if 'audioop' not in sys.modules:
-        audioop = types.ModuleType('audioop')
-        sys.modules['audioop'] = audioop
-    
-    # Mock wave module helpers if needed
-    if 'sunau' not in sys.modules:
-        sunau = types.ModuleType('sunau')
-        sys.modules['sunau'] = sunau
+    """
+    Register stand-ins for audio modules removed in Python 3.13, only where the
+    real module cannot be imported (so older Pythons keep the C audioop).
+    """
+    if _import_or_none("audioop") is None:
+        audioop = types.ModuleType("audioop", "NumPy implementation of the removed audioop module")
+        audioop.error = error
+        for name in AUDIOOP_FUNCTIONS:
+            setattr(audioop, name, globals()[name])
+        sys.modules["audioop"] = audioop
+
+    if _import_or_none("aifc") is None:
+        aifc = types.ModuleType("aifc")
+        aifc.Error = _AIFCError
+        aifc.open = _aifc_open
+        sys.modules["aifc"] = aifc
+
+    if _import_or_none("sunau") is None:
+        sys.modules["sunau"] = types.ModuleType("sunau")
+
 
 setup_audio_compat()
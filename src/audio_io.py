@@ -0,0 +1,85 @@
+"""
+Audio I/O Module
+Zero-copy WAV parsing and chunking for the audio endpoints
+"""
+
+import struct
+from typing import Iterator, NamedTuple, Tuple, Union
+
+AudioBuffer = Union[bytes, bytearray, memoryview]
+
+
+class PCMFormat(NamedTuple):
+    """Layout of little-endian integer PCM frames."""
+    sample_rate: int
+    sample_width: int = 2  # bytes per sample
+    channels: int = 1
+
+    @property
+    def frame_bytes(self) -> int:
+        return self.sample_width * self.channels
+
+    def duration(self, byte_count: int) -> float:
+        """Seconds of audio in byte_count bytes of frames."""
+        return byte_count / (self.frame_bytes * self.sample_rate)
+
+
+def is_wav(buffer: AudioBuffer) -> bool:
+    view = memoryview(buffer)
+    return len(view) >= 12 and view[0:4] == b"RIFF" and view[8:12] == b"WAVE"
+
+
+def parse_wav(buffer: AudioBuffer) -> Tuple[PCMFormat, memoryview]:
+    """
+    Locate the format and sample data of a PCM WAV file without copying it.
+
+    Args:
+        buffer: The complete WAV file
+
+    Returns:
+        (format, view of the sample data inside buffer)
+
+    Raises:
+        ValueError: If buffer is not an uncompressed PCM WAV file
+    """
+    view = memoryview(buffer).cast("B")
+    if not is_wav(view):
+        raise ValueError("Not a RIFF/WAVE file")
+
+    pcm_format = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id = bytes(view[offset:offset + 4])
+        (chunk_size,) = struct.unpack_from("<I", view, offset + 4)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            if audio_format != 1:
+                raise ValueError(f"Unsupported WAV encoding {audio_format}, expected PCM")
+            pcm_format = PCMFormat(sample_rate, bits // 8, channels)
+        elif chunk_id == b"data":
+            if pcm_format is None:
+                raise ValueError("WAV data chunk precedes its fmt chunk")
+            # Streaming writers leave the size at 0 or 0xFFFFFFFF; the data then runs to the end
+            end = len(view) if chunk_size in (0, 0xFFFFFFFF) else min(body + chunk_size, len(view))
+            return pcm_format, view[body:end]
+        offset = body + chunk_size + (chunk_size & 1)  # chunks are word-aligned
+    raise ValueError("WAV file has no data chunk")
+
+
+def wav_header(pcm_format: PCMFormat, data_bytes: int) -> bytes:
+    """44-byte header for a PCM WAV file holding data_bytes of frames."""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, pcm_format.channels, pcm_format.sample_rate,
+        pcm_format.sample_rate * pcm_format.frame_bytes, pcm_format.frame_bytes, pcm_format.sample_width * 8,
+        b"data", data_bytes,
+    )
+
+
+def iter_chunks(buffer: AudioBuffer, chunk_bytes: int) -> Iterator[memoryview]:
+    """Slices buffer into views of at most chunk_bytes each (the last may be shorter)."""
+    view = memoryview(buffer).cast("B")
+    for start in range(0, len(view), chunk_bytes):
+        yield view[start:start + chunk_bytes]
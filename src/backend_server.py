@@ -1,8 +1,26 @@
 import uvicorn
+import asyncio
 import json
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from functools import lru_cache
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Any, AsyncIterator, Literal, Optional, Tuple
+
+from src.config import (
+    MOCK_MODE, NPC_LLM_TIMEOUT, NPC_MAX_CONCURRENT_LLM, NPC_MOCK_LATENCY, NPC_INVALID_OUTPUT_RETRIES,
+    RESPONSE_CACHE_ENABLED, OLLAMA_CONSTRAINED_DECODING, ACTION_REGISTRY_CACHE_SIZE, NPC_KNOWLEDGE_ENABLED, NPC_PROFILE_SOURCE,
+)
+from src.action_registry import IDLE_ACTION, ActionCall, ActionRegistry, get_action_registry
+from src.batch_scheduler import BatchScheduler, Priority
+from src.knowledge_base import KnowledgeBase
+from src.json_stream import FieldEvent, IncrementalJSONParser, repair_truncated_json
+from src.llm_client import AsyncLLMClient, LLMRequest, MockLLMClient, OllamaLLMClient
+from src.metrics import CONTENT_TYPE, FALLBACKS, TIME_TO_FIRST_TOKEN, TURN_SECONDS, render_metrics, stage_timer
+from src.profile_store import NPCProfile, open_profile_store
+from src.response_cache import ResponseCache
+from src.session_store import ConversationSession, SessionStore
 
 # --- Pydantic Models: Enforcing the API Contract ---
 # These models define the exact structure of the data sent between the client and server.
@@ -17,25 +35,43 @@ class WorldContext(BaseModel):
     """The complete package of information sent from the game client to the AI backend."""
     npc_id: str
     player_input: str
-    conversation_history: List[str]
     environment: EnvironmentContext
+    session_id: Optional[str] = Field(default=None, description="Server-side session from POST /sessions. When set, conversation_history is ignored.")
+    conversation_history: List[str] = Field(default_factory=list, description="Client-side history, used only without a session_id.")
+    priority: Literal["dialogue", "ambient"] = Field(default="dialogue", description="Player-facing dialogue is scheduled ahead of ambient barks.")
+
+class SessionRequest(BaseModel):
+    """Opens (or resumes) the server-side conversation between a player and an NPC."""
+    npc_id: str
+    player_id: str
+
+class SessionInfo(BaseModel):
+    session_id: str
+    npc_id: str
+    player_id: str
+    turns: int
 
 class AIResponse(BaseModel):
-    """The structured response sent from the AI backend to the game client."""
+    """
+    The structured response sent from the AI backend to the game client.
+    `actions` holds everything the NPC does, in order; `action`/`action_params`
+    mirror the first entry for clients that handle a single action.
+    """
     dialogue: str
-    action: str
-    action_params: Dict[str, Any]
+    action: str = IDLE_ACTION
+    action_params: Dict[str, Any] = Field(default_factory=dict)
     emotion: str
+    actions: List[ActionCall] = Field(default_factory=list)
 
-# --- NPC Profile: The "Soul" of the Character ---
-class NPCProfile:
-    """Holds the static, authored data for an NPC's personality."""
-    def __init__(self, name: str, backstory: str, personality_traits: List[str], core_knowledge: str, dialogue_style: str):
-        self.name = name
-        self.backstory = backstory
-        self.personality_traits = ", ".join(personality_traits)
-        self.core_knowledge = core_knowledge
-        self.dialogue_style = dialogue_style
+    @model_validator(mode="after")
+    def _mirror_first_action(self) -> "AIResponse":
+        # Accept either shape from the model and always fill in both
+        if self.actions:
+            self.action = self.actions[0].action_type
+            self.action_params = self.actions[0].parameters
+        elif self.action != IDLE_ACTION:
+            self.actions = [ActionCall(action_type=self.action, parameters=self.action_params)]
+        return self
 
 # --- Mock LLM Function ---
 # In a real application, this would make an API call to a service like OpenAI, Anthropic, or a local model.
@@ -53,111 +89,506 @@ def mock_llm_call(prompt: str) -> str:
     # Simple rule-based logic to simulate intelligent responses
     if "sword" in prompt.lower() and "give_item(item_name='Magic_Sword')" in prompt:
         return json.dumps({
-            "dialogue": "Ah, you've noticed my blade. It was forged in the heart of a dying star. Perhaps it can serve you better. Take it.",
-            "action": "give_item",
-            "action_params": {"item_name": "Magic_Sword"},
-            "emotion": "proud"
+            "emotion": "proud",
+            "actions": [{"action_type": "give_item", "parameters": {"item_name": "Magic_Sword"}}],
+            "dialogue": "Ah, you've noticed my blade. It was forged in the heart of a dying star. Perhaps it can serve you better. Take it."
         })
     elif "door" in prompt.lower() and "unlock_door(door_name='Ancient_Door')" in prompt:
         return json.dumps({
-            "dialogue": "This old door? It's been sealed for ages. Stand back, I have the key.",
-            "action": "unlock_door",
-            "action_params": {"door_name": "Ancient_Door"},
-            "emotion": "determined"
+            "emotion": "determined",
+            "actions": [{"action_type": "unlock_door", "parameters": {"door_name": "Ancient_Door"}}],
+            "dialogue": "This old door? It's been sealed for ages. Stand back, I have the key."
         })
     elif "hello" in prompt.lower() or "hi" in prompt.lower():
          return json.dumps({
-            "dialogue": "Hmph. What do you want?",
-            "action": "idle",
-            "action_params": {},
-            "emotion": "grumpy"
+            "emotion": "grumpy",
+            "actions": [],
+            "dialogue": "Hmph. What do you want?"
         })
     else:
         return json.dumps({
-            "dialogue": "I've got work to do. Stop bothering me.",
-            "action": "idle",
-            "action_params": {},
-            "emotion": "annoyed"
+            "emotion": "annoyed",
+            "actions": [],
+            "dialogue": "I've got work to do. Stop bothering me."
         })
 
+# --- LLM Client Setup ---
+# The endpoint awaits the LLM through this async interface, so a slow generation
+# only holds up its own request instead of the whole event loop.
+def create_llm_client() -> AsyncLLMClient:
+    """Selects the mock responder in MOCK_MODE, otherwise the async Ollama client."""
+    if MOCK_MODE:
+        return MockLLMClient(mock_llm_call, latency=NPC_MOCK_LATENCY)
+    return OllamaLLMClient()
+
+llm_client = create_llm_client()
+
+# Groups concurrent requests into micro-batches, bounds how many generations run
+# at once, and lets player dialogue jump ahead of queued ambient barks.
+llm_scheduler = BatchScheduler(
+    handler=lambda llm_request: llm_client.complete(
+        llm_request.prompt, prefix=llm_request.prefix, cache_key=llm_request.cache_key, format=llm_request.format
+    ),
+    batch_handler=llm_client.complete_batch if llm_client.supports_batch else None,
+)
+
+# Streamed generations bypass batching but share the same concurrency limit.
+stream_slots = asyncio.Semaphore(NPC_MAX_CONCURRENT_LLM)
+
+# How often to check whether the player's client has gone away during generation.
+DISCONNECT_POLL_INTERVAL = 0.25
+
+async def _wait_for_disconnect(request: Request):
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+@stage_timer("llm")
+async def call_llm(prompt: str, request: Request, prefix: str = "", cache_key: Optional[str] = None,
+                   priority: Priority = Priority.DIALOGUE, format: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Awaits the LLM through the batch scheduler, under the per-request timeout.
+    Generation is cancelled as soon as the client disconnects.
+    A stable `prefix` with a `cache_key` lets the backend reuse its cached prefill for it.
+    A `format` schema constrains the output on backends that support it.
+    """
+    llm_request = LLMRequest(prompt=prompt, prefix=prefix, cache_key=cache_key, format=format)
+    llm_task = asyncio.ensure_future(asyncio.wait_for(llm_scheduler.submit(llm_request, priority), timeout=NPC_LLM_TIMEOUT))
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({llm_task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not llm_task.done():
+            llm_task.cancel()
+    if llm_task not in done:
+        raise HTTPException(status_code=499, detail="Client closed request")
+    return llm_task.result()
+
 # --- Backend Application Setup ---
 app = FastAPI()
 
-# Load NPC profiles into memory on startup
-NPC_DATABASE = {
-    "kaelen_the_smith": NPCProfile(
-        name="Kaelen",
-        backstory="Kaelen is a master blacksmith, the last of a long line of artisans who once served the mountain kings. He is old, weary, and deeply saddened by the decline of his craft. He secretly possesses the key to the ancient city archives.",
-        personality_traits=["grumpy", "proud", "secretly kind-hearted", "distrustful of strangers"],
-        core_knowledge="Knows the location of the legendary Magic Sword and the history of the Ancient Door.",
-        dialogue_style="Speaks in short, gruff sentences. Rarely uses more than two sentences at a time."
-    )
-}
+# Conversation history lives here, so clients send only a session id and the new line
+session_store = SessionStore()
 
-def construct_system_prompt(profile: NPCProfile, context: WorldContext) -> str:
-    """Dynamically assembles the master prompt for the LLM."""
-    
-    # 1. Persona Definition
-    prompt = f"You are {profile.name}. Your personality is: {profile.personality_traits}. Your backstory: {profile.backstory}. Your dialogue style: {profile.dialogue_style}\n\n"
-    
-    # 2. Core Knowledge
-    prompt += f"Relevant world knowledge you possess: {profile.core_knowledge}\n\n"
+# Identical openers to the same NPC in the same situation skip the LLM entirely
+response_cache = ResponseCache() if RESPONSE_CACHE_ENABLED else None
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    await llm_scheduler.stop()
+    await llm_client.aclose()
+
+# NPC profiles are indexed at startup and loaded on first use
+npc_profiles = open_profile_store()
+
+# An edited profile must not be answered from replies cached for the old one
+if response_cache is not None:
+    npc_profiles.on_change(response_cache.invalidate_npc)
+
+# Lore passages are embedded once and only the relevant ones are put in each prompt
+knowledge_base = KnowledgeBase() if NPC_KNOWLEDGE_ENABLED else None
+
+def rebuild_knowledge(npc_id: str):
+    # Runs on the profile reload thread, so requests find the new index ready
+    knowledge_base.invalidate(npc_id)
+    profile = npc_profiles.get(npc_id)
+    if profile is not None and profile.knowledge:
+        knowledge_base.index(npc_id, profile.knowledge, profile.version)
+
+if knowledge_base is not None:
+    npc_profiles.on_change(rebuild_knowledge)
+
+@app.on_event("startup")
+def check_profile_store():
+    # Every /interact would 404; refuse to start instead
+    if not len(npc_profiles):
+        raise RuntimeError(f"No NPC profiles found in {NPC_PROFILE_SOURCE}")
+
+@app.on_event("shutdown")
+def close_profile_store():
+    npc_profiles.close()
+
+# Static closing instructions shared by every prompt.
+TASK_INSTRUCTIONS = (
+    "### YOUR TASK:\n"
+    "Respond as the character. Your entire response MUST be a single, valid JSON object with no other text or explanation. The JSON object must contain, in this order, 'emotion' (a single word describing your current emotion), 'actions' (the list of actions you take, in order, each an object with 'action_type' (chosen from the available list) and 'parameters' (a dictionary of parameters for the action); an empty list if you do nothing), and 'dialogue' (what you say)."
+)
+
+def find_knowledge(profile: NPCProfile, context: WorldContext, history: Optional[List[str]] = None) -> List[str]:
+    """The NPC's knowledge passages most relevant to the player's input and the recent conversation."""
+    if knowledge_base is None or not profile.knowledge:
+        return []
+    if history is None:
+        history = context.conversation_history
+    return knowledge_base.retrieve(context.npc_id, profile.knowledge, context.player_input, history, version=profile.version)
+
+@stage_timer("retrieve")
+async def retrieve_knowledge(profile: NPCProfile, context: WorldContext, history: Optional[List[str]] = None) -> List[str]:
+    """find_knowledge on a worker thread: embedding, and opening or building an index, would block the event loop."""
+    if knowledge_base is None or not profile.knowledge:
+        return []
+    return await run_in_threadpool(find_knowledge, profile, context, history)
+
+@stage_timer("prompt")
+def construct_prompt_tail(context: WorldContext, history: Optional[List[str]] = None, knowledge: Optional[List[str]] = None) -> str:
+    """
+    Assembles the per-request part of the prompt (knowledge, history, situation, task) in a single join.
+    `history` overrides the client-sent conversation_history (e.g. with a server-side session);
+    `knowledge` holds the retrieved passages relevant to this request.
+    """
+    if history is None:
+        history = context.conversation_history
+    parts = []
+
+    # 2b. Retrieved Knowledge
+    if knowledge:
+        parts.append("### WHAT YOU KNOW ABOUT THIS:\n")
+        parts.extend(f"- {passage}\n" for passage in knowledge)
+        parts.append("\n")
+
+    parts.append("### CONVERSATION HISTORY:\n")
 
     # 3. Conversation History
-    prompt += "### CONVERSATION HISTORY:\n"
-    for line in context.conversation_history:
-        prompt += f"- {line}\n"
-    prompt += f"- Player: \"{context.player_input}\"\n\n"
+    parts.extend(f"- {line}\n" for line in history)
+    parts.append(f"- Player: \"{context.player_input}\"\n\n")
 
     # 4. Dynamic World Context & Action Constraints
-    prompt += "### CURRENT SITUATION:\n"
-    prompt += f"Nearby objects of interest: {json.dumps(context.environment.nearby_objects)}\n"
-    prompt += f"Based on the situation and conversation, you can perform ONLY ONE of the following actions: {json.dumps(context.environment.available_actions)}\n\n"
+    parts.append("### CURRENT SITUATION:\n")
+    parts.append(f"Nearby objects of interest: {json.dumps(context.environment.nearby_objects)}\n")
+    parts.append(f"Based on the situation and conversation, you can perform ONLY the following actions (one, several, or none): {json.dumps(context.environment.available_actions)}\n\n")
 
     # 5. Output Formatting Instructions
-    prompt += "### YOUR TASK:\n"
-    prompt += "Respond as the character. Your entire response MUST be a single, valid JSON object with no other text or explanation. The JSON object must contain 'dialogue' (what you say), 'action' (the chosen action from the available list), 'action_params' (a dictionary of parameters for the action), and 'emotion' (a single word describing your current emotion)."
-    
-    return prompt
+    parts.append(TASK_INSTRUCTIONS)
+
+    return "".join(parts)
+
+def construct_system_prompt(profile: NPCProfile, context: WorldContext, history: Optional[List[str]] = None) -> str:
+    """Dynamically assembles the master prompt for the LLM: the cached persona prefix plus the per-request tail."""
+    return profile.prompt_prefix + construct_prompt_tail(context, history, find_knowledge(profile, context, history))
+
+class OutputStats:
+    """Counts LLM replies that had to be repaired, retried, or replaced by the fallback."""
+    def __init__(self):
+        self.outputs = 0
+        self.repaired = 0
+        self.invalid = 0
+        self.retries = 0
+        self.rejected_actions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "outputs": self.outputs,
+            "repaired": self.repaired,
+            "invalid": self.invalid,
+            "invalid_rate": self.invalid / self.outputs if self.outputs else 0.0,
+            "retries": self.retries,
+            "rejected_actions": self.rejected_actions,
+        }
+
+output_stats = OutputStats()
+
+@lru_cache(maxsize=ACTION_REGISTRY_CACHE_SIZE)
+def response_schema(registry: ActionRegistry) -> Dict[str, Any]:
+    """
+    JSON schema of the reply the LLM must produce: AIResponse's emotion and dialogue,
+    with `actions` limited to the available actions and their parameters.
+    Sent as Ollama's `format`, so malformed or off-list output cannot be generated.
+    """
+    properties = AIResponse.model_json_schema()["properties"]
+    return {
+        "type": "object",
+        "properties": {
+            "emotion": properties["emotion"],
+            "actions": {"type": "array", "items": registry.json_schema()},
+            "dialogue": properties["dialogue"],
+        },
+        "required": ["emotion", "actions", "dialogue"],
+    }
+
+def validate_actions(ai_response: AIResponse, registry: ActionRegistry) -> AIResponse:
+    """
+    Checks every chosen action against the available-action index in one pass.
+    Invalid actions are dropped (the dialogue is kept) rather than re-prompting the LLM.
+    """
+    actions, rejected = registry.validate(ai_response.actions)
+    output_stats.rejected_actions += len(rejected)
+    for reason in rejected:
+        print(f"Rejected action from LLM: {reason}")
+    primary = actions[0] if actions else ActionCall(action_type=IDLE_ACTION)
+    return ai_response.model_copy(update={"actions": actions, "action": primary.action_type, "action_params": primary.parameters})
 
-def parse_llm_response(response_str: str) -> AIResponse:
+def parse_llm_response(response_str: str, available_actions: Optional[List[str]] = None) -> Optional[AIResponse]:
     """
     Parses and validates the LLM's string output.
     This is a critical step for system stability.
+    With `available_actions`, actions the game did not offer are removed.
+    Output cut off mid-object (e.g. by num_predict) is completed before giving up.
+    Returns None if the output is unusable; callers decide between a retry and the fallback.
     """
+    output_stats.outputs += 1
     try:
-        response_data = json.loads(response_str)
+        try:
+            response_data = json.loads(response_str)
+        except json.JSONDecodeError:
+            repaired = repair_truncated_json(response_str)
+            if repaired is None:
+                raise
+            response_data = json.loads(repaired)
+            output_stats.repaired += 1
         # Use Pydantic to validate the structure and types
         validated_response = AIResponse(**response_data)
+        if available_actions is not None:
+            validated_response = validate_actions(validated_response, get_action_registry(available_actions))
         return validated_response
     except (json.JSONDecodeError, TypeError, ValueError) as e:
+        output_stats.invalid += 1
         print(f"Error parsing LLM response: {e}")
         print(f"Raw response was: {response_str}")
-        # Fallback to a safe, default state if parsing fails
-        return AIResponse(
-            dialogue="I... don't know what to say.",
-            action="idle",
-            action_params={},
-            emotion="confused"
-        )
+        return None
 
-@app.post("/interact", response_model=AIResponse)
-async def interact_with_npc(context: WorldContext):
-    """The main API endpoint for all player-NPC interactions."""
-    npc_profile = NPC_DATABASE.get(context.npc_id)
+def fallback_response() -> AIResponse:
+    """The safe, default NPC state used whenever the LLM can't produce a usable answer."""
+    return AIResponse(
+        dialogue="I... don't know what to say.",
+        action="idle",
+        action_params={},
+        emotion="confused"
+    )
+
+async def generate_npc_response(npc_profile: NPCProfile, context: WorldContext, history: Optional[List[str]], request: Request) -> AIResponse:
+    """Produces the NPC's reply from the response cache, or from the LLM on a miss."""
+    if history is None:
+        history = context.conversation_history
+    actions = context.environment.available_actions
+
+    if response_cache is not None:
+        cached = response_cache.get(context.npc_id, context.player_input, actions, history)
+        if cached is not None:
+            return cached.model_copy(deep=True)
+
+    # Step 1: Construct the detailed prompt (the persona prefix is cached on the profile)
+    prompt_tail = construct_prompt_tail(context, history, await retrieve_knowledge(npc_profile, context, history))
+    schema = response_schema(get_action_registry(actions)) if OLLAMA_CONSTRAINED_DECODING else None
+    
+    for attempt in range(NPC_INVALID_OUTPUT_RETRIES + 1):
+        if attempt:
+            output_stats.retries += 1
+
+        # Step 2: Call the LLM (or our mock function) without blocking other players
+        try:
+            llm_output_str = await call_llm(
+                prompt_tail,
+                request,
+                prefix=npc_profile.prompt_prefix,
+                cache_key=f"{context.npc_id}:v{npc_profile.version}",
+                priority=Priority[context.priority.upper()],
+                format=schema,
+            )
+        except asyncio.TimeoutError:
+            print(f"LLM call for {context.npc_id} timed out after {NPC_LLM_TIMEOUT}s")
+            FALLBACKS.inc(reason="timeout")
+            return fallback_response()
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"LLM call for {context.npc_id} failed: {e}")
+            FALLBACKS.inc(reason="llm_error")
+            return fallback_response()
+        
+        # Step 3: Parse and validate the response
+        ai_response = parse_llm_response(llm_output_str, actions)
+        if ai_response is not None:
+            break
+    else:
+        FALLBACKS.inc(reason="invalid")
+        # Fallbacks are not cached, so the next identical request gets a fresh attempt
+        return fallback_response()
+
+    if response_cache is not None:
+        response_cache.put(context.npc_id, context.player_input, ai_response.model_copy(deep=True), actions, history)
+    return ai_response
+
+@app.get("/llm/stats")
+async def llm_output_stats():
+    """How often LLM replies were repaired, retried, rejected or replaced by the fallback."""
+    return output_stats.stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache size and hit-rate counters."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.delete("/cache/{npc_id}")
+async def invalidate_npc_cache(npc_id: str):
+    """Drops every cached reply for one NPC."""
+    removed = response_cache.invalidate_npc(npc_id) if response_cache is not None else 0
+    return {"removed": removed}
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    """LLM queue depth and batch-size counters."""
+    return llm_scheduler.stats()
+
+@app.post("/sessions", response_model=SessionInfo)
+async def open_session(session_request: SessionRequest):
+    """Opens a server-side conversation, or resumes the live one for this NPC and player."""
+    if session_request.npc_id not in npc_profiles:
+        raise HTTPException(status_code=404, detail="NPC not found")
+    session = session_store.open(session_request.npc_id, session_request.player_id)
+    return SessionInfo(session_id=session.session_id, npc_id=session.npc_id, player_id=session.player_id, turns=len(session.turns))
+
+@app.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Ends a server-side conversation."""
+    if not session_store.close(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"status": "closed"}
+
+def resolve_conversation(context: WorldContext) -> Tuple[NPCProfile, Optional[ConversationSession], Optional[List[str]]]:
+    """Looks up the NPC and, when a session_id is given, its server-side session and history."""
+    npc_profile = npc_profiles.get(context.npc_id)
     if not npc_profile:
         raise HTTPException(status_code=404, detail="NPC not found")
 
-    # Step 1: Construct the detailed prompt
-    prompt = construct_system_prompt(npc_profile, context)
-    
-    # Step 2: Call the LLM (or our mock function)
-    llm_output_str = mock_llm_call(prompt)
-    
-    # Step 3: Parse and validate the response
-    ai_response = parse_llm_response(llm_output_str)
+    session = None
+    history = None
+    if context.session_id is not None:
+        session = session_store.get(context.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+        if session.npc_id != context.npc_id:
+            raise HTTPException(status_code=400, detail="Session belongs to a different NPC")
+        history = session.history
+    return npc_profile, session, history
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latencies, time to first token, turn latency, fallbacks and cache hits, for Prometheus to scrape."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+@app.post("/interact", response_model=AIResponse)
+@TURN_SECONDS.time()
+async def interact_with_npc(context: WorldContext, request: Request):
+    """The main API endpoint for all player-NPC interactions."""
+    npc_profile, session, history = resolve_conversation(context)
+
+    # Steps 1-3: Prompt, LLM call and validation (skipped entirely on a cache hit)
+    ai_response = await generate_npc_response(npc_profile, context, history, request)
+
+    # Step 4: Remember the exchange for the next turn
+    if session is not None:
+        session_store.append(session, f"Player: {context.player_input}", f"{npc_profile.name}: {ai_response.dialogue}")
     
     return ai_response
 
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def field_sse_event(field: FieldEvent, registry: ActionRegistry) -> Optional[str]:
+    """Maps a parsed field to the early event the client acts on, if it has one."""
+    if field.key == "dialogue" and field.partial:
+        return sse_event("dialogue", {"text": field.value})
+    if field.key == "emotion" and not field.partial:
+        return sse_event("emotion", {"emotion": field.value})
+    if field.key == "actions" and not field.partial:
+        try:
+            actions, _ = registry.validate([ActionCall(**action) for action in field.value])
+        except (TypeError, ValueError):
+            return None  # malformed; the final response event falls back
+        return sse_event("actions", {"actions": [action.model_dump() for action in actions]})
+    return None
+
+async def stream_npc_response(npc_profile: NPCProfile, context: WorldContext, history: Optional[List[str]],
+                              session: Optional[ConversationSession]) -> AsyncIterator[str]:
+    """
+    Streams the NPC's reply as Server-Sent Events: `emotion` and the validated
+    `actions` as soon as each field is complete, `dialogue` text as it is
+    generated, then a final `response` event with the validated AIResponse
+    (the fallback response if generation failed, which supersedes earlier events).
+    """
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    if history is None:
+        history = context.conversation_history
+    actions = context.environment.available_actions
+
+    cached = response_cache.get(context.npc_id, context.player_input, actions, history) if response_cache is not None else None
+    if cached is not None:
+        ai_response = cached.model_copy(deep=True)
+        yield sse_event("emotion", {"emotion": ai_response.emotion})
+        yield sse_event("actions", {"actions": [action.model_dump() for action in ai_response.actions]})
+        yield sse_event("dialogue", {"text": ai_response.dialogue})
+    else:
+        registry = get_action_registry(actions)
+        parser = IncrementalJSONParser()
+        fields: Dict[str, Any] = {}
+        deadline = started_at + NPC_LLM_TIMEOUT
+        try:
+            prompt_tail = construct_prompt_tail(context, history, await retrieve_knowledge(npc_profile, context, history))
+            async with stream_slots:
+                llm_stream = llm_client.stream(
+                    prompt_tail,
+                    prefix=npc_profile.prompt_prefix,
+                    cache_key=f"{context.npc_id}:v{npc_profile.version}",
+                    format=response_schema(registry) if OLLAMA_CONSTRAINED_DECODING else None,
+                )
+                try:
+                    while not parser.done:
+                        try:
+                            piece = await asyncio.wait_for(llm_stream.__anext__(), max(0.0, deadline - loop.time()))
+                        except StopAsyncIteration:
+                            break
+                        if not parser.text:
+                            TIME_TO_FIRST_TOKEN.observe(loop.time() - started_at)
+                        for field in parser.feed(piece):
+                            if not field.partial:
+                                fields[field.key] = field.value
+                            event = field_sse_event(field, registry)
+                            if event is not None:
+                                yield event
+                finally:
+                    await llm_stream.aclose()
+        except asyncio.TimeoutError:
+            print(f"LLM stream for {context.npc_id} timed out after {NPC_LLM_TIMEOUT}s")
+        except Exception as e:
+            print(f"LLM stream for {context.npc_id} failed: {e}")
+
+        output_stats.outputs += 1
+        if not parser.done:
+            # Cut off (num_predict, timeout): complete whatever arrived
+            repaired = repair_truncated_json(parser.text)
+            if repaired is not None:
+                output_stats.repaired += 1
+                fields = json.loads(repaired)
+        try:
+            ai_response = validate_actions(AIResponse(**fields), registry)
+        except (TypeError, ValueError) as e:
+            output_stats.invalid += 1
+            print(f"Error parsing streamed LLM response: {e}")
+            print(f"Raw response was: {parser.text}")
+            FALLBACKS.inc(reason="invalid")
+            ai_response = fallback_response()
+        else:
+            if response_cache is not None:
+                response_cache.put(context.npc_id, context.player_input, ai_response.model_copy(deep=True), actions, history)
+
+    if session is not None:
+        session_store.append(session, f"Player: {context.player_input}", f"{npc_profile.name}: {ai_response.dialogue}")
+    TURN_SECONDS.observe(loop.time() - started_at)
+    yield sse_event("response", ai_response.model_dump())
+
+@app.post("/interact/stream")
+async def interact_with_npc_stream(context: WorldContext):
+    """Streaming variant of /interact: Server-Sent Events that let the game start animations before the dialogue is done."""
+    npc_profile, session, history = resolve_conversation(context)
+    return StreamingResponse(
+        stream_npc_response(npc_profile, context, history, session),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Run from the repository root: python -m src.backend_server
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
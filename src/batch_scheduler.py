@@ -0,0 +1,216 @@
+"""
+Batch Scheduler Module
+Micro-batching and priority lanes for concurrent LLM requests
+"""
+
+import asyncio
+import logging
+from collections import Counter, deque
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, TypeVar
+
+from src.config import LLM_BATCH_MAX_SIZE, LLM_BATCH_WINDOW_MS, NPC_MAX_CONCURRENT_LLM
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class Priority(IntEnum):
+    """Scheduling lanes; lower values are dispatched first."""
+    DIALOGUE = 0  # player-facing conversation
+    AMBIENT = 1   # background NPC barks
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued_at")
+
+    def __init__(self, item, future: asyncio.Future, enqueued_at: float):
+        self.item = item
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+
+class BatchScheduler(Generic[T, R]):
+    """
+    Collects concurrent requests for a short window and dispatches them together.
+
+    A batch closes when it reaches `max_batch_size` or when its oldest request has
+    waited `window` seconds. With a `batch_handler`, the batch goes to the backend
+    in one call. Otherwise each request is started at the same moment, so a
+    backend with parallel decoding (e.g. Ollama with OLLAMA_NUM_PARALLEL) can run
+    them side by side. At most `max_in_flight` requests run at once. Anything
+    beyond that waits in its priority lane, so dialogue overtakes queued barks.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[T], Awaitable[R]],
+        batch_handler: Optional[Callable[[List[T]], Awaitable[List[Any]]]] = None,
+        max_batch_size: int = LLM_BATCH_MAX_SIZE,
+        window: float = LLM_BATCH_WINDOW_MS / 1000,
+        max_in_flight: int = NPC_MAX_CONCURRENT_LLM,
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            handler: Runs a single request
+            batch_handler: Runs a list of requests in one backend call, returning a
+                           result or exception per request (optional)
+            max_batch_size: Largest batch dispatched at once
+            window: Seconds to wait for a batch to fill
+            max_in_flight: Maximum requests running at the same time
+        """
+        self.handler = handler
+        self.batch_handler = batch_handler
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self.max_in_flight = max_in_flight
+        self._lanes = {priority: deque() for priority in Priority}
+        self._in_flight = 0
+        self._work: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.batches = 0
+        self.dispatched = 0
+        self.batch_sizes = Counter()
+        self.max_queue_depth = 0
+        self._queue_wait_total = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    async def submit(self, item: T, priority: Priority = Priority.DIALOGUE) -> R:
+        """
+        Queue a request and wait for its result.
+
+        Cancelling the caller withdraws the request, or cancels it if it is
+        already running on its own.
+
+        Args:
+            item: The request passed to the handler
+            priority: Lane to queue in
+
+        Returns:
+            The handler's result for this request
+        """
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._work = asyncio.Event()
+            self._dispatcher = asyncio.ensure_future(self._dispatch_loop())
+
+        future = loop.create_future()
+        self._lanes[priority].append(_Pending(item, future, loop.time()))
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._work.set()
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth per lane, requests in flight, and batch-size counters."""
+        return {
+            "queue_depth": {priority.name.lower(): len(lane) for priority, lane in self._lanes.items()},
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self._in_flight,
+            "batches": self.batches,
+            "dispatched": self.dispatched,
+            "mean_batch_size": self.dispatched / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "mean_queue_wait_ms": 1000 * self._queue_wait_total / self.dispatched if self.dispatched else 0.0,
+        }
+
+    async def stop(self):
+        """Stop dispatching and cancel everything still queued."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for lane in self._lanes.values():
+            while lane:
+                lane.popleft().future.cancel()
+
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._work.clear()
+            self._drop_cancelled()
+            if not self.queue_depth or self._in_flight >= self.max_in_flight:
+                await self._work.wait()
+                continue
+
+            # Give the batch until the oldest request has waited `window` to fill up
+            deadline = min(lane[0].enqueued_at for lane in self._lanes.values() if lane) + self.window
+            while self.queue_depth < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                self._work.clear()
+                try:
+                    await asyncio.wait_for(self._work.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+
+            batch = self._take(min(self.max_batch_size, self.max_in_flight - self._in_flight), loop.time())
+            if batch:
+                self._in_flight += len(batch)
+                self.batches += 1
+                self.dispatched += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                asyncio.ensure_future(self._run_batch(batch))
+
+    def _drop_cancelled(self):
+        for lane in self._lanes.values():
+            while lane and lane[0].future.done():
+                lane.popleft()
+
+    def _take(self, limit: int, now: float) -> List[_Pending]:
+        batch = []
+        for priority in Priority:
+            lane = self._lanes[priority]
+            while lane and len(batch) < limit:
+                pending = lane.popleft()
+                if not pending.future.done():
+                    self._queue_wait_total += now - pending.enqueued_at
+                    batch.append(pending)
+        return batch
+
+    async def _run_batch(self, batch: List[_Pending]):
+        try:
+            if self.batch_handler is not None and len(batch) > 1:
+                results = await self.batch_handler([pending.item for pending in batch])
+                for pending, result in zip(batch, results):
+                    if pending.future.done():
+                        continue
+                    if isinstance(result, BaseException):
+                        pending.future.set_exception(result)
+                    else:
+                        pending.future.set_result(result)
+            else:
+                await asyncio.gather(*(self._run_one(pending) for pending in batch))
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} requests failed: {e}")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        finally:
+            self._in_flight -= len(batch)
+            if self._work is not None:
+                self._work.set()
+
+    async def _run_one(self, pending: _Pending):
+        task = asyncio.ensure_future(self.handler(pending.item))
+        # A caller that gives up (timeout, disconnect) cancels the backend call too
+        pending.future.add_done_callback(lambda future: task.cancel() if future.cancelled() else None)
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if not pending.future.done():
+                pending.future.cancel()
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+        else:
+            if not pending.future.done():
+                pending.future.set_result(result)
@@ -1,41 +1,143 @@
-<<<<<<< HEAD
 """
 Configuration settings for AI NPC system
 """
 
-=======
->>>>>>> 54d257d1aa249a80ffb8a3cb0ee6ccbc78041664
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-<<<<<<< HEAD
+# Repository root, so relative data paths do not depend on the working directory
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 # Ollama Configuration
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
 OLLAMA_TEMPERATURE = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
 OLLAMA_MAX_TOKENS = int(os.getenv("OLLAMA_MAX_TOKENS", "150"))
+OLLAMA_STREAM = os.getenv("OLLAMA_STREAM", "TRUE").upper() == "TRUE"
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # how long Ollama keeps the model (and its KV cache) loaded
+OLLAMA_PREFIX_CACHE_SIZE = int(os.getenv("OLLAMA_PREFIX_CACHE_SIZE", "256"))  # primed persona contexts kept per client
+# Instruction template around raw prompts, e.g. "[INST] {prompt} [/INST]" for mistral. Persona prefixes are only
+# reused (sent as a primed context in raw mode) with this set, or for completion models with no template of their own.
+OLLAMA_RAW_TEMPLATE = os.getenv("OLLAMA_RAW_TEMPLATE", "")
+# Constrain NPC replies to a JSON schema of the expected response (needs Ollama 0.5+), instead of free-form JSON
+OLLAMA_CONSTRAINED_DECODING = os.getenv("OLLAMA_CONSTRAINED_DECODING", "TRUE").upper() == "TRUE"
+
+# Ollama Routing Configuration
+# Extra endpoints and model tiers as "tier=model@url,..."; empty means OLLAMA_MODEL at OLLAMA_BASE_URL only
+OLLAMA_ENDPOINTS = os.getenv("OLLAMA_ENDPOINTS", "")
+OLLAMA_FALLBACK_TIER = os.getenv("OLLAMA_FALLBACK_TIER", "")  # smaller, faster tier used when the requested one is saturated
+OLLAMA_ROUTER_MAX_OUTSTANDING = int(os.getenv("OLLAMA_ROUTER_MAX_OUTSTANDING", "4"))  # in-flight requests per endpoint before failover
+OLLAMA_ROUTER_LATENCY_SLO = float(os.getenv("OLLAMA_ROUTER_LATENCY_SLO", "3"))  # seconds of average latency before failover, 0 disables
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))  # seconds between endpoint health checks
+
+# Conversation Memory Configuration
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))  # approx. tokens of history sent per turn
+MEMORY_SUMMARY_MAX_TOKENS = int(os.getenv("MEMORY_SUMMARY_MAX_TOKENS", "120"))
+
+# LLM HTTP Transport Configuration
+LLM_HTTP_POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "10"))  # keep-alive connections per host
+LLM_HTTP_RETRIES = int(os.getenv("LLM_HTTP_RETRIES", "2"))
+LLM_HTTP_BACKOFF = float(os.getenv("LLM_HTTP_BACKOFF", "0.25"))  # seconds, doubled per retry
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
 
 # Speech Recognition Configuration
 SPEECH_LANGUAGE = os.getenv("SPEECH_LANGUAGE", "en-US")
 SPEECH_TIMEOUT = int(os.getenv("SPEECH_TIMEOUT", "10"))
 SPEECH_PHRASE_TIME_LIMIT = 30
+# Keep the microphone open between turns and queue phrases from a capture thread
+SPEECH_CONTINUOUS = os.getenv("SPEECH_CONTINUOUS", "FALSE").upper() == "TRUE"
+
+# Voice Activity Detection Configuration
+# Endpoint phrases with the built-in VAD instead of speech_recognition's energy loop
+SPEECH_VAD_ENABLED = os.getenv("SPEECH_VAD_ENABLED", "TRUE").upper() == "TRUE"
+SPEECH_VAD_FRAME_MS = int(os.getenv("SPEECH_VAD_FRAME_MS", "20"))
+SPEECH_VAD_START_MS = int(os.getenv("SPEECH_VAD_START_MS", "60"))  # voiced audio needed before a phrase starts
+SPEECH_VAD_HANGOVER_MS = int(os.getenv("SPEECH_VAD_HANGOVER_MS", "180"))  # silence after speech that ends the phrase
+SPEECH_VAD_PREROLL_MS = int(os.getenv("SPEECH_VAD_PREROLL_MS", "300"))  # audio kept from before the detected start
+SPEECH_VAD_START_DB = float(os.getenv("SPEECH_VAD_START_DB", "12"))  # dB above the noise floor to start a phrase
+SPEECH_VAD_STOP_DB = float(os.getenv("SPEECH_VAD_STOP_DB", "6"))  # dB above the noise floor to stay in a phrase
+SPEECH_VAD_BUFFER_SECONDS = float(os.getenv("SPEECH_VAD_BUFFER_SECONDS", "10"))  # capture ring buffer size
 
 # Text-to-Speech Configuration
 TTS_VOICE_RATE = int(os.getenv("TTS_VOICE_RATE", "150"))
 TTS_VOICE_VOLUME = float(os.getenv("TTS_VOICE_VOLUME", "1.0"))
 
+# Synthesized Audio Cache Configuration
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "TRUE").upper() == "TRUE"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", ".cache/tts")
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "512"))  # least recently used files are deleted beyond this
+
 # AI NPC Configuration
 SYSTEM_PROMPT = """You are a helpful and friendly AI assistant. 
 Respond naturally and conversationally. Keep responses concise (1-2 sentences). 
 Be engaging and helpful."""
 
 LISTENING_TIMEOUT = 10  # seconds before timeout during listening
-=======
+
+# Backend API Configuration
 MOCK_MODE = os.getenv("MOCK_MODE", "TRUE").upper() == "TRUE"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+STT_PCM_SAMPLE_RATE = int(os.getenv("STT_PCM_SAMPLE_RATE", "16000"))  # assumed for headerless 16-bit mono /stt bodies
+AUDIO_STREAM_CHUNK_BYTES = int(os.getenv("AUDIO_STREAM_CHUNK_BYTES", "16384"))  # size of streamed /tts chunks
+
+# Voice Session (WebSocket) Configuration
+VOICE_PARTIAL_INTERVAL_MS = float(os.getenv("VOICE_PARTIAL_INTERVAL_MS", "1000"))  # new audio between partial transcripts
+VOICE_MAX_UTTERANCE_SECONDS = float(os.getenv("VOICE_MAX_UTTERANCE_SECONDS", "30"))
+VOICE_OUTBOX_SIZE = int(os.getenv("VOICE_OUTBOX_SIZE", "32"))  # queued outgoing messages before the pipeline waits
+
+# Speech-to-Text Engine Configuration
+# stub (fixed transcript), whisper (local faster-whisper model, an optional dependency) or google (Google Web Speech API)
+STT_ENGINE = os.getenv("STT_ENGINE", "stub" if MOCK_MODE else "google")  # for /stt and /voice
+SPEECH_STT_ENGINE = os.getenv("SPEECH_STT_ENGINE", "google")  # for SpeechRecognizer
+STT_WORKERS = int(os.getenv("STT_WORKERS", "2"))  # worker processes for local engines, 0 runs them in-process
+STT_WHISPER_MODEL = os.getenv("STT_WHISPER_MODEL", "base.en")
+STT_WHISPER_COMPUTE_TYPE = os.getenv("STT_WHISPER_COMPUTE_TYPE", "int8")
+
+# NPC Interaction Server Configuration
+NPC_LLM_TIMEOUT = float(os.getenv("NPC_LLM_TIMEOUT", "20"))  # seconds per /interact LLM call
+NPC_MAX_CONCURRENT_LLM = int(os.getenv("NPC_MAX_CONCURRENT_LLM", "64"))
+NPC_MOCK_LATENCY = float(os.getenv("NPC_MOCK_LATENCY", "0"))  # simulated seconds per mock call
+NPC_INVALID_OUTPUT_RETRIES = int(os.getenv("NPC_INVALID_OUTPUT_RETRIES", "0"))  # extra LLM calls when a reply can't be parsed or repaired
+
+# NPC Profile Store Configuration
+# Directory of JSON/YAML profiles, or an SQLite .db file; relative paths are taken from the repository root
+NPC_PROFILE_SOURCE = os.path.join(PROJECT_ROOT, os.getenv("NPC_PROFILE_SOURCE", "characters"))
+NPC_PROFILE_CACHE_SIZE = int(os.getenv("NPC_PROFILE_CACHE_SIZE", "512"))  # parsed profiles kept in memory
+NPC_PROFILE_RELOAD_INTERVAL = float(os.getenv("NPC_PROFILE_RELOAD_INTERVAL", "2"))  # seconds between edit checks, 0 disables
+
+# LLM Batch Scheduler Configuration
+LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "8"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "10"))  # max wait for a batch to fill
+
+# Conversation Session Configuration
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))  # history lines kept per session
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Response Cache Configuration
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "TRUE").upper() == "TRUE"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "FALSE").upper() == "TRUE"
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.9"))  # min cosine similarity
+
+# Action Registry Configuration
+ACTION_REGISTRY_CACHE_SIZE = int(os.getenv("ACTION_REGISTRY_CACHE_SIZE", "1024"))  # distinct available-action sets kept parsed
+
+# Embedding Configuration
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+
+# NPC Knowledge Retrieval Configuration
+NPC_KNOWLEDGE_ENABLED = os.getenv("NPC_KNOWLEDGE_ENABLED", "TRUE").upper() == "TRUE"
+NPC_KNOWLEDGE_DIR = os.getenv("NPC_KNOWLEDGE_DIR", ".cache/knowledge")
+NPC_KNOWLEDGE_TOP_K = int(os.getenv("NPC_KNOWLEDGE_TOP_K", "3"))  # passages injected per prompt
+NPC_KNOWLEDGE_MIN_SCORE = float(os.getenv("NPC_KNOWLEDGE_MIN_SCORE", "0.2"))  # min cosine similarity
+NPC_KNOWLEDGE_HISTORY_LINES = int(os.getenv("NPC_KNOWLEDGE_HISTORY_LINES", "2"))  # recent history lines added to the query
+NPC_KNOWLEDGE_PASSAGE_CHARS = int(os.getenv("NPC_KNOWLEDGE_PASSAGE_CHARS", "400"))  # max length of a passage split from lore text
 PROJECT_NAME = "AI-Driven NPC Backend"
 VERSION = "1.0.0"
->>>>>>> 54d257d1aa249a80ffb8a3cb0ee6ccbc78041664
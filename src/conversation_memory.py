@@ -0,0 +1,131 @@
+"""
+Conversation Memory Module
+Token-budgeted chat history with rolling background summarisation
+"""
+
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from src.config import MEMORY_TOKEN_BUDGET
+
+logger = logging.getLogger(__name__)
+
+# (previous summary, messages that fell out of the window) -> new summary
+Summarizer = Callable[[str, List[Dict[str, str]]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English BPE vocabularies)."""
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+    """
+    Chat history that stays within a token budget.
+
+    Token counts are tracked per message as they are added. When the window
+    exceeds the budget, the oldest messages are evicted and folded into a running
+    summary on a background thread, so summarising never delays a reply.
+    """
+
+    def __init__(self, token_budget: int = MEMORY_TOKEN_BUDGET, summarizer: Optional[Summarizer] = None):
+        """
+        Initialize the memory.
+
+        Args:
+            token_budget: Approximate tokens allowed for the summary plus recent messages
+            summarizer: Function that folds evicted messages into the summary;
+                        evicted messages are simply dropped when None
+        """
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self._summary_tokens = 0
+        self._messages = deque()  # (message, tokens)
+        self._window_tokens = 0
+        self._pending: List[Dict[str, str]] = []
+        self._summarizing = False
+        self._generation = 0  # bumped by clear() so stale summaries are discarded
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+    @property
+    def token_count(self) -> int:
+        """Approximate tokens currently held (summary plus window)."""
+        return self._summary_tokens + self._window_tokens
+
+    def append(self, role: str, content: str):
+        """
+        Add a message, evicting the oldest ones if the budget is exceeded.
+
+        Args:
+            role: Chat role ("user" or "assistant")
+            content: Message text
+        """
+        with self._lock:
+            tokens = estimate_tokens(content)
+            self._messages.append(({"role": role, "content": content}, tokens))
+            self._window_tokens += tokens
+
+            if self._evict_over_budget() and not self._summarizing:
+                self._summarizing = True
+                self._executor.submit(self._summarize_pending, self._generation)
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Chat messages for the next prompt: the running summary (if any) followed by the window."""
+        with self._lock:
+            window = [message for message, _ in self._messages]
+            if not self.summary:
+                return window
+            return [{"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"}, *window]
+
+    def clear(self):
+        """Forget everything, including any summary still being generated."""
+        with self._lock:
+            self._messages.clear()
+            self._window_tokens = 0
+            self._pending = []
+            self.summary = ""
+            self._summary_tokens = 0
+            self._summarizing = False
+            self._generation += 1
+
+    def _evict_over_budget(self) -> bool:
+        """Moves the oldest messages to the summary queue until within budget. Caller holds the lock."""
+        evicted = False
+        # Always keep the newest message, even if it alone exceeds the budget
+        while len(self._messages) > 1 and self.token_count > self.token_budget:
+            message, message_tokens = self._messages.popleft()
+            self._window_tokens -= message_tokens
+            if self.summarizer is not None:
+                self._pending.append(message)
+                evicted = True
+        return evicted
+
+    def _summarize_pending(self, generation: int):
+        while True:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                if not self._pending:
+                    self._summarizing = False
+                    return
+                summary, batch = self.summary, self._pending
+                self._pending = []
+
+            try:
+                new_summary = self.summarizer(summary, batch).strip()
+            except Exception as e:
+                logger.warning(f"Conversation summarisation failed, keeping previous summary: {e}")
+                new_summary = summary
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self.summary = new_summary
+                self._summary_tokens = estimate_tokens(new_summary) if new_summary else 0
+                # A longer summary leaves less room for the window
+                self._evict_over_budget()
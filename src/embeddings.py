@@ -0,0 +1,77 @@
+"""
+Embeddings Module
+Deterministic, dependency-free text embeddings for similarity lookups
+"""
+
+import re
+import zlib
+from typing import Iterable, List
+
+import numpy as np
+
+from src.config import EMBEDDING_DIM
+
+_WORD = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """
+    Feature-hashing embedder over words and character n-grams.
+
+    Needs no model or GPU and gives the same vector for the same text in every
+    process (crc32 rather than Python's salted hash), so it is safe for on-disk
+    indexes and offline tests. Vectors are L2-normalised, so a dot product is the
+    cosine similarity.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, ngram: int = 3):
+        """
+        Initialize the embedder.
+
+        Args:
+            dim: Embedding dimension
+            ngram: Character n-gram length
+        """
+        self.dim = dim
+        self.ngram = ngram
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in _WORD.findall(text.lower()):
+            features.append(word)
+            padded = f" {word} "
+            features.extend(padded[i:i + self.ngram] for i in range(max(1, len(padded) - self.ngram + 1)))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        Embed one text.
+
+        Returns:
+            float32 vector of shape (dim,), all zeros for text without words
+        """
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in self._features(text)),
+            dtype=np.uint32,
+        )
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            # Low bits pick the bucket, the top bit picks the sign to reduce collision bias
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, (hashes % self.dim).astype(np.intp), signs)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector /= norm
+        return vector
+
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embed several texts.
+
+        Returns:
+            float32 matrix of shape (len(texts), dim)
+        """
+        vectors = [self.embed(text) for text in texts]
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack(vectors)
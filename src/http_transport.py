@@ -0,0 +1,189 @@
+"""
+HTTP Transport Module
+Shared keep-alive connection pool for all LLM backends
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from src.config import (
+    LLM_HTTP_POOL_SIZE,
+    LLM_HTTP_RETRIES,
+    LLM_HTTP_BACKOFF,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection setup time for the request currently running on this thread
+_connect_state = threading.local()
+
+
+def _record_connect(seconds: float):
+    _connect_state.seconds = getattr(_connect_state, "seconds", 0.0) + seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """HTTP connection that records how long the TCP connect took."""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """HTTPS connection that records how long the TCP connect and TLS handshake took."""
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """Requests adapter whose pooled connections report their connect time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+@dataclass
+class RequestTimings:
+    """Wall-clock phases of a single HTTP request, in seconds."""
+    connect: float = 0.0  # new TCP/TLS setup; 0.0 when a pooled connection was reused
+    ttfb: float = 0.0     # request start until response headers arrived
+    total: float = 0.0    # request start until the body was fully read
+    started_at: float = field(default=0.0, repr=False)
+
+    @property
+    def reused_connection(self) -> bool:
+        return self.connect == 0.0
+
+    def finish(self):
+        """Mark the response body as fully consumed (needed for streamed responses)."""
+        self.total = time.perf_counter() - self.started_at
+
+
+class HTTPTransport:
+    """Persistent HTTP session with per-host connection pooling, retries and timings."""
+
+    def __init__(
+        self,
+        pool_size: int = LLM_HTTP_POOL_SIZE,
+        retries: int = LLM_HTTP_RETRIES,
+        backoff: float = LLM_HTTP_BACKOFF,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+    ):
+        """
+        Initialize the transport.
+
+        Args:
+            pool_size: Maximum keep-alive connections held per host
+            retries: Retries for connection failures and 502/503/504 responses
+            backoff: Exponential backoff factor between retries, in seconds
+            connect_timeout: Default connect timeout in seconds
+            read_timeout: Default read timeout in seconds
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self._last = threading.local()
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = _TimedHTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def last_timings(self) -> Optional[RequestTimings]:
+        """Timings of the most recent request made from the calling thread."""
+        return getattr(self._last, "timings", None)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request over the pooled session.
+
+        The returned response carries a `timings` attribute. For `stream=True`
+        requests, call `response.timings.finish()` once the body is consumed.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            **kwargs: Passed through to `requests.Session.request`
+
+        Returns:
+            The HTTP response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        _connect_state.seconds = 0.0
+        started_at = time.perf_counter()
+
+        response = self.session.request(method, url, **kwargs)
+
+        timings = RequestTimings(
+            connect=_connect_state.seconds,
+            ttfb=response.elapsed.total_seconds(),
+            started_at=started_at,
+        )
+        if not kwargs.get("stream"):
+            timings.finish()
+            logger.debug(f"{method} {url}: {timings}")
+        response.timings = timings
+        self._last.timings = timings
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+
+_shared_transport: Optional[HTTPTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> HTTPTransport:
+    """Return the process-wide transport, creating it on first use."""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HTTPTransport()
+        return _shared_transport
@@ -0,0 +1,247 @@
+"""
+Incremental JSON Module
+Reports the fields of a streamed JSON object as soon as each one is complete
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+_WHITESPACE = " \t\r\n"
+
+
+@dataclass
+class FieldEvent:
+    """
+    A top-level field of the object being parsed.
+
+    `partial` events carry newly decoded text of a string value that is still
+    streaming; the final event for every field has `partial=False` and the full value.
+    """
+    key: str
+    value: Any
+    partial: bool = False
+
+
+class IncrementalJSONParser:
+    """
+    Push parser for one JSON object arriving in arbitrary chunks (e.g. LLM tokens).
+
+    Only the top level is interpreted: each field is reported when its value
+    closes, and string values are also reported piecewise while they stream.
+    Nested values are passed through json.loads once complete. Text before the
+    opening brace is ignored, since models sometimes add a preamble.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"  # at depth 1: key, colon, value, comma
+        self._key: Optional[str] = None
+        self._token_start: Optional[int] = None
+        self._string_emitted = 0  # raw offset into the current string value already reported
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> List[FieldEvent]:
+        """
+        Add text and return the field events it completes.
+
+        Raises:
+            ValueError: If the text cannot be the start of a JSON object
+        """
+        self._buffer += chunk
+        events: List[FieldEvent] = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and not self.done:
+            c = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_top_level_string(i, events)
+            elif self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect not in ("key", "value"):
+                        raise ValueError(f"Unexpected string at offset {i}")
+                    self._token_start = i
+                    self._string_emitted = i + 1
+            elif c in "{[":
+                if self._depth == 1:
+                    self._start_value(i)
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 2:
+                    self._emit_field(buffer[self._token_start:i + 1], events)
+                elif self._depth == 1:
+                    if self._expect == "value" and self._token_start is not None:
+                        self._emit_field(buffer[self._token_start:i], events)
+                    self.done = True
+                self._depth -= 1
+            elif self._depth == 1:
+                if c == ":" and self._expect == "colon":
+                    self._expect = "value"
+                elif c == "," and self._expect in ("comma", "value"):
+                    if self._expect == "value" and self._token_start is not None:
+                        self._emit_field(buffer[self._token_start:i], events)
+                    self._expect = "key"
+                elif c not in _WHITESPACE:
+                    # Start (or continuation) of a number, true, false or null
+                    if self._expect != "value":
+                        raise ValueError(f"Unexpected {c!r} at offset {i}")
+                    if self._token_start is None:
+                        self._token_start = i
+            i += 1
+        self._pos = i
+
+        if self._in_string and self._depth == 1 and self._expect == "value":
+            self._emit_partial_string(events)
+        return events
+
+    def _start_value(self, i: int):
+        if self._expect != "value":
+            raise ValueError(f"Unexpected value at offset {i}")
+        self._token_start = i
+
+    def _close_top_level_string(self, end: int, events: List[FieldEvent]):
+        raw = self._buffer[self._token_start:end + 1]
+        if self._expect == "key":
+            self._key = json.loads(raw)
+            self._token_start = None
+            self._expect = "colon"
+        else:
+            self._emit_partial_string(events, end)
+            self._emit_field(raw, events)
+
+    def _emit_partial_string(self, events: List[FieldEvent], end: Optional[int] = None):
+        raw = self._buffer[self._string_emitted:end if end is not None else len(self._buffer)]
+        if end is None:
+            raw = raw[:_complete_escapes(raw)]
+        if raw:
+            events.append(FieldEvent(self._key, json.loads(f'"{raw}"'), partial=True))
+            self._string_emitted += len(raw)
+
+    def _emit_field(self, raw: str, events: List[FieldEvent]):
+        events.append(FieldEvent(self._key, json.loads(raw)))
+        self._key = None
+        self._token_start = None
+        self._expect = "comma"
+
+
+def _complete_escapes(raw: str) -> int:
+    """Length of the longest prefix of a JSON string body that does not end inside an escape sequence."""
+    i = 0
+    while i < len(raw):
+        if raw[i] != "\\":
+            i += 1
+            continue
+        if raw[i + 1:i + 2] != "u":
+            step = 2
+        elif raw[i + 2:i + 4].lower() in ("d8", "d9", "da", "db"):
+            step = 12  # a high surrogate is only decodable together with its low half
+        else:
+            step = 6
+        if i + step > len(raw):
+            break
+        i += step
+    return i
+
+
+_PARTIAL_LITERALS = {"t": "true", "tr": "true", "tru": "true", "f": "false", "fa": "false", "fal": "false",
+                     "fals": "false", "n": "null", "nu": "null", "nul": "null"}
+
+
+def repair_truncated_json(text: str) -> Optional[str]:
+    """
+    Completes a JSON object whose generation stopped early (e.g. at num_predict).
+
+    An unterminated string is closed, a dangling key gets a null value, partial
+    literals and numbers are finished or trimmed, a trailing comma is dropped,
+    and every open object and array is closed. Text before the first brace and
+    after the object's end is discarded.
+
+    Returns:
+        Valid JSON text, or None if the text cannot be completed
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+
+    stack: List[List[str]] = []  # [bracket, expect] with expect in key/colon/value/comma
+    in_string = escape = string_is_key = False
+    string_start = 0
+    end = len(text)
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                stack[-1][1] = "colon" if string_is_key else "comma"
+            continue
+        if c == '"':
+            in_string = True
+            string_start = i
+            string_is_key = stack[-1][0] == "{" and stack[-1][1] == "key"
+        elif c in "{[":
+            if stack:
+                stack[-1][1] = "comma"
+            stack.append([c, "key" if c == "{" else "value"])
+        elif c in "}]":
+            stack.pop()
+            if not stack:
+                end = i + 1
+                break
+        elif c == ":":
+            stack[-1][1] = "value"
+        elif c == ",":
+            stack[-1][1] = "key" if stack[-1][0] == "{" else "value"
+        elif c not in _WHITESPACE:
+            stack[-1][1] = "comma"
+
+    repaired = text[start:end]
+    if stack:
+        if in_string:
+            body = string_start + 1 - start
+            repaired = repaired[:body + _complete_escapes(repaired[body:])]
+            repaired += '":null' if string_is_key else '"'
+        else:
+            repaired = repaired.rstrip()
+            word = repaired[len(repaired.rstrip("abcdefghijklmnopqrstuvwxyz")):]
+            if word in _PARTIAL_LITERALS:
+                repaired = repaired[:-len(word)] + _PARTIAL_LITERALS[word]
+            elif word in ("e", "E") or (not word and repaired[-1:] in ("+", "-", ".")):
+                # A number cut off after its sign, point or exponent marker
+                repaired = repaired.rstrip("+-.eE").rstrip()
+            if repaired.endswith(","):
+                repaired = repaired[:-1]
+            elif repaired.endswith(":"):
+                repaired += "null"
+            elif stack[-1][0] == "{" and stack[-1][1] == "colon":
+                repaired += ":null"
+        repaired += "".join("}" if bracket == "{" else "]" for bracket, _ in reversed(stack))
+
+    try:
+        json.loads(repaired)
+    except json.JSONDecodeError:
+        return None
+    return repaired
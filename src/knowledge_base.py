@@ -0,0 +1,219 @@
+"""
+Knowledge Base Module
+Per-NPC lore passages, embedded offline and retrieved by similarity to the conversation
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.config import (
+    NPC_KNOWLEDGE_DIR, NPC_KNOWLEDGE_HISTORY_LINES, NPC_KNOWLEDGE_MIN_SCORE, NPC_KNOWLEDGE_PASSAGE_CHARS,
+    NPC_KNOWLEDGE_TOP_K,
+)
+from src.embeddings import HashingEmbedder
+from src.utils import sentence_chunks
+
+logger = logging.getLogger(__name__)
+
+# Weight of each earlier history line relative to the player's new input in the retrieval query
+HISTORY_WEIGHT = 0.5
+
+
+def split_passages(text: str, max_chars: int = NPC_KNOWLEDGE_PASSAGE_CHARS) -> List[str]:
+    """
+    Splits lore text into passages: one per paragraph, with long paragraphs
+    packed sentence by sentence into passages of at most max_chars.
+    """
+    passages = []
+    for paragraph in text.split("\n\n"):
+        current = ""
+        for sentence in sentence_chunks(" ".join(paragraph.split())):
+            if current and len(current) + 1 + len(sentence) > max_chars:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        if current:
+            passages.append(current)
+    return passages
+
+
+def passages_digest(passages: Sequence[str]) -> str:
+    """Identifies a passage list, so an index built from older lore is detected and rebuilt."""
+    return hashlib.sha256(json.dumps(list(passages)).encode("utf-8")).hexdigest()
+
+
+class KnowledgeIndex:
+    """The passages of one NPC and their unit embeddings, one row per passage."""
+
+    def __init__(self, passages: List[str], vectors: np.ndarray):
+        self.passages = passages
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int, min_score: float = 0.0) -> List[Tuple[float, str]]:
+        """
+        Top-k passages by cosine similarity to a unit query vector.
+
+        Returns:
+            (score, passage) pairs, best first, with score >= min_score
+        """
+        if not self.passages or k <= 0:
+            return []
+        scores = self.vectors @ query
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), self.passages[i]) for i in top if scores[i] >= min_score]
+
+
+class KnowledgeBase:
+    """
+    Retrieval over every NPC's knowledge passages.
+
+    Each NPC's embeddings are stored as <npc_id>.npy in `directory` with the
+    passages alongside in <npc_id>.json, and are memory-mapped when first
+    needed, so idle NPCs cost no memory. Indexes are normally built offline
+    (`python -m src.knowledge_base`); a missing or stale one is rebuilt on use.
+    An open index is matched to the profile version it was opened for, so the
+    passages are only hashed again after the profile changed. Opening and
+    building embed and read or write files; call them off the event loop.
+    """
+
+    def __init__(self, directory: str = NPC_KNOWLEDGE_DIR, embedder: Optional[HashingEmbedder] = None):
+        """
+        Initialize the knowledge base.
+
+        Args:
+            directory: Where embedding matrices and passage lists are stored
+            embedder: Embeds passages and queries (must match the one indexes were built with)
+        """
+        self.directory = directory
+        self.embedder = embedder or HashingEmbedder()
+        self._indexes: Dict[str, Tuple[Optional[int], str, KnowledgeIndex]] = {}  # npc_id -> (version, digest, index)
+        self._npc_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, npc_id: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, npc_id)
+        return f"{base}.npy", f"{base}.json"
+
+    def build(self, npc_id: str, passages: Sequence[str]) -> KnowledgeIndex:
+        """Embeds the passages and writes the NPC's index, replacing any previous one."""
+        passages = list(passages)
+        vectors = self.embedder.embed_batch(passages)
+        matrix_path, meta_path = self._paths(npc_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, vectors)
+        os.replace(tmp_path, matrix_path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"digest": passages_digest(passages), "dim": self.embedder.dim, "passages": passages}, f)
+        os.replace(tmp_path, meta_path)
+        return KnowledgeIndex(passages, vectors)
+
+    def _open(self, npc_id: str, digest: str) -> Optional[KnowledgeIndex]:
+        matrix_path, meta_path = self._paths(npc_id)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["digest"] != digest or meta["dim"] != self.embedder.dim:
+                return None
+            vectors = np.load(matrix_path, mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        if vectors.shape != (len(meta["passages"]), self.embedder.dim):
+            return None
+        return KnowledgeIndex(meta["passages"], vectors)
+
+    def index(self, npc_id: str, passages: Sequence[str], version: Optional[int] = None) -> KnowledgeIndex:
+        """
+        The NPC's index for these passages, opened from disk or built if missing or out of date.
+
+        Args:
+            npc_id: NPC identifier
+            passages: The NPC's knowledge passages
+            version: Profile version the passages come from; while it is unchanged they are not hashed again
+        """
+        with self._lock:
+            cached = self._indexes.get(npc_id)
+            if cached is not None and version is not None and cached[0] == version:
+                return cached[2]
+            # One NPC's index is built at a time, without holding up lookups for the others
+            npc_lock = self._npc_locks.setdefault(npc_id, threading.Lock())
+        digest = passages_digest(passages)
+        with npc_lock:
+            with self._lock:
+                cached = self._indexes.get(npc_id)
+            if cached is not None and cached[1] == digest:
+                index = cached[2]
+            else:
+                index = self._open(npc_id, digest)
+                if index is None:
+                    logger.info(f"Building knowledge index for {npc_id} ({len(passages)} passages)")
+                    index = self.build(npc_id, passages)
+            with self._lock:
+                self._indexes[npc_id] = (version, digest, index)
+            return index
+
+    def invalidate(self, npc_id: str):
+        """Forgets the open index, e.g. after the NPC's profile changed."""
+        with self._lock:
+            self._indexes.pop(npc_id, None)
+
+    def query_vector(self, player_input: str, history: Sequence[str] = ()) -> np.ndarray:
+        """Unit query from the player's input, with the most recent history lines at lower weight."""
+        recent = list(history[-NPC_KNOWLEDGE_HISTORY_LINES:]) if NPC_KNOWLEDGE_HISTORY_LINES > 0 else []
+        vectors = self.embedder.embed_batch([player_input] + recent)
+        weights = np.full(len(vectors), HISTORY_WEIGHT, dtype=np.float32)
+        weights[0] = 1.0
+        query = weights @ vectors
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def retrieve(self, npc_id: str, passages: Sequence[str], player_input: str, history: Sequence[str] = (),
+                 k: int = NPC_KNOWLEDGE_TOP_K, min_score: float = NPC_KNOWLEDGE_MIN_SCORE,
+                 version: Optional[int] = None) -> List[str]:
+        """
+        The passages most relevant to the conversation.
+
+        Returns:
+            Up to k passages, most relevant first
+        """
+        if not passages:
+            return []
+        index = self.index(npc_id, passages, version)
+        return [passage for _, passage in index.search(self.query_vector(player_input, history), k, min_score)]
+
+
+def main():
+    """Builds the knowledge indexes of every NPC in the profile store."""
+    from src.profile_store import open_profile_store
+
+    parser = argparse.ArgumentParser(description="Embed NPC knowledge passages for retrieval.")
+    parser.add_argument("--dir", default=NPC_KNOWLEDGE_DIR, help="Where to write the indexes")
+    args = parser.parse_args()
+
+    knowledge_base = KnowledgeBase(args.dir)
+    store = open_profile_store(reload_interval=0)
+    for npc_id, profile in store.profiles():
+        if profile.knowledge:
+            knowledge_base.build(npc_id, profile.knowledge)
+            print(f"{npc_id}: {len(profile.knowledge)} passages")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+"""
+Async LLM Client Module
+Non-blocking LLM backends awaited from the NPC interaction server
+"""
+
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from src.config import (
+    OLLAMA_BASE_URL,
+    OLLAMA_MODEL,
+    OLLAMA_TEMPERATURE,
+    OLLAMA_MAX_TOKENS,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_PREFIX_CACHE_SIZE,
+    OLLAMA_RAW_TEMPLATE,
+    LLM_HTTP_POOL_SIZE,
+    LLM_CONNECT_TIMEOUT,
+    LLM_READ_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LLMRequest:
+    """One completion request, as queued by the batch scheduler."""
+    prompt: str
+    prefix: str = ""
+    cache_key: Optional[str] = None
+    format: Optional[Dict[str, Any]] = None
+
+
+class AsyncLLMClient(ABC):
+    """Base class for LLM backends that can be awaited without blocking the event loop."""
+
+    # True when complete_batch() decodes several prompts in one backend call
+    supports_batch = False
+
+    @abstractmethod
+    async def complete(self, prompt: str, prefix: str = "", cache_key: Optional[str] = None,
+                       format: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generate a completion for `prefix + prompt`.
+
+        Args:
+            prompt: The per-request part of the prompt
+            prefix: Static leading part of the prompt (e.g. an NPC persona)
+            cache_key: Identifies `prefix`; backends may reuse cached prefill for it
+            format: JSON schema the output must follow; backends that support
+                    constrained decoding enforce it while generating
+
+        Returns:
+            Raw model output
+        """
+
+    async def stream(self, prompt: str, prefix: str = "", cache_key: Optional[str] = None,
+                     format: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Generate a completion for `prefix + prompt` piece by piece.
+
+        Backends without streaming yield the whole completion as one piece.
+
+        Yields:
+            Consecutive fragments of the raw model output
+        """
+        yield await self.complete(prompt, prefix, cache_key, format)
+
+    async def complete_batch(self, requests: List[LLMRequest]) -> List[Any]:
+        """
+        Generate completions for several requests, in one backend call when `supports_batch`.
+
+        Returns:
+            A result string, or the exception raised, for each request in order
+        """
+        # Backends without batched decoding send the requests side by side
+        return await asyncio.gather(
+            *(self.complete(request.prompt, request.prefix, request.cache_key, request.format) for request in requests),
+            return_exceptions=True,
+        )
+
+    async def aclose(self):
+        """Release any connections held by the client."""
+
+
+class MockLLMClient(AsyncLLMClient):
+    """Adapts a synchronous, rule-based responder (e.g. `mock_llm_call`) to the async interface."""
+
+    def __init__(self, responder: Callable[[str], str], latency: float = 0.0):
+        """
+        Initialize the mock client.
+
+        Args:
+            responder: Function mapping a prompt to a raw JSON response string
+            latency: Simulated generation time in seconds
+        """
+        self.responder = responder
+        self.latency = latency
+
+    # One simulated decode step serves the whole batch, like a batching inference server
+    supports_batch = True
+
+    # Characters per streamed piece, roughly one token
+    STREAM_PIECE_CHARS = 4
+
+    async def complete(self, prompt: str, prefix: str = "", cache_key: Optional[str] = None,
+                       format: Optional[Dict[str, Any]] = None) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.responder(prefix + prompt)
+
+    async def stream(self, prompt: str, prefix: str = "", cache_key: Optional[str] = None,
+                     format: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        # Half the latency before the first piece (prefill), the rest spread over the pieces (decode)
+        text = self.responder(prefix + prompt)
+        pieces = [text[start:start + self.STREAM_PIECE_CHARS] for start in range(0, len(text), self.STREAM_PIECE_CHARS)]
+        if self.latency:
+            await asyncio.sleep(self.latency / 2)
+        for piece in pieces:
+            await asyncio.sleep(self.latency / 2 / len(pieces))
+            yield piece
+
+    async def complete_batch(self, requests: List[LLMRequest]) -> List[Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        results = []
+        for request in requests:
+            try:
+                results.append(self.responder(request.prefix + request.prompt))
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+class OllamaLLMClient(AsyncLLMClient):
+    """
+    Async Ollama client built on a pooled httpx.AsyncClient.
+
+    Keyed prefixes are evaluated once and their token context is kept, so later
+    requests send only the new text plus that `context` and Ollama skips
+    re-prefilling the persona. Keyed requests use raw mode, since the context
+    already holds the prompt start and must not be re-wrapped in the model
+    template. Instead, the `raw_template` is applied by hand: its start is primed
+    with the prefix and its end follows the prompt. Without one, only completion
+    models (whose Ollama template is the bare prompt) take this path; instruct
+    models get the full prompt in their own template.
+    """
+
+    def __init__(
+        self,
+        base_url: str = OLLAMA_BASE_URL,
+        model: str = OLLAMA_MODEL,
+        max_connections: int = LLM_HTTP_POOL_SIZE,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        raw_template: str = OLLAMA_RAW_TEMPLATE,
+    ):
+        """
+        Initialize the Ollama client.
+
+        Args:
+            base_url: Ollama base URL
+            model: Ollama model to use
+            max_connections: Maximum concurrent connections to Ollama
+            connect_timeout: Connect timeout in seconds
+            read_timeout: Read timeout in seconds
+            raw_template: The model's instruction template with a {prompt} placeholder,
+                          for reusing prefixes in raw mode ("" detects completion models)
+        """
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError("OllamaLLMClient requires httpx: pip install httpx") from e
+
+        if raw_template and "{prompt}" not in raw_template:
+            raise ValueError("raw_template must contain a {prompt} placeholder")
+        self.model = model
+        self.raw_template = raw_template
+        self._template_task: Optional[asyncio.Future] = None
+        self._prefix_contexts = OrderedDict()  # cache_key -> Task resolving to token context
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def complete(self, prompt: str, prefix: str = "", cache_key: Optional[str] = None,
+                       format: Optional[Dict[str, Any]] = None) -> str:
+        payload = await self._payload(prompt, prefix, cache_key, format, stream=False)
+        response = await self._client.post("/api/generate", json=payload)
+        response.raise_for_status()
+        return response.json().get("response", "")
+
+    async def stream(self, prompt: str, prefix: str = "", cache_key: Optional[str] = None,
+                     format: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        payload = await self._payload(prompt, prefix, cache_key, format, stream=True)
+        async with self._client.stream("POST", "/api/generate", json=payload) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line (NDJSON)
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama stream error: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    return
+
+    async def _payload(self, prompt: str, prefix: str, cache_key: Optional[str],
+                       format: Optional[Dict[str, Any]], stream: bool) -> dict:
+        payload = {
+            "model": self.model,
+            "prompt": prefix + prompt,
+            "stream": stream,
+            # A schema constrains decoding to valid replies; "json" only guarantees well-formed JSON
+            "format": format or "json",
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {
+                "temperature": OLLAMA_TEMPERATURE,
+                "num_predict": OLLAMA_MAX_TOKENS
+            }
+        }
+        if prefix and cache_key is not None:
+            template = await self._raw_template()
+            if template is not None:
+                head, tail = template
+                context = await self._prefix_context(cache_key, head + prefix)
+                if context:
+                    payload.update(prompt=prompt + tail, context=context, raw=True)
+        return payload
+
+    async def _raw_template(self) -> Optional[Tuple[str, str]]:
+        """(start, end) to wrap raw prompts in, or None if prefixes can't be reused with this model."""
+        if self._template_task is None:
+            self._template_task = asyncio.ensure_future(self._resolve_raw_template())
+        try:
+            return await asyncio.shield(self._template_task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not read the prompt template of {self.model}, sending full prompts: {e}")
+            self._template_task = None
+            return None
+
+    async def _resolve_raw_template(self) -> Optional[Tuple[str, str]]:
+        if self.raw_template:
+            head, _, tail = self.raw_template.partition("{prompt}")
+            return head, tail
+        response = await self._client.post("/api/show", json={"model": self.model})
+        response.raise_for_status()
+        template = response.json().get("template", "")
+        if template.replace(" ", "") in ("", "{{.Prompt}}"):
+            return "", ""
+        logger.info(f"{self.model} has an instruction template; set OLLAMA_RAW_TEMPLATE to reuse persona prefixes")
+        return None
+
+    async def _prefix_context(self, cache_key: str, prefix: str) -> Optional[List[int]]:
+        """Returns the token context for a prefix, priming it once per key (concurrent callers share the work)."""
+        task = self._prefix_contexts.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._prime_prefix(prefix))
+            self._prefix_contexts[cache_key] = task
+            while len(self._prefix_contexts) > OLLAMA_PREFIX_CACHE_SIZE:
+                self._prefix_contexts.popitem(last=False)
+        else:
+            self._prefix_contexts.move_to_end(cache_key)
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not prime prompt prefix {cache_key}, sending full prompt: {e}")
+            if self._prefix_contexts.get(cache_key) is task:
+                del self._prefix_contexts[cache_key]
+            return None
+
+    async def _prime_prefix(self, prefix: str) -> List[int]:
+        payload = {
+            "model": self.model,
+            "prompt": prefix,
+            "raw": True,
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"num_predict": 1}
+        }
+        response = await self._client.post("/api/generate", json=payload)
+        response.raise_for_status()
+        data = response.json()
+        context = data.get("context") or []
+        # Drop the token generated while priming so only the prefix itself remains
+        generated = data.get("eval_count", 0)
+        return context[:len(context) - generated] if generated else context
+
+    async def aclose(self):
+        for task in self._prefix_contexts.values():
+            task.cancel()
+        self._prefix_contexts.clear()
+        await self._client.aclose()
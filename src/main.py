@@ -1,42 +1,172 @@
-from fastapi import FastAPI, Body
-from pydantic import BaseModel, Field
-from typing import Optional, Dict
-from .config import PROJECT_NAME, VERSION
-from .ai_response_model import generate_reply
-from .speech_to_text import transcribe_audio
-from .text_to_speech import synthesize_voice
+import asyncio
+from fastapi import FastAPI, Body, HTTPException, Request, WebSocket
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import AsyncIterator, Optional, Dict, Literal
+from .config import PROJECT_NAME, VERSION, STT_PCM_SAMPLE_RATE, AUDIO_STREAM_CHUNK_BYTES
+from .ai_response_model import generate_reply, stream_reply
+from .audio_io import AudioBuffer, PCMFormat, iter_chunks, parse_wav
+from .batch_scheduler import BatchScheduler, Priority
+from .metrics import CONTENT_TYPE, render_metrics
+from .speech_to_text import transcribe_audio, transcribe_bytes
+from .stt_engine import STTError, STTUnavailable, close_stt_backends, get_stt_backend
+from .text_to_speech import render_voice, synthesize_voice, tts_cache
+from .voice_session import VoiceSession
 
 app = FastAPI(title=PROJECT_NAME, version=VERSION)
 
+# Bounds concurrent LLM calls and serves player dialogue before ambient barks.
+# generate_reply is one blocking request per reply with no batch endpoint, so there
+# is no batch_handler: a closed batch starts its requests together, each on its own.
+chat_scheduler = BatchScheduler(
+    handler=lambda req: run_in_threadpool(generate_reply, req.text, req.context),
+)
+
+# Streamed voice replies bypass the scheduler but share its concurrency limit
+voice_slots = asyncio.Semaphore(chat_scheduler.max_in_flight)
+
+# Raw audio bodies accepted by /stt; JSON bodies carry base64 audio (compatibility mode)
+WAV_MEDIA_TYPES = {"audio/wav", "audio/x-wav", "audio/wave"}
+PCM_MEDIA_TYPES = {"audio/pcm", "application/octet-stream"}
+
 class STTRequest(BaseModel):
     audio_b64: str = Field(..., description="Base64 WAV/PCM")
     lang: Optional[str] = "en"
+    priority: Literal["dialogue", "ambient"] = "dialogue"
 
 class ChatRequest(BaseModel):
     text: str
     context: Dict = Field(default_factory=dict)
+    priority: Literal["dialogue", "ambient"] = "dialogue"
 
 class TTSRequest(BaseModel):
     text: str
     voice: Optional[str] = "female_hero"
 
+@app.on_event("startup")
+def warm_stt():
+    # Loads the STT engine (in its worker processes, for local models) before the first request
+    backend = get_stt_backend()
+    if not backend.wait_ready():
+        raise RuntimeError(f"STT engine {backend.engine_name} failed to start; see the log above")
+
+@app.on_event("shutdown")
+def close_stt():
+    close_stt_backends()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage latencies, time to first audio, turn latency, fallbacks and cache hits, for Prometheus to scrape."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+def _media_type(header: Optional[str]) -> str:
+    return (header or "").split(";")[0].strip().lower()
+
+async def _audio_chunks(buffer: AudioBuffer):
+    # Slices of the rendered buffer; nothing is copied before it reaches the socket
+    for chunk in iter_chunks(buffer, AUDIO_STREAM_CHUNK_BYTES):
+        yield chunk
+
+async def _transcribe_request(request: Request, media_type: str, lang: Optional[str], rate: int, width: int, channels: int,
+                              priority: str) -> str:
+    if media_type in WAV_MEDIA_TYPES or media_type in PCM_MEDIA_TYPES:
+        audio = await request.body()
+        pcm_format = PCMFormat(rate, width, channels)
+        try:
+            text = await run_in_threadpool(transcribe_bytes, audio, lang, pcm_format, Priority[priority.upper()])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid audio: {e}")
+    elif media_type in ("", "application/json"):
+        try:
+            req = STTRequest.model_validate(await request.json())
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        try:
+            text = await run_in_threadpool(transcribe_audio, req.audio_b64, req.lang, Priority[req.priority.upper()])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid audio: {e}")
+    else:
+        raise HTTPException(status_code=415, detail=f"Unsupported audio type: {media_type}")
+    return text
+
 @app.post("/stt")
-def stt(req: STTRequest):
-    text = transcribe_audio(req.audio_b64, req.lang)
+async def stt(request: Request, lang: Optional[str] = "en", rate: int = STT_PCM_SAMPLE_RATE, width: int = 2, channels: int = 1,
+              priority: Literal["dialogue", "ambient"] = "dialogue"):
+    """
+    Transcribes a raw audio/wav or audio/pcm body (16-bit mono at `rate` unless
+    `width`/`channels` say otherwise), or a JSON STTRequest with base64 audio.
+    When the STT workers are busy, dialogue requests are transcribed before ambient ones.
+    """
+    media_type = _media_type(request.headers.get("content-type"))
+    try:
+        text = await _transcribe_request(request, media_type, lang, rate, width, channels, priority)
+    except STTUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Speech recognition unavailable: {e}")
+    except STTError as e:
+        raise HTTPException(status_code=502, detail=f"Speech recognition failed: {e}")
     return {"text": text}
 
 @app.post("/chat")
-def chat(req: ChatRequest):
-    reply = generate_reply(req.text, req.context)
+async def chat(req: ChatRequest):
+    reply = await chat_scheduler.submit(req, Priority[req.priority.upper()])
     return {"reply": reply}
 
+@app.get("/chat/stats")
+def chat_stats():
+    return chat_scheduler.stats()
+
 @app.post("/tts")
-def tts(req: TTSRequest):
-    audio_b64 = synthesize_voice(req.text, req.voice)
+async def tts(req: TTSRequest, request: Request):
+    """
+    Streams the voice line as chunked audio/wav, or as headerless audio/pcm
+    frames described by X-Audio-* headers, when the Accept header asks for it.
+    Otherwise returns base64 WAV in JSON (compatibility mode).
+    """
+    accept = request.headers.get("accept", "").lower()
+    if "audio/pcm" in accept:
+        audio = await run_in_threadpool(render_voice, req.text, req.voice)
+        try:
+            pcm_format, frames = parse_wav(audio)
+        except ValueError as e:
+            raise HTTPException(status_code=502, detail=f"TTS engine did not return PCM audio: {e}")
+        headers = {
+            "X-Audio-Sample-Rate": str(pcm_format.sample_rate),
+            "X-Audio-Sample-Width": str(pcm_format.sample_width),
+            "X-Audio-Channels": str(pcm_format.channels),
+        }
+        return StreamingResponse(_audio_chunks(frames), media_type="audio/pcm", headers=headers)
+    if "audio/wav" in accept:
+        audio = await run_in_threadpool(render_voice, req.text, req.voice)
+        return StreamingResponse(_audio_chunks(audio), media_type="audio/wav")
+
+    audio_b64 = await run_in_threadpool(synthesize_voice, req.text, req.voice)
     return {"audio_b64": audio_b64}
 
+@app.get("/stt/stats")
+def stt_stats():
+    return get_stt_backend().stats()
+
+@app.get("/tts/stats")
+def tts_stats():
+    if tts_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **tts_cache.stats()}
+
+@app.websocket("/voice")
+async def voice(websocket: WebSocket, lang: str = "en", voice: str = "female_hero", rate: int = STT_PCM_SAMPLE_RATE):
+    """Speech in, speech out: one pipelined conversation per connection (protocol in VoiceSession)."""
+    await websocket.accept()
+
+    async def respond(text: str, context: Dict) -> AsyncIterator[str]:
+        async with voice_slots:
+            async for piece in iterate_in_threadpool(stream_reply(text, context)):
+                yield piece
+
+    await VoiceSession(websocket, respond, lang=lang, voice=voice, pcm_format=PCMFormat(rate)).run()
+
 # Run: uvicorn Backend.main:app --reload
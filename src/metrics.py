@@ -0,0 +1,238 @@
+"""
+Metrics Module
+Low-overhead counters, histograms and stage timers exposed in Prometheus text format
+"""
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached lookup up to a slow LLM turn
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    """A named metric with optional labels; each label combination is a child created on first use."""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: str):
+        """
+        The child for one label combination. Bind it once (e.g. at import time)
+        on hot paths, so recording a value does no label handling.
+        """
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child holding the values of one label combination."""
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every child."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. fallbacks served or cache hits."""
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        self.labels(**labels).inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class Timer:
+    """
+    Times a block or a function into a histogram: `with histogram.time():` or `@histogram.time()`.
+    Only blocks that finish without an exception are recorded, so timeouts and
+    errors (counted separately) do not skew the latency distribution.
+    """
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+        self._started_at = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self._child.observe(time.perf_counter() - self._started_at)
+
+    def __call__(self, func: Callable) -> Callable:
+        child = self._child
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def timed_async(*args, **kwargs):
+                started_at = time.perf_counter()
+                result = await func(*args, **kwargs)
+                child.observe(time.perf_counter() - started_at)
+                return result
+            return timed_async
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started_at = time.perf_counter()
+            result = func(*args, **kwargs)
+            child.observe(time.perf_counter() - started_at)
+            return result
+        return timed
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> Timer:
+        return Timer(self)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values (latencies, in seconds) over fixed buckets."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float, **labels: str):
+        self.labels(**labels).observe(value)
+
+    def time(self, **labels: str) -> Timer:
+        return self.labels(**labels).time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of one process, rendered together for a /metrics scrape."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# --- Pipeline metrics shared by the voice pipeline and both servers ---
+STAGE_SECONDS = histogram("npc_stage_seconds", "Duration of one pipeline stage.", ["stage"])
+TIME_TO_FIRST_TOKEN = histogram("npc_time_to_first_token_seconds", "Request start until the LLM produced its first token.")
+TIME_TO_FIRST_AUDIO = histogram("npc_time_to_first_audio_seconds", "Player input until the NPC's first audio started.")
+TURN_SECONDS = histogram("npc_turn_seconds", "End-to-end latency of one conversation turn.")
+FALLBACKS = counter("npc_fallbacks_total", "Replies replaced by a fallback message, by reason.", ["reason"])
+CACHE_LOOKUPS = counter("npc_cache_lookups_total", "Cache lookups, by cache and result.", ["cache", "result"])
+
+
+def stage_timer(stage: str) -> Timer:
+    """Timer for one pipeline stage, usable as `with stage_timer("listen"):` or `@stage_timer("listen")`."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def render_metrics(registry: Optional[MetricsRegistry] = None) -> str:
+    """Every metric in Prometheus text format."""
+    return (registry or REGISTRY).render()
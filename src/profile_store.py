@@ -0,0 +1,305 @@
+"""
+NPC Profile Store Module
+Indexed, lazily loaded NPC profiles from a directory of JSON/YAML files or an SQLite file
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from src.config import NPC_PROFILE_CACHE_SIZE, NPC_PROFILE_RELOAD_INTERVAL, NPC_PROFILE_SOURCE
+from src.knowledge_base import split_passages
+
+logger = logging.getLogger(__name__)
+
+PROFILE_EXTENSIONS = (".json", ".yaml", ".yml")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+
+# --- NPC Profile: The "Soul" of the Character ---
+class NPCProfile:
+    """Holds the static, authored data for an NPC's personality."""
+    def __init__(self, name: str, backstory: str, personality_traits: List[str], core_knowledge: str, dialogue_style: str, version: int = 1,
+                 canned_lines: Optional[List[str]] = None, knowledge: Union[str, List[str], None] = None):
+        self.name = name
+        self.backstory = backstory
+        self.personality_traits = ", ".join(personality_traits)
+        self.core_knowledge = core_knowledge
+        self.dialogue_style = dialogue_style
+        self.version = version
+        self.canned_lines = canned_lines or []  # fixed lines (greetings, refusals) pre-rendered into the audio cache
+        # Lore passages retrieved into the prompt only when relevant, unlike core_knowledge which is always included
+        self.knowledge = split_passages(knowledge) if isinstance(knowledge, str) else list(knowledge or [])
+        self._prompt_prefix = None  # (version, text)
+
+    @property
+    def prompt_prefix(self) -> str:
+        """The static persona and knowledge block of the prompt, built once per profile version."""
+        if self._prompt_prefix is None or self._prompt_prefix[0] != self.version:
+            text = "".join([
+                # 1. Persona Definition
+                f"You are {self.name}. Your personality is: {self.personality_traits}. Your backstory: {self.backstory}. Your dialogue style: {self.dialogue_style}\n\n",
+                # 2. Core Knowledge
+                f"Relevant world knowledge you possess: {self.core_knowledge}\n\n",
+            ])
+            self._prompt_prefix = (self.version, text)
+        return self._prompt_prefix[1]
+
+    def update(self, **fields):
+        """Edits authored fields and bumps the version so cached prompt prefixes are rebuilt."""
+        if "personality_traits" in fields and not isinstance(fields["personality_traits"], str):
+            fields["personality_traits"] = ", ".join(fields["personality_traits"])
+        for field_name, value in fields.items():
+            setattr(self, field_name, value)
+        self.version += 1
+
+
+# An index entry: where the profile lives and a stamp that changes when it is edited
+Location = Any
+Stamp = Any
+
+
+class ProfileStore(ABC):
+    """
+    Base class for profile stores: an id -> location index built at startup,
+    profiles parsed on first use and kept in an LRU of hot profiles.
+
+    Only the index is resident, so startup time and memory grow with the number
+    of ids, not with the size of the profiles. A background thread polls the
+    source for edits; a changed profile is evicted and gets a new version, so
+    its cached prompt prefix (and the LLM's primed context, keyed by version)
+    is rebuilt, and change listeners are notified.
+    """
+
+    def __init__(self, cache_size: int = NPC_PROFILE_CACHE_SIZE, reload_interval: float = NPC_PROFILE_RELOAD_INTERVAL):
+        """
+        Initialize the store and build its index.
+
+        Args:
+            cache_size: Parsed profiles kept in memory
+            reload_interval: Seconds between checks for edited profiles (0 disables hot reload)
+        """
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self._index: Dict[str, Tuple[Location, Stamp, int]] = {}  # id -> (location, stamp, version)
+        self._hot: "OrderedDict[str, NPCProfile]" = OrderedDict()
+        self._listeners: List[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.loads = 0
+        self.reloads = 0
+
+        self._index = {npc_id: (location, stamp, 1) for npc_id, (location, stamp) in self._scan().items()}
+        logger.info(f"Indexed {len(self._index)} NPC profiles")
+        if reload_interval > 0:
+            self._watcher = threading.Thread(target=self._watch, name="profile-reload", daemon=True)
+            self._watcher.start()
+
+    def __contains__(self, npc_id: str) -> bool:
+        return npc_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def ids(self) -> List[str]:
+        return list(self._index)
+
+    def get(self, npc_id: str) -> Optional[NPCProfile]:
+        """
+        Look up a profile, parsing it on first use.
+
+        Returns:
+            The profile, or None if the id is unknown or its file is unreadable
+        """
+        with self._lock:
+            profile = self._hot.get(npc_id)
+            if profile is not None:
+                self._hot.move_to_end(npc_id)
+                return profile
+            entry = self._index.get(npc_id)
+        if entry is None:
+            return None
+
+        location, _, version = entry
+        try:
+            data = self._load(location)
+            profile = NPCProfile(
+                name=data["name"],
+                backstory=data["backstory"],
+                personality_traits=data.get("personality_traits", []),
+                core_knowledge=data.get("core_knowledge", ""),
+                dialogue_style=data.get("dialogue_style", ""),
+                version=version,
+                canned_lines=data.get("canned_lines"),
+                knowledge=data.get("knowledge"),
+            )
+        except Exception as e:
+            logger.error(f"Failed to load NPC profile {npc_id}: {e}")
+            return None
+
+        with self._lock:
+            # Keep the copy another thread may have loaded, unless it was reloaded since
+            if self._index.get(npc_id) is entry:
+                profile = self._hot.setdefault(npc_id, profile)
+                self._hot.move_to_end(npc_id)
+                while len(self._hot) > self.cache_size:
+                    self._hot.popitem(last=False)
+            self.loads += 1
+        return profile
+
+    def profiles(self) -> Iterator[Tuple[str, NPCProfile]]:
+        """Every profile, loaded one at a time (for offline jobs such as audio pre-warming)."""
+        for npc_id in self.ids():
+            profile = self.get(npc_id)
+            if profile is not None:
+                yield npc_id, profile
+
+    def on_change(self, listener: Callable[[str], None]):
+        """Calls listener(npc_id) from the reload thread whenever a profile is edited, added or removed."""
+        self._listeners.append(listener)
+
+    def reload(self) -> List[str]:
+        """
+        Re-scan the source now.
+
+        Returns:
+            Ids whose profiles were edited, added or removed
+        """
+        scanned = self._scan()
+        changed = []
+        with self._lock:
+            for npc_id in list(self._index):
+                if npc_id not in scanned:
+                    del self._index[npc_id]
+                    self._hot.pop(npc_id, None)
+                    changed.append(npc_id)
+            for npc_id, (location, stamp) in scanned.items():
+                entry = self._index.get(npc_id)
+                if entry is not None and entry[1] == stamp:
+                    continue
+                version = entry[2] + 1 if entry is not None else 1
+                self._index[npc_id] = (location, stamp, version)
+                self._hot.pop(npc_id, None)
+                changed.append(npc_id)
+            self.reloads += len(changed)
+
+        for npc_id in changed:
+            logger.info(f"NPC profile {npc_id} changed, reloading")
+            for listener in self._listeners:
+                try:
+                    listener(npc_id)
+                except Exception as e:
+                    logger.error(f"Profile change listener failed for {npc_id}: {e}")
+        return changed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"indexed": len(self._index), "hot": len(self._hot), "loads": self.loads, "reloads": self.reloads}
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=5)
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"NPC profile reload failed: {e}")
+
+    @abstractmethod
+    def _scan(self) -> Dict[str, Tuple[Location, Stamp]]:
+        """Returns id -> (location, stamp) for every profile, without parsing any of them."""
+
+    @abstractmethod
+    def _load(self, location: Location) -> Dict[str, Any]:
+        """Reads and parses one profile."""
+
+
+class DirectoryProfileStore(ProfileStore):
+    """Profiles as <npc_id>.json / .yaml / .yml files in one directory; edits are detected by mtime and size."""
+
+    def __init__(self, directory: str, **kwargs):
+        self.directory = directory
+        super().__init__(**kwargs)
+
+    def _scan(self) -> Dict[str, Tuple[Location, Stamp]]:
+        found = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            logger.warning(f"NPC profile directory {self.directory} does not exist")
+            return found
+        for entry in entries:
+            npc_id, extension = os.path.splitext(entry.name)
+            if extension.lower() in PROFILE_EXTENSIONS and entry.is_file():
+                stat = entry.stat()
+                found[npc_id] = (entry.name, (stat.st_mtime_ns, stat.st_size))
+        return found
+
+    def _load(self, location: Location) -> Dict[str, Any]:
+        path = os.path.join(self.directory, location)
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                return json.load(f)
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("YAML NPC profiles require PyYAML: pip install pyyaml") from e
+            return yaml.safe_load(f)
+
+
+class SQLiteProfileStore(ProfileStore):
+    """
+    Profiles as JSON rows of an SQLite table:
+
+        CREATE TABLE npc_profiles (npc_id TEXT PRIMARY KEY, profile TEXT NOT NULL, updated_at REAL NOT NULL)
+
+    The index maps ids to rowids. Edits are detected by updated_at, and the
+    scan is skipped entirely while the database has not been written to.
+    """
+
+    def __init__(self, path: str, **kwargs):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._db_lock = threading.Lock()
+        self._data_version = None
+        super().__init__(**kwargs)
+
+    def reload(self) -> List[str]:
+        with self._db_lock:
+            data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return []
+        self._data_version = data_version
+        return super().reload()
+
+    def _scan(self) -> Dict[str, Tuple[Location, Stamp]]:
+        with self._db_lock:
+            rows = self._connection.execute("SELECT npc_id, rowid, updated_at FROM npc_profiles").fetchall()
+        return {npc_id: (rowid, updated_at) for npc_id, rowid, updated_at in rows}
+
+    def _load(self, location: Location) -> Dict[str, Any]:
+        with self._db_lock:
+            row = self._connection.execute("SELECT profile FROM npc_profiles WHERE rowid = ?", (location,)).fetchone()
+        if row is None:
+            raise KeyError(f"row {location} no longer exists")
+        return json.loads(row[0])
+
+    def close(self):
+        super().close()
+        with self._db_lock:
+            self._connection.close()
+
+
+def open_profile_store(source: str = NPC_PROFILE_SOURCE, **kwargs) -> ProfileStore:
+    """Opens an SQLite store for .db/.sqlite files, otherwise a directory store."""
+    if source.lower().endswith(SQLITE_EXTENSIONS):
+        return SQLiteProfileStore(source, **kwargs)
+    return DirectoryProfileStore(source, **kwargs)
@@ -0,0 +1,225 @@
+"""
+Response Cache Module
+Exact and semantic caching of NPC replies in front of the LLM
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_SEMANTIC, RESPONSE_CACHE_SIMILARITY
+from src.embeddings import HashingEmbedder
+from src.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+_HIT = CACHE_LOOKUPS.labels(cache="response", result="hit")
+_SEMANTIC_HIT = CACHE_LOOKUPS.labels(cache="response", result="semantic_hit")
+_MISS = CACHE_LOOKUPS.labels(cache="response", result="miss")
+
+
+def normalize_input(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace, so "Hello!" and "hello" share a key."""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def fingerprint(lines: Sequence[str]) -> str:
+    """Short stable digest of a conversation history (or any list of strings)."""
+    digest = hashlib.blake2b(digest_size=8)
+    for line in lines:
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class _VectorIndex:
+    """
+    Growable matrix of unit vectors, each tagged with a context group.
+
+    Rows are packed densely; removing a row moves the last row into its slot, so
+    nearest-neighbour search is a single masked matrix-vector product.
+    """
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._groups = np.zeros(capacity, dtype=np.int64)
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+
+    def add(self, key: str, vector: np.ndarray, group: int):
+        if key in self._rows:
+            self.remove(key)
+        row = len(self._keys)
+        if row == self._vectors.shape[0]:
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+            self._groups = np.concatenate([self._groups, np.zeros_like(self._groups)])
+        self._vectors[row] = vector
+        self._groups[row] = group
+        self._keys.append(key)
+        self._rows[key] = row
+
+    def remove(self, key: str):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            moved = self._keys[last]
+            self._vectors[row] = self._vectors[last]
+            self._groups[row] = self._groups[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+        self._keys.pop()
+
+    def nearest(self, vector: np.ndarray, group: int) -> Tuple[Optional[str], float]:
+        count = len(self._keys)
+        if not count:
+            return None, 0.0
+        candidates = np.flatnonzero(self._groups[:count] == group)
+        if not candidates.size:
+            return None, 0.0
+        scores = self._vectors[candidates] @ vector
+        best = int(np.argmax(scores))
+        return self._keys[candidates[best]], float(scores[best])
+
+
+class ResponseCache:
+    """
+    LRU cache of LLM replies keyed on NPC, normalised player input, available
+    actions and a history fingerprint.
+
+    The exact tier matches normalised input. The optional semantic tier also
+    matches paraphrases ("hi there" / "hello there") within the same NPC, action
+    set and history, using cosine similarity over hashed embeddings.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        semantic: bool = RESPONSE_CACHE_SEMANTIC,
+        similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+        embedder: Optional[HashingEmbedder] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum cached replies before least-recently-used eviction
+            semantic: Enable the embedding-similarity tier
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            embedder: Embedder for the semantic tier (default: HashingEmbedder)
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embedder = (embedder or HashingEmbedder()) if semantic else None
+        self._index = _VectorIndex(self.embedder.dim) if self.embedder else None
+        self._entries: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()  # key -> (npc_id, value)
+        self._by_npc: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _keys(self, npc_id: str, player_input: str, actions: Sequence[str], history: Sequence[str]) -> Tuple[str, str, str]:
+        text = normalize_input(player_input)
+        context = json.dumps([npc_id, sorted(actions), fingerprint(history)])
+        return f"{context}|{text}", context, text
+
+    @staticmethod
+    def _group(context: str) -> int:
+        # Integer tag per (npc, actions, history) context for the vector index
+        return int.from_bytes(hashlib.blake2b(context.encode("utf-8"), digest_size=7).digest(), "little")
+
+    def get(self, npc_id: str, player_input: str, actions: Sequence[str] = (), history: Sequence[str] = ()) -> Optional[Any]:
+        """
+        Look up a cached reply.
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        key, context, text = self._keys(npc_id, player_input, actions, history)
+        vector = self.embedder.embed(text) if self.embedder is not None and text else None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                _HIT.inc()
+                return entry[1]
+
+            if vector is not None:
+                match, score = self._index.nearest(vector, self._group(context))
+                if match is not None and score >= self.similarity_threshold:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    _SEMANTIC_HIT.inc()
+                    return self._entries[match][1]
+
+            self.misses += 1
+            _MISS.inc()
+            return None
+
+    def put(self, npc_id: str, player_input: str, value: Any, actions: Sequence[str] = (), history: Sequence[str] = ()):
+        """Store a reply, evicting the least recently used entries beyond max_entries."""
+        key, context, text = self._keys(npc_id, player_input, actions, history)
+        vector = self.embedder.embed(text) if self.embedder is not None and text else None
+        with self._lock:
+            self._entries[key] = (npc_id, value)
+            self._entries.move_to_end(key)
+            self._by_npc.setdefault(npc_id, set()).add(key)
+            if vector is not None:
+                self._index.add(key, vector, self._group(context))
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_npc(self, npc_id: str) -> int:
+        """
+        Drop every cached reply for one NPC (e.g. after editing its profile).
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = self._by_npc.pop(npc_id, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, hit/miss counters and hit rate."""
+        lookups = self.hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key: str):
+        npc_id, _ = self._entries.pop(key)
+        keys = self._by_npc.get(npc_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_npc[npc_id]
+        if self._index is not None:
+            self._index.remove(key)
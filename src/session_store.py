@@ -0,0 +1,153 @@
+"""
+Session Store Module
+Server-side conversation history for player-NPC sessions
+"""
+
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+from src.config import SESSION_MAX_TURNS, SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS, SESSION_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationSession:
+    """Conversation between one player and one NPC, kept as a bounded ring buffer of lines."""
+
+    def __init__(self, session_id: str, npc_id: str, player_id: str, max_turns: int):
+        self.session_id = session_id
+        self.npc_id = npc_id
+        self.player_id = player_id
+        self.turns = deque(maxlen=max_turns)
+        self.size = 0  # approximate bytes held in turns
+        self.last_used = time.monotonic()
+
+    @property
+    def history(self) -> List[str]:
+        return list(self.turns)
+
+
+class SessionStore:
+    """
+    In-memory session store keyed by (npc_id, player_id).
+
+    Sessions are kept in least-recently-used order and evicted when they outlive
+    the TTL, when there are too many, or when their combined history exceeds the
+    memory cap. Intended to be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = SESSION_MAX_TURNS,
+        ttl: float = SESSION_TTL_SECONDS,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        max_bytes: int = SESSION_MAX_BYTES,
+    ):
+        """
+        Initialize the session store.
+
+        Args:
+            max_turns: History lines kept per session (oldest are dropped first)
+            ttl: Seconds of inactivity before a session expires
+            max_sessions: Maximum number of live sessions
+            max_bytes: Approximate cap on history held across all sessions
+        """
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._by_key: Dict[Tuple[str, str], str] = {}
+        self._total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def open(self, npc_id: str, player_id: str) -> ConversationSession:
+        """
+        Return the live session for this NPC and player, creating one if needed.
+
+        Args:
+            npc_id: NPC identifier
+            player_id: Player identifier
+
+        Returns:
+            The session
+        """
+        self._expire()
+        session_id = self._by_key.get((npc_id, player_id))
+        if session_id is not None:
+            return self._touch(self._sessions[session_id])
+
+        session = ConversationSession(uuid.uuid4().hex, npc_id, player_id, self.max_turns)
+        self._sessions[session.session_id] = session
+        self._by_key[(npc_id, player_id)] = session.session_id
+        while len(self._sessions) > self.max_sessions:
+            self._evict_oldest()
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """
+        Look up a session by id.
+
+        Returns:
+            The session, or None if it is unknown or has expired
+        """
+        self._expire()
+        session = self._sessions.get(session_id)
+        return self._touch(session) if session is not None else None
+
+    def append(self, session: ConversationSession, *lines: str):
+        """
+        Add lines to a session's history, dropping the oldest beyond max_turns.
+        Does nothing if the session was closed, expired or evicted in the meantime.
+        """
+        if self._sessions.get(session.session_id) is not session:
+            return
+        for line in lines:
+            if len(session.turns) == session.turns.maxlen:
+                dropped = len(session.turns[0])
+                session.size -= dropped
+                self._total_bytes -= dropped
+            session.turns.append(line)
+            session.size += len(line)
+            self._total_bytes += len(line)
+
+        # Evict other idle sessions first; the active one is most recently used
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            self._evict_oldest()
+
+    def close(self, session_id: str) -> bool:
+        """Remove a session. Returns True if it existed."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        self._remove(session)
+        return True
+
+    def _touch(self, session: ConversationSession) -> ConversationSession:
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session.session_id)
+        return session
+
+    def _expire(self):
+        # LRU order is also last-used order, so expired sessions are at the front
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if oldest.last_used > cutoff:
+                break
+            self._remove(oldest)
+
+    def _evict_oldest(self):
+        oldest = next(iter(self._sessions.values()))
+        logger.info(f"Evicting session {oldest.session_id} ({oldest.npc_id}, {oldest.player_id})")
+        self._remove(oldest)
+
+    def _remove(self, session: ConversationSession):
+        del self._sessions[session.session_id]
+        self._by_key.pop((session.npc_id, session.player_id), None)
+        self._total_bytes -= session.size
@@ -1,62 +1,334 @@
 """
 Speech Recognition Module
-Converts audio input to text using Google's Speech Recognition API
+Captures the player's phrases and converts them to text with a pluggable STT engine
 """
 
 import logging
-from typing import Optional
+import queue
+import threading
+import time
+from typing import Callable, List, Optional
 
 # Import speech recognition after audio compatibility is set up
+from src import audio_compat  # noqa: F401
 import speech_recognition as sr
 
+from src.audio_io import PCMFormat
+from src.config import SPEECH_PHRASE_TIME_LIMIT, SPEECH_STT_ENGINE, SPEECH_VAD_BUFFER_SECONDS, SPEECH_VAD_ENABLED
+from src.metrics import stage_timer
+from src.stt_engine import STTError, get_stt_backend
+from src.vad import PHRASE_END, SPEECH_START, Endpointer, RingBuffer, to_pcm16
+
 logger = logging.getLogger(__name__)
 
+# How long the capture thread waits for a phrase before re-checking for stop requests
+STREAM_POLL_SECONDS = 1.0
+
+# Frames per read from a WavFileSource (sr.Microphone's default chunk size)
+WAV_CHUNK_FRAMES = 1024
+
+
+class WavFileSource(sr.AudioSource):
+    """
+    Stand-in for sr.Microphone that plays WAV files back to back.
+    
+    Lets the continuous capture mode run offline (e.g. in tests) with recorded
+    speech. All files must share sample rate and width.
+    """
+    
+    # Audio is read faster than real time, so capture waits for the VAD instead of dropping audio
+    realtime = False
+    
+    def __init__(self, paths: List[str]):
+        """
+        Args:
+            paths: WAV/AIFF/FLAC files, played in order
+        """
+        self.paths = list(paths)
+        self.stream = None
+        self.exhausted = False
+        self._files = []
+    
+    def __enter__(self):
+        self._files = [sr.AudioFile(path).__enter__() for path in self.paths]
+        first = self._files[0]
+        for audio_file in self._files[1:]:
+            if (audio_file.SAMPLE_RATE, audio_file.SAMPLE_WIDTH) != (first.SAMPLE_RATE, first.SAMPLE_WIDTH):
+                raise ValueError("All WAV files must share sample rate and sample width")
+        self.SAMPLE_RATE = first.SAMPLE_RATE
+        self.SAMPLE_WIDTH = first.SAMPLE_WIDTH
+        # Microphone-sized buffers: the energy loop counts pauses in whole buffers
+        self.CHUNK = WAV_CHUNK_FRAMES
+        self.stream = self
+        self._current = 0
+        return self
+    
+    def read(self, size: int) -> bytes:
+        """Read from the current file, moving on to the next one when it runs out."""
+        while self._current < len(self._files):
+            data = self._files[self._current].stream.read(size)
+            if data:
+                return data
+            self._current += 1
+        self.exhausted = True
+        return b""
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        for audio_file in self._files:
+            audio_file.__exit__(exc_type, exc_value, traceback)
+        self.stream = None
+
 
 class SpeechRecognizer:
     """Handles speech recognition from microphone input."""
     
-    def __init__(self, language: str = "en-US", timeout: int = 10):
+    def __init__(self, language: str = "en-US", timeout: int = 10, use_vad: bool = SPEECH_VAD_ENABLED,
+                 stt_engine: str = SPEECH_STT_ENGINE):
         """
         Initialize the speech recognizer.
         
         Args:
             language: Language code (default: en-US)
             timeout: Timeout for listening in seconds
+            use_vad: End phrases with the built-in VAD (see src.vad) instead of
+                     speech_recognition's energy threshold loop
+            stt_engine: Engine that transcribes phrases (see src.stt_engine), shared with /stt
         """
         self.recognizer = sr.Recognizer()
         self.language = language
         self.timeout = timeout
+        self.use_vad = use_vad
+        self.stt = get_stt_backend(stt_engine)
+        # Called from the capture thread as soon as the player starts talking (e.g. to barge in)
+        self.on_speech_start: Optional[Callable[[], None]] = None
+        self.calibrated = False
+        # time.perf_counter() at which the phrase last returned by listen() ended
+        self.phrase_ended_at: Optional[float] = None
+        self._phrases = queue.Queue()  # (phrase, ended at) in continuous mode, then None
+        self._capture_thread = None
+        self._stop_capture = threading.Event()
     
-    def listen(self) -> Optional[str]:
+    @property
+    def is_streaming(self) -> bool:
+        """True while the continuous capture thread is running."""
+        return self._capture_thread is not None and self._capture_thread.is_alive()
+    
+    def start_stream(self, source_factory: Callable[[], sr.AudioSource] = sr.Microphone):
         """
-        Listen to microphone input and convert to text.
+        Start continuous capture on a background thread.
         
-        Returns:
-            Recognized text or None if recognition fails
+        The audio source stays open across turns and each detected phrase is
+        queued for `listen()`, so the next phrase is recorded while the previous
+        one is being recognized and answered. With the VAD, the capture thread
+        only copies audio into a ring buffer and a second thread endpoints it;
+        otherwise the energy threshold is calibrated once and then tracked
+        incrementally.
+        
+        Args:
+            source_factory: Creates the audio source (default: the microphone;
+                            use WavFileSource for offline runs)
         """
+        if self.is_streaming:
+            return
+        self._stop_capture.clear()
+        self._phrases = queue.Queue()
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop, args=(source_factory,), name="speech-capture", daemon=True
+        )
+        self._capture_thread.start()
+    
+    def stop_stream(self):
+        """Stop continuous capture and close the audio source."""
+        self._stop_capture.set()
+        if self._capture_thread is not None:
+            self._capture_thread.join(timeout=STREAM_POLL_SECONDS * 2)
+            self._capture_thread = None
+    
+    def _calibrate(self, source: sr.AudioSource):
+        """Measure ambient noise once; later turns reuse (and incrementally adapt) the threshold."""
+        if self.calibrated:
+            return
+        if not getattr(source, "realtime", True):
+            # Calibrating would consume the first second of a recording, and with it any phrase there;
+            # the default threshold is kept and adapted while listening instead
+            self.recognizer.dynamic_energy_threshold = True
+            self.calibrated = True
+            return
+        self.recognizer.adjust_for_ambient_noise(source, duration=1)
+        self.recognizer.dynamic_energy_threshold = True
+        self.calibrated = True
+        logger.info(f"Calibrated energy threshold: {self.recognizer.energy_threshold:.0f}")
+    
+    def _is_silence(self, audio: sr.AudioData) -> bool:
+        import audioop
+        return audioop.rms(audio.frame_data, audio.sample_width) <= self.recognizer.energy_threshold
+    
+    def _speech_started(self):
+        if self.on_speech_start is not None:
+            try:
+                self.on_speech_start()
+            except Exception as e:
+                logger.error(f"Speech start callback failed: {e}")
+    
+    def _phrase_audio(self, samples, source: sr.AudioSource) -> sr.AudioData:
+        return sr.AudioData(samples.astype("<i2").tobytes(), source.SAMPLE_RATE, 2)
+    
+    def _capture_loop(self, source_factory: Callable[[], sr.AudioSource]):
+        if self.use_vad:
+            self._capture_loop_vad(source_factory)
+            return
         try:
-            with sr.Microphone() as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=1)
+            with source_factory() as source:
+                self._calibrate(source)
+                # A recording is read faster than real time, so polling would cut pre-roll off phrases
+                realtime = getattr(source, "realtime", True)
+                while not self._stop_capture.is_set():
+                    try:
+                        audio = self.recognizer.listen(
+                            source,
+                            timeout=STREAM_POLL_SECONDS if realtime else None,
+                            phrase_time_limit=SPEECH_PHRASE_TIME_LIMIT
+                        )
+                    except sr.WaitTimeoutError:
+                        continue
+                    exhausted = getattr(source, "exhausted", False)
+                    # At the end of a stream listen() returns whatever it buffered, even if nobody spoke
+                    if audio.frame_data and not (exhausted and self._is_silence(audio)):
+                        self._phrases.put((audio, time.perf_counter()))
+                    if exhausted:
+                        break
+        except Exception as e:
+            logger.error(f"Continuous capture stopped: {e}")
+        finally:
+            # Tells listen() that no more phrases will arrive
+            self._phrases.put(None)
+    
+    def _capture_loop_vad(self, source_factory: Callable[[], sr.AudioSource]):
+        endpoint_thread = None
+        ring = None
+        try:
+            with source_factory() as source:
+                ring = RingBuffer(int(SPEECH_VAD_BUFFER_SECONDS * source.SAMPLE_RATE))
+                endpoint_thread = threading.Thread(
+                    target=self._endpoint_loop, args=(ring, source), name="speech-vad", daemon=True
+                )
+                endpoint_thread.start()
+                block = not getattr(source, "realtime", True)
+                while not self._stop_capture.is_set():
+                    data = source.stream.read(source.CHUNK)
+                    if not data:
+                        break
+                    ring.write(to_pcm16(data, source.SAMPLE_WIDTH), block=block)
+        except Exception as e:
+            logger.error(f"Continuous capture stopped: {e}")
+        finally:
+            if ring is not None:
+                ring.close()
+            if endpoint_thread is not None:
+                endpoint_thread.join()
+                if ring.overruns:
+                    logger.warning(f"Speech capture overran the VAD by {ring.overruns} samples")
+            # Tells listen() that no more phrases will arrive
+            self._phrases.put(None)
+    
+    def _endpoint_loop(self, ring: RingBuffer, source: sr.AudioSource):
+        """Runs the VAD over the ring buffer, queueing each phrase as soon as it ends."""
+        endpointer = Endpointer(source.SAMPLE_RATE)
+        while True:
+            samples = ring.read(ring.capacity, timeout=STREAM_POLL_SECONDS)
+            if samples is None:
+                continue
+            events = endpointer.process(samples) if len(samples) else endpointer.flush()
+            for event in events:
+                if event.kind == SPEECH_START:
+                    self._speech_started()
+                elif event.kind == PHRASE_END:
+                    self._phrases.put((self._phrase_audio(event.audio, source), time.perf_counter()))
+            if not len(samples):
+                return
+    
+    def _listen_vad(self, source: sr.AudioSource) -> sr.AudioData:
+        """Record one phrase from an open source, ending it as soon as the VAD hears the player stop."""
+        endpointer = Endpointer(source.SAMPLE_RATE)
+        waited = 0.0
+        while True:
+            data = source.stream.read(source.CHUNK)
+            if not data:
+                events = endpointer.flush()
+            else:
+                events = endpointer.process(to_pcm16(data, source.SAMPLE_WIDTH))
+                waited += len(data) / (source.SAMPLE_WIDTH * source.SAMPLE_RATE)
+            for event in events:
+                if event.kind == SPEECH_START:
+                    self._speech_started()
+                elif event.kind == PHRASE_END:
+                    return self._phrase_audio(event.audio, source)
+            if not data or (waited > self.timeout and not endpointer.in_phrase):
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+    
+    @stage_timer("listen")
+    def _next_phrase(self) -> Optional[sr.AudioData]:
+        """
+        Wait for the player's next phrase.
+        
+        Returns:
+            The recorded phrase, or None once a continuous stream has ended
+        """
+        if self._capture_thread is not None:
+            # Continuous mode: take the next phrase the capture thread recorded
+            print("Listening... (speak now)")
+            try:
+                phrase = self._phrases.get(timeout=self.timeout)
+            except queue.Empty:
+                raise sr.WaitTimeoutError("no phrase captured")
+            if phrase is None:
+                logger.info("Audio stream ended")
+                self._capture_thread = None
+                return None
+            audio, self.phrase_ended_at = phrase
+            return audio
+        
+        with sr.Microphone() as source:
+            if self.use_vad:
+                print("Listening... (speak now)")
+                audio = self._listen_vad(source)
+            else:
+                # Adjust for ambient noise (first turn only)
+                self._calibrate(source)
                 
                 print("Listening... (speak now)")
                 audio = self.recognizer.listen(
                     source,
                     timeout=self.timeout,
-                    phrase_time_limit=30
+                    phrase_time_limit=SPEECH_PHRASE_TIME_LIMIT
                 )
+        self.phrase_ended_at = time.perf_counter()
+        return audio
+    
+    def listen(self) -> Optional[str]:
+        """
+        Listen to microphone input and convert to text.
+        
+        Returns:
+            Recognized text or None if recognition fails
+        """
+        try:
+            audio = self._next_phrase()
+            if audio is None:
+                return None
             
-            # Use Google Speech Recognition
             print("Processing speech...")
-            text = self.recognizer.recognize_google(audio, language=self.language)
+            with stage_timer("recognize"):
+                # 16-bit, since get_raw_data() hands back 8-bit audio as signed samples
+                text = self.stt.transcribe(audio.get_raw_data(convert_width=2), PCMFormat(audio.sample_rate, 2), self.language)
+            if not text:
+                logger.warning("Could not understand audio")
+                print("Sorry, I couldn't understand what you said. Please try again.")
+                return None
             print(f"You said: {text}")
             return text
             
-        except sr.UnknownValueError:
-            logger.warning("Could not understand audio")
-            print("Sorry, I couldn't understand what you said. Please try again.")
-            return None
-        except sr.RequestError as e:
+        except STTError as e:
             logger.error(f"Speech recognition error: {e}")
             print(f"Speech recognition service error: {e}")
             return None
@@ -5,83 +5,275 @@ Converts text to speech using pyttsx3 text-to-speech engine
 
 import pyttsx3
 import logging
-from typing import Optional
-from src.config import TTS_VOICE_RATE, TTS_VOICE_VOLUME
+import os
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+from src.audio_cache import AudioCache, audio_key
+from src.audio_io import AudioBuffer
+from src.config import TTS_VOICE_RATE, TTS_VOICE_VOLUME, TTS_CACHE_ENABLED
+from src.metrics import STAGE_SECONDS
+from src.utils import sentence_chunks
+
+try:
+    import winsound
+except ImportError:
+    # No in-memory WAV player outside Windows: speech is synthesized live every time
+    winsound = None
 
 logger = logging.getLogger(__name__)
 
 
+class _Utterance:
+    """A queued line of speech and the future that reports how it ended."""
+
+    __slots__ = ("text", "future", "generation", "on_start")
+
+    def __init__(self, text: str, future: Future, generation: int, on_start: Optional[Callable[[], None]] = None):
+        self.text = text
+        self.future = future
+        self.generation = generation
+        self.on_start = on_start
+
+
 class SpeechSynthesizer:
-    """Handles text-to-speech synthesis."""
-    
-    def __init__(self, rate: int = TTS_VOICE_RATE, volume: float = TTS_VOICE_VOLUME):
+    """
+    Handles text-to-speech synthesis.
+
+    A dedicated worker thread owns the pyttsx3 engine (most drivers must be used
+    from the thread that created them) and plays queued utterances in order, one
+    sentence at a time. Callers are never blocked by playback unless they choose
+    to wait, and `interrupt()` can cut speech short from any thread.
+
+    With an audio cache, each sentence is rendered to WAV once and replayed from
+    disk afterwards (where a WAV player is available), so repeated lines never
+    reach the engine again.
+    """
+
+    def __init__(self, rate: int = TTS_VOICE_RATE, volume: float = TTS_VOICE_VOLUME, cache: Optional[AudioCache] = None):
         """
         Initialize the speech synthesizer.
-        
+
         Args:
             rate: Speech rate (default: 150 words per minute)
             volume: Volume level (0.0 to 1.0)
+            cache: Cache for rendered sentences (default: the on-disk cache when TTS_CACHE_ENABLED)
         """
-        try:
-            self.engine = pyttsx3.init()
-            self.rate = rate
-            self.volume = volume
-            
-            # Configure engine
-            self.engine.setProperty('rate', self.rate)
-            self.engine.setProperty('volume', self.volume)
-            
-            logger.info("Speech synthesizer initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize speech synthesizer: {e}")
-            raise
-    
+        self.rate = rate
+        self.volume = volume
+        self.cache = cache if cache is not None else (AudioCache() if TTS_CACHE_ENABLED else None)
+        self.engine = None
+        self.voice = None
+        self._queue = queue.Queue()
+        self._generation = 0  # bumped by interrupt(); older utterances are skipped
+        self._speaking = threading.Event()
+        self._ready = threading.Event()
+        self._init_error = None
+
+        self._worker = threading.Thread(target=self._run, name="speech-synthesis", daemon=True)
+        self._worker.start()
+        self._ready.wait()
+
+        if self._init_error is not None:
+            logger.error(f"Failed to initialize speech synthesizer: {self._init_error}")
+            raise self._init_error
+        logger.info("Speech synthesizer initialized successfully")
+
+    @property
+    def is_speaking(self) -> bool:
+        """True while an utterance is playing or waiting in the queue."""
+        return self._speaking.is_set() or not self._queue.empty()
+
+    def speak_async(self, text: str, on_start: Optional[Callable[[], None]] = None) -> Future:
+        """
+        Queue text for playback and return immediately.
+
+        Args:
+            text: Text to convert to speech
+            on_start: Called from the worker thread when the first audio of this text starts playing
+
+        Returns:
+            Future resolving to True once the text has been spoken, or False if it
+            was empty, interrupted, or failed
+        """
+        future = Future()
+        if not text:
+            logger.warning("Empty text provided for speech synthesis")
+            future.set_result(False)
+            return future
+
+        print(f"AI: {text}")
+        self._queue.put(_Utterance(text, future, self._generation, on_start))
+        return future
+
     def speak(self, text: str) -> bool:
         """
-        Convert text to speech and play it.
-        
+        Convert text to speech and play it, waiting until playback ends.
+
         Args:
             text: Text to convert to speech
-            
+
         Returns:
             True if successful, False otherwise
         """
+        return self.speak_async(text).result()
+
+    def cache_key(self, text: str) -> str:
+        """Audio cache key for text spoken with the current voice, rate and volume."""
+        return audio_key(text, self.voice, self.rate, self.volume)
+
+    def synthesize(self, text: str) -> AudioBuffer:
+        """
+        Render text to WAV audio without playing it.
+
+        Returns:
+            WAV bytes, served from the audio cache when the line was rendered before
+        """
+        key = self.cache_key(text)
+        if self.cache is not None:
+            audio = self.cache.get(key)
+            if audio is not None:
+                return audio
+
+        future = Future()
+
+        def render():
+            try:
+                future.set_result(self._render(text, key))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._queue.put(render)
+        return future.result()
+
+    def wait_until_done(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until everything queued so far has been spoken (or interrupted).
+
+        Returns:
+            True if playback finished within the timeout
+        """
+        marker = Future()
+        self._queue.put(lambda: marker.set_result(True))
         try:
-            if not text:
-                logger.warning("Empty text provided for speech synthesis")
-                return False
-            
-            print(f"AI: {text}")
-            self.engine.say(text)
-            self.engine.runAndWait()
-            return True
-            
-        except Exception as e:
-            logger.error(f"Error during speech synthesis: {e}")
+            return marker.result(timeout=timeout)
+        except Exception:
             return False
-    
+
+    def interrupt(self):
+        """Barge-in: drop all queued speech and cut the current utterance short."""
+        self._generation += 1
+        if self._speaking.is_set():
+            try:
+                self.engine.stop()
+                if self.cache is not None and winsound is not None:
+                    # engine.stop() can't reach cached lines played from memory; this stops them
+                    winsound.PlaySound(None, 0)
+            except Exception as e:
+                logger.error(f"Error stopping speech: {e}")
+
     def set_rate(self, rate: int):
         """Set speech rate (words per minute)."""
-        try:
-            self.rate = rate
-            self.engine.setProperty('rate', self.rate)
-        except Exception as e:
-            logger.error(f"Error setting speech rate: {e}")
-    
+        self.rate = rate
+        self._queue.put(lambda: self.engine.setProperty('rate', rate))
+
     def set_volume(self, volume: float):
         """Set volume level (0.0 to 1.0)."""
-        try:
-            if 0.0 <= volume <= 1.0:
-                self.volume = volume
-                self.engine.setProperty('volume', self.volume)
-            else:
-                logger.warning(f"Volume must be between 0.0 and 1.0, got {volume}")
-        except Exception as e:
-            logger.error(f"Error setting volume: {e}")
-    
+        if 0.0 <= volume <= 1.0:
+            self.volume = volume
+            self._queue.put(lambda: self.engine.setProperty('volume', volume))
+        else:
+            logger.warning(f"Volume must be between 0.0 and 1.0, got {volume}")
+
     def stop(self):
         """Stop current speech."""
+        self.interrupt()
+
+    def close(self):
+        """Stop speaking and shut down the worker thread."""
+        self.interrupt()
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+    def _run(self):
         try:
-            self.engine.stop()
+            self.engine = pyttsx3.init()
+
+            # Configure engine
+            self.engine.setProperty('rate', self.rate)
+            self.engine.setProperty('volume', self.volume)
+            self.voice = self.engine.getProperty('voice')
         except Exception as e:
-            logger.error(f"Error stopping speech: {e}")
+            self._init_error = e
+            return
+        finally:
+            self._ready.set()
+
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            if callable(item):
+                try:
+                    item()
+                except Exception as e:
+                    logger.error(f"Error updating speech engine: {e}")
+                continue
+
+            item.future.set_result(self._play(item))
+
+    def _play(self, utterance: _Utterance) -> bool:
+        # Speaking sentence by sentence gets the first words out sooner and lets an
+        # interrupt take effect at the next sentence even if the driver ignores stop()
+        started_at = time.perf_counter()
+        try:
+            for chunk in sentence_chunks(utterance.text):
+                if utterance.generation != self._generation:
+                    return False
+                self._speaking.set()
+                if self.cache is not None and winsound is not None:
+                    key = self.cache_key(chunk)
+                    audio = self.cache.get(key)
+                    if audio is None:
+                        audio = self._render(chunk, key)
+                    self._started(utterance)
+                    winsound.PlaySound(bytes(audio), winsound.SND_MEMORY)
+                else:
+                    self._started(utterance)
+                    self.engine.say(chunk)
+                    self.engine.runAndWait()
+            STAGE_SECONDS.observe(time.perf_counter() - started_at, stage="speak")
+            return utterance.generation == self._generation
+        except Exception as e:
+            logger.error(f"Error during speech synthesis: {e}")
+            return False
+        finally:
+            self._speaking.clear()
+
+    @staticmethod
+    def _started(utterance: _Utterance):
+        if utterance.on_start is not None:
+            on_start, utterance.on_start = utterance.on_start, None
+            try:
+                on_start()
+            except Exception as e:
+                logger.error(f"Speech start callback failed: {e}")
+
+    def _render(self, text: str, key: str) -> bytes:
+        # Runs on the worker thread, which owns the engine
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with open(path, "rb") as f:
+                audio = f.read()
+        finally:
+            os.unlink(path)
+        if self.cache is not None:
+            self.cache.put(key, audio)
+        return audio
@@ -1,14 +1,31 @@
+import base64
 from typing import Optional
-from .config import MOCK_MODE
-from .utils import ts
+from .audio_io import AudioBuffer, PCMFormat, is_wav, parse_wav
+from .batch_scheduler import Priority
+from .config import STT_PCM_SAMPLE_RATE
+from .metrics import stage_timer
+from .stt_engine import get_stt_backend
 
-def transcribe_audio(b64_wav: str, lang: Optional[str] = "en") -> str:
+@stage_timer("stt")
+def transcribe_pcm(pcm: AudioBuffer, pcm_format: PCMFormat, lang: Optional[str] = "en", priority: Priority = Priority.DIALOGUE) -> str:
+    """
+    Accepts raw little-endian PCM frames (any bytes-like buffer, read in place).
+    Transcribed by the STT_ENGINE backend; in MOCK_MODE that is the stub engine, which returns canned text.
+    """
+    return get_stt_backend().transcribe(pcm, pcm_format, lang, priority)
+
+def transcribe_bytes(audio: AudioBuffer, lang: Optional[str] = "en", pcm_format: Optional[PCMFormat] = None,
+                     priority: Priority = Priority.DIALOGUE) -> str:
+    """
+    Accepts a WAV file, or headerless PCM in pcm_format (default: 16-bit mono at STT_PCM_SAMPLE_RATE).
+    """
+    if is_wav(audio):
+        pcm_format, audio = parse_wav(audio)
+    return transcribe_pcm(audio, pcm_format or PCMFormat(STT_PCM_SAMPLE_RATE), lang, priority)
+
+def transcribe_audio(b64_wav: str, lang: Optional[str] = "en", priority: Priority = Priority.DIALOGUE) -> str:
     """
     Accepts base64-encoded WAV/PCM audio string.
-    In MOCK_MODE, returns canned text.
+    Raises ValueError if it is not valid base64 or not valid audio.
     """
-    # Bluff: pretend to do STT
-    if MOCK_MODE:
-        return "hello npc, any quest for me?"
-    # Real STT integration would go here (e.g., Whisper/Google), omitted.
-    return f"[{ts()}] (STT placeholder)"
+    return transcribe_bytes(base64.b64decode(b64_wav, validate=True), lang, priority=priority)
@@ -0,0 +1,64 @@
+"""
+Startup Module
+Records how long each import and initialisation phase of startup took
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+
+
+class StartupReport:
+    """
+    Durations of named startup phases ("import ..." and "init ..."), in the
+    order they finished. Phases may run on several threads at once, so their
+    sum can exceed the wall-clock time since the process started.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._phases: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Times a block as one phase, also when it raises."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started_at)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._phases.append((name, seconds))
+
+    def phases(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._phases)
+
+    def report(self) -> Dict[str, object]:
+        """Seconds per phase, per kind of phase, and since the process started."""
+        phases = self.phases()
+        totals: Dict[str, float] = {}
+        for name, seconds in phases.items():
+            kind = name.split(" ", 1)[0]
+            totals[kind] = totals.get(kind, 0.0) + seconds
+        return {
+            "elapsed": round(time.perf_counter() - self.started_at, 4),
+            "totals": {kind: round(seconds, 4) for kind, seconds in totals.items()},
+            "phases": {name: round(seconds, 4) for name, seconds in phases.items()},
+        }
+
+    def format(self) -> str:
+        """The report as aligned text lines, for logging at startup."""
+        report = self.report()
+        width = max([len(name) for name in report["phases"]] + [len("elapsed")])
+        lines = [f"  {name:<{width}}  {seconds * 1000:8.1f} ms" for name, seconds in report["phases"].items()]
+        lines.append(f"  {'elapsed':<{width}}  {report['elapsed'] * 1000:8.1f} ms")
+        return "Startup time:\n" + "\n".join(lines)
+
+
+# Created when the package is first imported, so "elapsed" covers the whole startup
+STARTUP = StartupReport()
@@ -0,0 +1,424 @@
+"""
+Speech-to-Text Engine Module
+Pluggable STT engines, run in-process or in pre-warmed worker processes fed through shared memory
+"""
+
+import heapq
+import itertools
+import logging
+import multiprocessing
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.audio_io import AudioBuffer, PCMFormat
+from src.batch_scheduler import Priority
+from src.config import STT_ENGINE, STT_WHISPER_COMPUTE_TYPE, STT_WHISPER_MODEL, STT_WORKERS
+from src.vad import to_pcm16
+
+logger = logging.getLogger(__name__)
+
+STUB_TRANSCRIPT = "hello npc, any quest for me?"
+
+# Longest a warm-up waits for the other workers to load their models
+WORKER_WARMUP_TIMEOUT = 300
+
+
+class STTError(Exception):
+    """The engine failed (as opposed to hearing nothing, which is an empty transcript)."""
+
+
+class STTUnavailable(STTError):
+    """The backend cannot transcribe at all: the engine failed to load, or its workers died."""
+
+
+class STTEngine(ABC):
+    """
+    Base class for speech-to-text engines.
+
+    An engine is created and loaded once per process that runs it, then
+    transcribes mono float32 audio in [-1, 1]. Engines that do heavy local
+    inference set `pooled` so they run in worker processes.
+    """
+    name = ""
+    pooled = False
+
+    def load(self):
+        """Loads the model; called once before the first transcription."""
+
+    @abstractmethod
+    def transcribe(self, audio: np.ndarray, sample_rate: int, lang: Optional[str]) -> str:
+        """
+        Returns:
+            The transcript, or "" if no speech was recognized
+
+        Raises:
+            STTError: If the engine itself failed
+        """
+
+
+class StubEngine(STTEngine):
+    """Deterministic engine for tests and mock mode: a fixed transcript for any non-empty audio."""
+    name = "stub"
+
+    def __init__(self, text: str = STUB_TRANSCRIPT, latency: float = 0.0):
+        """
+        Args:
+            text: Transcript returned for any audio
+            latency: Simulated seconds per transcription
+        """
+        self.text = text
+        self.latency = latency
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int, lang: Optional[str]) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.text if len(audio) else ""
+
+
+class WhisperEngine(STTEngine):
+    """Local Whisper model via faster-whisper (CTranslate2), kept loaded in each worker."""
+    name = "whisper"
+    pooled = True
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model: str = STT_WHISPER_MODEL, compute_type: str = STT_WHISPER_COMPUTE_TYPE):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.model = None
+
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("The whisper STT engine requires faster-whisper: pip install faster-whisper") from e
+        self.model = WhisperModel(self.model_name, device="cpu", compute_type=self.compute_type)
+        logger.info(f"Loaded Whisper model {self.model_name}")
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int, lang: Optional[str]) -> str:
+        if not len(audio):
+            return ""
+        if sample_rate != self.SAMPLE_RATE:
+            positions = np.arange(int(len(audio) * self.SAMPLE_RATE / sample_rate)) * (sample_rate / self.SAMPLE_RATE)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        language = lang.split("-")[0].lower() if lang else None
+        try:
+            segments, _ = self.model.transcribe(audio, language=language, beam_size=1)
+            return " ".join(segment.text.strip() for segment in segments).strip()
+        except Exception as e:
+            raise STTError(f"Whisper transcription failed: {e}") from e
+
+
+class GoogleEngine(STTEngine):
+    """The Google Web Speech API through speech_recognition; a network call, so it runs in-process."""
+    name = "google"
+
+    def load(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio: np.ndarray, sample_rate: int, lang: Optional[str]) -> str:
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        try:
+            return self.recognizer.recognize_google(self._sr.AudioData(pcm, sample_rate, 2), language=lang or "en-US")
+        except self._sr.UnknownValueError:
+            return ""
+        except self._sr.RequestError as e:
+            raise STTError(f"Speech recognition service error: {e}") from e
+
+
+ENGINES = {engine.name: engine for engine in (StubEngine, WhisperEngine, GoogleEngine)}
+
+
+def create_engine(name: str, **options) -> STTEngine:
+    """
+    Raises:
+        ValueError: If no engine has this name
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown STT engine {name!r}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[name](**options)
+
+
+def pcm_to_float(pcm: AudioBuffer, pcm_format: PCMFormat) -> np.ndarray:
+    """Integer PCM frames as mono float32 samples in [-1, 1]."""
+    samples = to_pcm16(pcm, pcm_format.sample_width, pcm_format.channels)
+    return samples.astype(np.float32) / 32768.0
+
+
+class STTBackend(ABC):
+    """What callers transcribe through, whichever engine and execution model is behind it."""
+
+    def __init__(self, engine: str):
+        self.engine_name = engine
+
+    @abstractmethod
+    def submit(self, pcm: AudioBuffer, pcm_format: PCMFormat, lang: Optional[str] = "en",
+               priority: Priority = Priority.DIALOGUE) -> "Future[str]":
+        """Starts transcribing integer PCM frames; the future holds the transcript."""
+
+    def transcribe(self, pcm: AudioBuffer, pcm_format: PCMFormat, lang: Optional[str] = "en",
+                   priority: Priority = Priority.DIALOGUE) -> str:
+        """Transcribes integer PCM frames, blocking until done."""
+        return self.submit(pcm, pcm_format, lang, priority).result()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the engine is loaded; True if it loaded."""
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"engine": self.engine_name}
+
+    def close(self):
+        pass
+
+
+class InlineBackend(STTBackend):
+    """Runs the engine in the calling thread (network engines, the stub, or STT_WORKERS=0)."""
+
+    def __init__(self, engine: str, **options):
+        super().__init__(engine)
+        self.engine = create_engine(engine, **options)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                try:
+                    self.engine.load()
+                except Exception as e:
+                    raise STTUnavailable(f"STT engine {self.engine_name} failed to load: {e}") from e
+                self._loaded = True
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        try:
+            self._load()
+        except STTUnavailable as e:
+            logger.error(str(e))
+            return False
+        return True
+
+    def submit(self, pcm: AudioBuffer, pcm_format: PCMFormat, lang: Optional[str] = "en",
+               priority: Priority = Priority.DIALOGUE) -> "Future[str]":
+        future: "Future[str]" = Future()
+        try:
+            self._load()
+            future.set_result(self.engine.transcribe(pcm_to_float(pcm, pcm_format), pcm_format.sample_rate, lang))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+# --- Worker process side ---
+_worker_engine: Optional[STTEngine] = None
+_worker_barrier = None
+
+
+def _init_worker(engine: str, options: Dict[str, Any], barrier):
+    """Loads the engine once when the worker process starts."""
+    global _worker_engine, _worker_barrier
+    _worker_engine = create_engine(engine, **options)
+    _worker_engine.load()
+    _worker_barrier = barrier
+
+
+def _worker_ready() -> int:
+    # Holding this task until every worker has one forces the pool to start all of its processes
+    _worker_barrier.wait(WORKER_WARMUP_TIMEOUT)
+    return multiprocessing.current_process().pid
+
+
+def _worker_transcribe(segment: str, size: int, pcm_format: Tuple[int, int, int], lang: Optional[str]) -> str:
+    """Reads the audio from a shared memory segment and transcribes it."""
+    pcm_format = PCMFormat(*pcm_format)
+    shm = shared_memory.SharedMemory(name=segment)
+    try:
+        view = shm.buf[:size]
+        try:
+            audio = pcm_to_float(view, pcm_format)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+    return _worker_engine.transcribe(audio, pcm_format.sample_rate, lang)
+
+
+class _Job:
+    __slots__ = ("future", "segment", "size", "pcm_format", "lang")
+
+    def __init__(self, future: Future, segment: shared_memory.SharedMemory, size: int, pcm_format: PCMFormat, lang: Optional[str]):
+        self.future = future
+        self.segment = segment
+        self.size = size
+        self.pcm_format = pcm_format
+        self.lang = lang
+
+
+class ProcessPoolBackend(STTBackend):
+    """
+    Runs a local engine in worker processes that each load the model once.
+
+    Workers are started and warmed up in the background as soon as the backend
+    is created, so the first request does not pay for model loading. Audio is
+    copied once into a shared memory segment that the worker reads in place,
+    instead of being pickled through the executor's pipe. At most one request
+    per worker is handed to the executor; the rest wait in priority order, so
+    a player's final transcript overtakes queued partial transcripts.
+    """
+
+    def __init__(self, engine: str, workers: int = STT_WORKERS, **options):
+        """
+        Initialize the backend and start warming its workers.
+
+        Args:
+            engine: Engine name (see ENGINES)
+            workers: Worker processes
+            options: Engine constructor arguments
+        """
+        super().__init__(engine)
+        create_engine(engine, **options)  # fail fast on a bad name or options
+        self.workers = max(1, workers)
+        # Fresh interpreters: forking a process with running threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=context,
+            initializer=_init_worker, initargs=(engine, options, context.Barrier(self.workers)),
+        )
+        self._queue: List[Tuple[int, int, _Job]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+        # One warm-up per worker; each resolves once all workers have loaded the engine
+        self.ready: List[Future] = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Waits until every worker has loaded the engine; True if they all did."""
+        try:
+            for future in self.ready:
+                future.result(timeout)
+        except Exception as e:
+            logger.error(f"STT worker failed to start: {e}")
+            return False
+        return True
+
+    def submit(self, pcm: AudioBuffer, pcm_format: PCMFormat, lang: Optional[str] = "en",
+               priority: Priority = Priority.DIALOGUE) -> "Future[str]":
+        future: "Future[str]" = Future()
+        view = memoryview(pcm).cast("B")
+        segment = shared_memory.SharedMemory(create=True, size=max(1, len(view)))
+        segment.buf[:len(view)] = view
+        job = _Job(future, segment, len(view), pcm_format, lang)
+        with self._lock:
+            if self._closed:
+                self._release(job)
+                raise STTUnavailable("STT backend is closed")
+            heapq.heappush(self._queue, (int(priority), next(self._sequence), job))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._dispatch()
+        return future
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._closed or not self._queue or self._in_flight >= self.workers:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                if not job.future.set_running_or_notify_cancel():
+                    self._release(job)
+                    continue
+                self._in_flight += 1
+            try:
+                task = self._executor.submit(_worker_transcribe, job.segment.name, job.size, tuple(job.pcm_format), job.lang)
+            except Exception as e:
+                self._finished(job, None, e)
+                continue
+            task.add_done_callback(lambda task, job=job: self._finished(job, task, None))
+
+    def _finished(self, job: _Job, task: Optional[Future], error: Optional[BaseException]):
+        self._release(job)
+        if error is None:
+            error = STTUnavailable("STT backend is closed") if task.cancelled() else task.exception()
+        if isinstance(error, BrokenProcessPool):
+            # A worker failed to load the engine or died; no later request can succeed either
+            error = STTUnavailable(f"STT workers for {self.engine_name} are not running: {error}")
+        with self._lock:
+            self._in_flight -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if error is None:
+            job.future.set_result(task.result())
+        else:
+            job.future.set_exception(error)
+        self._dispatch()
+
+    @staticmethod
+    def _release(job: _Job):
+        job.segment.close()
+        job.segment.unlink()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "engine": self.engine_name,
+                "workers": self.workers,
+                "ready": sum(future.done() and not future.exception() for future in self.ready),
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+    def close(self):
+        """Cancels queued requests, lets the ones handed to workers finish, and stops the workers."""
+        with self._lock:
+            self._closed = True
+            queued, self._queue = self._queue, []
+        for _, _, job in queued:
+            job.future.cancel()
+            self._release(job)
+        self._executor.shutdown(wait=True)
+
+
+def open_stt_backend(engine: str = STT_ENGINE, workers: int = STT_WORKERS, **options) -> STTBackend:
+    """A worker-process backend for pooled (local model) engines, otherwise an in-process one."""
+    if engine in ENGINES and ENGINES[engine].pooled and workers > 0:
+        return ProcessPoolBackend(engine, workers, **options)
+    return InlineBackend(engine, **options)
+
+
+_shared_backends: Dict[str, STTBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def get_stt_backend(engine: str = STT_ENGINE) -> STTBackend:
+    """Return the process-wide backend for an engine, creating (and warming) it on first use."""
+    with _shared_lock:
+        backend = _shared_backends.get(engine)
+        if backend is None:
+            backend = _shared_backends[engine] = open_stt_backend(engine)
+        return backend
+
+
+def close_stt_backends():
+    with _shared_lock:
+        backends = list(_shared_backends.values())
+        _shared_backends.clear()
+    for backend in backends:
+        backend.close()
@@ -6,88 +6,95 @@ Uses Ollama for local LLM response generation
 import requests
 import json
 import logging
-from typing import Optional
-from src.config import OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_TEMPERATURE, OLLAMA_MAX_TOKENS, SYSTEM_PROMPT
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from src.config import (
+    OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_TEMPERATURE, OLLAMA_MAX_TOKENS, SYSTEM_PROMPT,
+    MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_MAX_TOKENS
+)
+from src.conversation_memory import ConversationMemory
+from src.http_transport import HTTPTransport, RequestTimings, get_transport
+from src.metrics import FALLBACKS, STAGE_SECONDS, TIME_TO_FIRST_TOKEN, stage_timer
+from src.model_router import Lease, ModelRouter, get_pinned_router, get_router
+from src.utils import split_sentences
 
 logger = logging.getLogger(__name__)
 
+# Spoken instead of a reply when generation fails (also pre-rendered into the audio cache)
+FALLBACK_MESSAGES = {
+    "empty": "I'm having trouble thinking right now. Please try again.",
+    "bad_status": "I'm having trouble connecting to the AI model. Please check if Ollama is running.",
+    "connection": "I'm unable to connect to the AI model. Please make sure Ollama is running on your system.",
+    "timeout": "The AI model is taking too long to respond. Please try again.",
+    "decode": "I'm having trouble understanding the response. Please try again.",
+    "unexpected": "An unexpected error occurred while generating a response.",
+}
+
+
+def _fallback(reason: str) -> str:
+    """The fallback message for a failure, counted in the metrics."""
+    FALLBACKS.labels(reason=reason).inc()
+    return FALLBACK_MESSAGES[reason]
+
 
 class TextGenerator:
     """Generates AI responses using Ollama local LLM."""
     
-    def __init__(self, model: str = OLLAMA_MODEL, system_prompt: str = SYSTEM_PROMPT, base_url: str = OLLAMA_BASE_URL):
+    def __init__(self, model: Optional[str] = None, system_prompt: str = SYSTEM_PROMPT, base_url: Optional[str] = None,
+                 transport: Optional[HTTPTransport] = None, memory_token_budget: int = MEMORY_TOKEN_BUDGET,
+                 router: Optional[ModelRouter] = None, tier: Optional[str] = None):
         """
         Initialize the text generator.
         
         Args:
-            model: Ollama model to use (default: mistral)
+            model: Pin a single Ollama model instead of routing (default: OLLAMA_MODEL)
             system_prompt: System instructions for the AI
-            base_url: Ollama base URL (default: http://localhost:11434)
+            base_url: Pin a single Ollama base URL instead of routing (default: OLLAMA_BASE_URL)
+            transport: HTTP transport to use (default: the shared pooled transport)
+            memory_token_budget: Approximate tokens of conversation history sent per turn
+            router: Routes requests across Ollama endpoints (default: the shared router over OLLAMA_ENDPOINTS)
+            tier: Model tier for this NPC's replies (default: the router's default tier)
         """
-        self.model = model
         self.system_prompt = system_prompt
-        self.base_url = base_url
-        self.api_endpoint = f"{base_url}/api/chat"
-        self.conversation_history = []
-        self._verify_connection()
+        self.transport = transport or get_transport()
+        if router is None and (model or base_url):
+            # Shared per (model, url, transport), so generators pinned to the same model share one health thread
+            router = get_pinned_router(model or OLLAMA_MODEL, base_url or OLLAMA_BASE_URL, self.transport)
+        self.router = router or get_router()
+        self.tier = tier
+        self.memory = ConversationMemory(token_budget=memory_token_budget, summarizer=self._summarize)
     
-    def _verify_connection(self) -> bool:
-        """
-        Verify that Ollama is running and accessible.
-        
-        Returns:
-            True if connection is successful, False otherwise
-        """
-        try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                logger.info(f"Connected to Ollama at {self.base_url}")
-                return True
-            else:
-                logger.error(f"Ollama returned status code {response.status_code}")
-                return False
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Could not connect to Ollama at {self.base_url}. Make sure Ollama is running.")
-            return False
-        except Exception as e:
-            logger.error(f"Error verifying Ollama connection: {e}")
-            return False
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Messages sent as context: a summary of older turns followed by the recent window."""
+        return self.memory.messages()
+    
+    @property
+    def last_timings(self) -> Optional[RequestTimings]:
+        """Connect/TTFB/total timings of the last request made from this thread."""
+        return self.transport.last_timings
     
-    def generate_response(self, user_input: str) -> Optional[str]:
+    def generate_response(self, user_input: str, tier: Optional[str] = None) -> Optional[str]:
         """
         Generate an AI response to user input using Ollama.
         
         Args:
             user_input: The user's text input
+            tier: Model tier for this reply (default: the generator's tier)
             
         Returns:
             AI-generated response or None if generation fails
         """
+        # Add user message to history
+        self.memory.append("user", user_input)
+        
+        with self.router.acquire(tier or self.tier) as lease, stage_timer("generate"):
+            return self._generate(lease)
+    
+    def _generate(self, lease: Lease) -> Optional[str]:
         try:
-            # Add user message to history
-            self.conversation_history.append({
-                "role": "user",
-                "content": user_input
-            })
-            
-            # Prepare messages with system prompt
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-                *self.conversation_history
-            ]
-            
-            # Make request to Ollama API
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "stream": False,
-                "options": {
-                    "temperature": OLLAMA_TEMPERATURE,
-                    "num_predict": OLLAMA_MAX_TOKENS
-                }
-            }
-            
-            response = requests.post(self.api_endpoint, json=payload, timeout=30)
+            response = self.transport.post(f"{lease.base_url}/api/chat", json=self._build_payload(lease.model, stream=False))
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -95,36 +102,188 @@ class TextGenerator:
                 
                 if not assistant_message:
                     logger.warning("Ollama returned empty response")
-                    return "I'm having trouble thinking right now. Please try again."
-                
-                # Add assistant response to history
-                self.conversation_history.append({
-                    "role": "assistant",
-                    "content": assistant_message
-                })
-                
-                # Keep only last 20 messages for context
-                if len(self.conversation_history) > 20:
-                    self.conversation_history = self.conversation_history[-20:]
+                    return _fallback("empty")
                 
+                self._remember_reply(assistant_message)
                 return assistant_message
             else:
                 logger.error(f"Ollama API returned status code {response.status_code}: {response.text}")
-                return "I'm having trouble connecting to the AI model. Please check if Ollama is running."
+                if response.status_code >= 500:
+                    lease.fail()
+                return _fallback("bad_status")
         
         except requests.exceptions.ConnectionError:
-            logger.error("Connection to Ollama failed. Make sure Ollama is running.")
-            return "I'm unable to connect to the AI model. Please make sure Ollama is running on your system."
+            logger.error(f"Connection to Ollama at {lease.base_url} failed. Make sure Ollama is running.")
+            lease.fail()
+            return _fallback("connection")
         except requests.exceptions.Timeout:
             logger.error("Request to Ollama timed out")
-            return "The AI model is taking too long to respond. Please try again."
+            return _fallback("timeout")
         except json.JSONDecodeError:
             logger.error("Failed to decode Ollama response")
-            return "I'm having trouble understanding the response. Please try again."
+            return _fallback("decode")
+        except Exception as e:
+            logger.error(f"Unexpected error during text generation: {e}")
+            return _fallback("unexpected")
+    
+    def generate_response_stream(self, user_input: str, cancel_event: Optional[threading.Event] = None,
+                                 tier: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream an AI response from Ollama, yielding complete sentences as they arrive.
+        
+        The assembled reply is added to the conversation history when the stream
+        finishes, is cancelled, or the caller stops iterating early.
+        
+        Args:
+            user_input: The user's text input
+            cancel_event: Optional event that aborts generation when set
+            tier: Model tier for this reply (default: the generator's tier)
+            
+        Yields:
+            Complete sentences of the AI response (or a single fallback message on failure)
+        """
+        self.memory.append("user", user_input)
+        
+        with self.router.acquire(tier or self.tier) as lease:
+            yield from self._generate_stream(lease, cancel_event)
+    
+    def _generate_stream(self, lease: Lease, cancel_event: Optional[threading.Event]) -> Iterator[str]:
+        pieces = []
+        buffer = ""
+        started_at = time.perf_counter()
+        first_sentence_latency = None
+        try:
+            with self.transport.post(f"{lease.base_url}/api/chat", json=self._build_payload(lease.model, stream=True), stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Ollama API returned status code {response.status_code}: {response.text}")
+                    if response.status_code >= 500:
+                        lease.fail()
+                    yield _fallback("bad_status")
+                    return
+                
+                # Ollama streams one JSON object per line (NDJSON)
+                for line in response.iter_lines():
+                    if cancel_event is not None and cancel_event.is_set():
+                        logger.info("Ollama stream cancelled")
+                        return
+                    if not line:
+                        continue
+                    
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        logger.error(f"Ollama stream error: {chunk['error']}")
+                        break
+                    
+                    token = chunk.get("message", {}).get("content", "")
+                    if token:
+                        if not pieces:
+                            TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - started_at)
+                        pieces.append(token)
+                        sentences, buffer = split_sentences(buffer + token)
+                        if sentences and first_sentence_latency is None:
+                            # What the player waits for, so it is what routing should balance on
+                            first_sentence_latency = time.perf_counter() - started_at
+                            lease.observe_latency(first_sentence_latency)
+                        for sentence in sentences:
+                            yield sentence
+                    
+                    if chunk.get("done"):
+                        break
+                
+                response.timings.finish()
+                STAGE_SECONDS.observe(response.timings.total, stage="generate")
+            
+            tail = buffer.strip()
+            if tail:
+                yield tail
+            elif not pieces:
+                logger.warning("Ollama returned empty response")
+                yield _fallback("empty")
+        
+        except requests.exceptions.ConnectionError:
+            logger.error(f"Connection to Ollama at {lease.base_url} failed. Make sure Ollama is running.")
+            lease.fail()
+            yield _fallback("connection")
+        except requests.exceptions.Timeout:
+            logger.error("Request to Ollama timed out")
+            yield _fallback("timeout")
+        except json.JSONDecodeError:
+            logger.error("Failed to decode Ollama stream chunk")
+            yield _fallback("decode")
         except Exception as e:
             logger.error(f"Unexpected error during text generation: {e}")
-            return "An unexpected error occurred while generating a response."
+            yield _fallback("unexpected")
+        finally:
+            reply = "".join(pieces).strip()
+            if reply:
+                self._remember_reply(reply)
+    
+    def _build_payload(self, model: str, stream: bool) -> dict:
+        """
+        Build the Ollama /api/chat request body for the current conversation.
+        
+        Args:
+            model: Ollama model chosen by the router
+            stream: Whether Ollama should stream the reply as NDJSON chunks
+            
+        Returns:
+            Request payload dictionary
+        """
+        # Prepare messages with system prompt
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            *self.conversation_history
+        ]
+        
+        return {
+            "model": model,
+            "messages": messages,
+            "stream": stream,
+            "options": {
+                "temperature": OLLAMA_TEMPERATURE,
+                "num_predict": OLLAMA_MAX_TOKENS
+            }
+        }
+    
+    def _remember_reply(self, assistant_message: str):
+        """Add an assistant reply to history; older turns beyond the token budget get summarised."""
+        self.memory.append("assistant", assistant_message)
+    
+    def _summarize(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        """
+        Fold messages that fell out of the context window into the running summary.
+        Runs on the memory's background thread, off the reply path.
+        
+        Args:
+            summary: The current summary (may be empty)
+            messages: Messages evicted from the window, oldest first
+            
+        Returns:
+            The updated summary
+        """
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        prompt = (
+            "Update the summary of a conversation between a user and an assistant. "
+            "Keep names, facts, promises and open questions; drop small talk. "
+            "Reply with the summary only, in at most three sentences.\n\n"
+            f"Current summary: {summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+        # Summaries are background work, so they go to the smaller fallback model when there is one
+        with self.router.acquire(self.router.fallback_tier or self.tier) as lease:
+            payload = {
+                "model": lease.model,
+                "prompt": prompt,
+                "stream": False,
+                "options": {
+                    "temperature": 0.2,
+                    "num_predict": MEMORY_SUMMARY_MAX_TOKENS
+                }
+            }
+            response = self.transport.post(f"{lease.base_url}/api/generate", json=payload)
+            response.raise_for_status()
+            return response.json().get("response", "") or summary
     
     def reset_conversation(self):
         """Clear conversation history for a fresh start."""
-        self.conversation_history = []
+        self.memory.clear()
@@ -1,19 +1,39 @@
 import base64
 from typing import Optional
-from .config import MOCK_MODE
+from .audio_cache import AudioCache, audio_key
+from .audio_io import AudioBuffer
+from .config import MOCK_MODE, TTS_CACHE_ENABLED
+from .metrics import stage_timer
 from .utils import ts
 
+# 44-byte WAV header for 1-second silence @8kHz mono, super tiny demo
+SILENT_WAV = (
+    b"RIFF$\x80\x00\x00WAVEfmt "
+    b"\x10\x00\x00\x00\x01\x00\x01\x00@\x1f\x00\x00@\x1f\x00\x00"
+    b"\x01\x00\x08\x00data\x00\x80\x00\x00" + b"\x80"*0x800
+)
+
+# Rendered lines are reused across requests and restarts; the mock clip is not worth caching
+tts_cache = AudioCache() if TTS_CACHE_ENABLED and not MOCK_MODE else None
+
+def _render(text: str, voice: Optional[str]) -> bytes:
+    # Real TTS (e.g., Polly/ElevenLabs) would go here; omitted for repo.
+    return f"[{ts()}] {text}".encode()
+
+@stage_timer("tts")
+def render_voice(text: str, voice: Optional[str] = "female_hero") -> AudioBuffer:
+    """
+    Returns raw WAV audio, from the audio cache when this line was rendered before.
+    In MOCK_MODE, returns a tiny silent wav.
+    """
+    if MOCK_MODE:
+        return SILENT_WAV
+    if tts_cache is None:
+        return _render(text, voice)
+    return tts_cache.get_or_render(audio_key(text, voice), lambda: _render(text, voice))
+
 def synthesize_voice(text: str, voice: Optional[str] = "female_hero") -> str:
     """
     Returns base64 WAV audio. In MOCK_MODE, returns a tiny silent wav header.
     """
-    if MOCK_MODE:
-        # 44-byte WAV header for 1-second silence @8kHz mono, super tiny demo
-        silent_wav = (
-            b"RIFF$\x80\x00\x00WAVEfmt "
-            b"\x10\x00\x00\x00\x01\x00\x01\x00@\x1f\x00\x00@\x1f\x00\x00"
-            b"\x01\x00\x08\x00data\x00\x80\x00\x00" + b"\x80"*0x800
-        )
-        return base64.b64encode(silent_wav).decode("utf-8")
-    # Real TTS (e.g., Polly/ElevenLabs) would go here; omitted for repo.
-    return base64.b64encode(f"[{ts()}] {text}".encode()).decode()
+    return base64.b64encode(render_voice(text, voice)).decode("utf-8")
@@ -1,4 +1,30 @@
+import re
 from datetime import datetime
+from typing import List, Tuple
+
+# End of a sentence: terminal punctuation (plus closing quotes/brackets) followed by whitespace,
+# or a line break. Requiring trailing whitespace keeps decimals such as "3.5" intact.
+_SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+|\n+')
 
 def ts() -> str:
     return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
+
+def split_sentences(buffer: str) -> Tuple[List[str], str]:
+    """
+    Splits complete sentences off the front of a text buffer.
+    Returns (complete sentences, remaining incomplete text).
+    """
+    sentences = []
+    start = 0
+    for match in _SENTENCE_BOUNDARY.finditer(buffer):
+        sentence = buffer[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    return sentences, buffer[start:]
+
+def sentence_chunks(text: str) -> List[str]:
+    """Splits finished text into sentences, keeping any unterminated tail as the last chunk."""
+    sentences, rest = split_sentences(text)
+    rest = rest.strip()
+    return sentences + [rest] if rest else sentences
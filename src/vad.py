@@ -0,0 +1,323 @@
+"""
+Voice Activity Detection Module
+Frame-level speech detection and phrase endpointing over a ring buffer of captured audio
+"""
+
+import argparse
+import json
+import logging
+import threading
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional
+
+import numpy as np
+
+from src import audio_compat  # noqa: F401  (audioop on Python 3.13+)
+from src.config import (
+    SPEECH_PHRASE_TIME_LIMIT, SPEECH_VAD_FRAME_MS, SPEECH_VAD_HANGOVER_MS, SPEECH_VAD_PREROLL_MS,
+    SPEECH_VAD_START_DB, SPEECH_VAD_START_MS, SPEECH_VAD_STOP_DB,
+)
+
+logger = logging.getLogger(__name__)
+
+SPEECH_START = "speech_start"
+PHRASE_END = "phrase_end"
+
+# Frames quieter than this (dBFS) are never speech, however quiet the room
+MIN_SPEECH_DB = -55.0
+# Voiced speech is tonal; broadband noise (fans, hiss, keyboard clicks) has a flat spectrum
+MAX_VOICED_FLATNESS = 0.45
+MAX_VOICED_ZCR = 0.25
+# Band the spectral flatness is measured over, in Hz
+FLATNESS_BAND = (100, 4000)
+# Noise floor tracking per frame: fast towards quieter frames, slow towards louder ones
+FLOOR_FALL = 0.5
+FLOOR_RISE = 0.02
+# Noise frames over which the floor calibrates, following louder frames quickly too
+CALIBRATION_MS = 200
+
+
+class RingBuffer:
+    """
+    Preallocated buffer of 16-bit samples between one capture thread and one reader.
+
+    A live source must never be blocked, so by default a writer that laps the
+    reader overwrites the oldest unread audio (counted in `overruns`). Offline
+    sources that produce audio faster than real time write with block=True.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity: Samples held before the writer laps the reader
+        """
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self._written = 0  # total samples written
+        self._read = 0  # total samples read
+        self._closed = False
+        self._cond = threading.Condition()
+        self.overruns = 0
+
+    def write(self, samples: np.ndarray, block: bool = False):
+        """Appends samples; with block=True waits for the reader instead of overwriting unread audio."""
+        for offset in range(0, len(samples), self.capacity):
+            piece = samples[offset:offset + self.capacity]
+            with self._cond:
+                if block:
+                    self._cond.wait_for(lambda: self._closed or self.capacity - (self._written - self._read) >= len(piece))
+                if self._closed:
+                    return
+                start = self._written % self.capacity
+                first = min(len(piece), self.capacity - start)
+                self._data[start:start + first] = piece[:first]
+                self._data[:len(piece) - first] = piece[first:]
+                self._written += len(piece)
+                if self._written - self._read > self.capacity:
+                    self.overruns += self._written - self._read - self.capacity
+                    self._read = self._written - self.capacity
+                self._cond.notify_all()
+
+    def read(self, max_samples: int, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Takes up to max_samples of unread audio, waiting for at least one.
+
+        Returns:
+            A copy of the samples; an empty array once the buffer is closed and
+            drained; None on timeout
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closed or self._written > self._read, timeout):
+                return None
+            count = min(max_samples, self._written - self._read)
+            start = self._read % self.capacity
+            first = min(count, self.capacity - start)
+            samples = np.concatenate([self._data[start:start + first], self._data[:count - first]])
+            self._read += count
+            self._cond.notify_all()
+            return samples
+
+    def close(self):
+        """Wakes both sides; the reader still drains what was written."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class FrameFeatures(NamedTuple):
+    """Per-frame features of a block of frames, one array element per frame."""
+    energy_db: np.ndarray  # mean power in dBFS
+    zcr: np.ndarray  # zero crossings per sample
+    flatness: np.ndarray  # spectral flatness in FLATNESS_BAND: ~1 for noise, low for voiced speech
+
+
+def frame_features(frames: np.ndarray, sample_rate: int) -> FrameFeatures:
+    """
+    Computes every feature for a (n_frames, frame_samples) block of 16-bit samples at once.
+    """
+    x = frames.astype(np.float32) / 32768.0
+    energy_db = 10.0 * np.log10(np.mean(x * x, axis=1) + 1e-10)
+
+    signs = np.signbit(x)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, frames.shape[1] - 1)
+
+    power = np.abs(np.fft.rfft(x * np.hanning(frames.shape[1]).astype(np.float32), axis=1)) ** 2 + 1e-12
+    low, high = (int(hz * frames.shape[1] / sample_rate) for hz in FLATNESS_BAND)
+    band = power[:, max(1, low):max(low + 2, high)]
+    flatness = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+    return FrameFeatures(energy_db, zcr, flatness)
+
+
+class SpeechEvent(NamedTuple):
+    """A detected speech start, or the end of a phrase with its audio."""
+    kind: str  # SPEECH_START or PHRASE_END
+    at: float  # seconds since the start of the stream
+    audio: Optional[np.ndarray] = None  # the phrase's 16-bit samples, for PHRASE_END
+
+
+class Endpointer:
+    """
+    Splits a stream of 16-bit mono samples into phrases.
+
+    Features are computed for all complete frames of each chunk at once. A
+    phrase starts after `start_ms` of frames that are both loud (start_db above
+    the tracked noise floor) and voiced (tonal, few zero crossings), which
+    fires SPEECH_START right away so the NPC can stop talking. It then
+    continues while frames stay above the lower stop_db threshold, so unvoiced
+    consonants and short dips do not split it (hysteresis), and ends after
+    `hangover_ms` below it, or at `max_phrase_seconds`.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = SPEECH_VAD_FRAME_MS,
+        start_ms: int = SPEECH_VAD_START_MS,
+        hangover_ms: int = SPEECH_VAD_HANGOVER_MS,
+        preroll_ms: int = SPEECH_VAD_PREROLL_MS,
+        start_db: float = SPEECH_VAD_START_DB,
+        stop_db: float = SPEECH_VAD_STOP_DB,
+        max_phrase_seconds: float = SPEECH_PHRASE_TIME_LIMIT,
+    ):
+        """
+        Initialize the endpointer.
+
+        Args:
+            sample_rate: Sample rate of the audio, in Hz
+            frame_ms: Analysis frame length
+            start_ms: Loud, voiced audio needed to start a phrase
+            hangover_ms: Quiet audio after speech that ends the phrase
+            preroll_ms: Audio from before the detected start included in the phrase
+            start_db: Level above the noise floor that can start a phrase
+            stop_db: Level above the noise floor that keeps a phrase going
+            max_phrase_seconds: Longest phrase before it is ended anyway
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = max(1, sample_rate * frame_ms // 1000)
+        self.frame_seconds = self.frame_samples / sample_rate
+        self.start_frames = max(1, round(start_ms / 1000 / self.frame_seconds))
+        self.hangover_frames = max(1, round(hangover_ms / 1000 / self.frame_seconds))
+        self.max_phrase_frames = max(1, int(max_phrase_seconds / self.frame_seconds))
+        self.start_db = start_db
+        self.stop_db = stop_db
+        self.noise_floor: Optional[float] = None
+        self._pending = np.zeros(0, dtype=np.int16)  # samples short of a whole frame
+        self._preroll: Deque[np.ndarray] = deque(maxlen=max(1, round(preroll_ms / 1000 / self.frame_seconds)))
+        self._phrase: List[np.ndarray] = []
+        self._in_phrase = False
+        self._onset = 0  # consecutive loud, voiced frames while waiting for a phrase
+        self._quiet = 0  # consecutive quiet frames inside a phrase
+        self._frames_seen = 0
+        self._calibrating = max(1, round(CALIBRATION_MS / 1000 / self.frame_seconds))
+
+    @property
+    def in_phrase(self) -> bool:
+        return self._in_phrase
+
+    def process(self, samples: np.ndarray) -> List[SpeechEvent]:
+        """
+        Feeds the next samples of the stream.
+
+        Returns:
+            Speech starts and phrase ends detected in them, in order
+        """
+        if len(self._pending):
+            samples = np.concatenate([self._pending, samples])
+        whole = len(samples) - len(samples) % self.frame_samples
+        self._pending = samples[whole:].copy()
+        if not whole:
+            return []
+        frames = samples[:whole].reshape(-1, self.frame_samples)
+        features = frame_features(frames, self.sample_rate)
+
+        events = []
+        for frame, energy, zcr, flatness in zip(frames, features.energy_db.tolist(), features.zcr.tolist(), features.flatness.tolist()):
+            event = self._step(frame, energy, zcr < MAX_VOICED_ZCR and flatness < MAX_VOICED_FLATNESS)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[SpeechEvent]:
+        """Ends the phrase in progress, if any, e.g. when the stream closes."""
+        if not self._in_phrase:
+            return []
+        return [self._end_phrase()]
+
+    def _step(self, frame: np.ndarray, energy: float, voiced: bool) -> Optional[SpeechEvent]:
+        self._frames_seen += 1
+        if self.noise_floor is None:
+            # Seeded no higher than where speech would still start, in case the stream starts mid-phrase;
+            # calibration then brings it up to the room's level
+            self.noise_floor = min(energy, MIN_SPEECH_DB - self.start_db)
+        start_level = max(self.noise_floor + self.start_db, MIN_SPEECH_DB)
+
+        if not self._in_phrase:
+            self._preroll.append(frame)
+            if energy >= start_level and voiced:
+                self._onset += 1
+                if self._onset >= self.start_frames:
+                    self._in_phrase = True
+                    self._quiet = 0
+                    self._phrase = list(self._preroll)
+                    self._preroll.clear()
+                    return SpeechEvent(SPEECH_START, self._frames_seen * self.frame_seconds)
+                return None
+            self._onset = 0
+            # Only frames that are not speech candidates move the noise floor
+            self._track_floor(energy)
+            return None
+
+        self._phrase.append(frame)
+        if self._calibrating and not voiced:
+            # A phrase that was already under way when the stream started: its unvoiced tail is the room
+            self._track_floor(energy)
+        if energy >= max(self.noise_floor + self.stop_db, MIN_SPEECH_DB):
+            self._quiet = 0
+        else:
+            self._quiet += 1
+        if self._quiet >= self.hangover_frames or len(self._phrase) >= self.max_phrase_frames:
+            return self._end_phrase()
+        return None
+
+    def _track_floor(self, energy: float):
+        if self._calibrating:
+            self._calibrating -= 1
+            rate = FLOOR_FALL
+        else:
+            rate = FLOOR_FALL if energy < self.noise_floor else FLOOR_RISE
+        self.noise_floor += rate * (energy - self.noise_floor)
+
+    def _end_phrase(self) -> SpeechEvent:
+        audio = np.concatenate(self._phrase)
+        self._phrase = []
+        self._in_phrase = False
+        self._onset = 0
+        self._quiet = 0
+        return SpeechEvent(PHRASE_END, self._frames_seen * self.frame_seconds, audio)
+
+
+def to_pcm16(data: bytes, sample_width: int, channels: int = 1) -> np.ndarray:
+    """
+    Little-endian integer PCM of any width and channel count as 16-bit mono
+    samples. 8-bit samples are unsigned, as in WAV files; wider ones are signed.
+    """
+    if sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2")
+    else:
+        import audioop
+        if sample_width == 1:
+            data = audioop.bias(data, 1, -128)
+        samples = np.frombuffer(audioop.lin2lin(data, sample_width, 2), dtype="<i2")
+    if channels > 1:
+        samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples
+
+
+def main():
+    """Prints the speech starts and phrase ends detected in WAV files, for checking the VAD on recordings."""
+    from src.audio_io import iter_chunks, parse_wav
+
+    parser = argparse.ArgumentParser(description="Run voice activity detection over WAV files.")
+    parser.add_argument("paths", nargs="+", help="PCM WAV files")
+    parser.add_argument("--chunk-ms", type=int, default=64, help="Audio fed per call, like a capture thread's reads")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        with open(path, "rb") as f:
+            pcm_format, data = parse_wav(f.read())
+        endpointer = Endpointer(pcm_format.sample_rate)
+        chunk_bytes = max(1, pcm_format.sample_rate * args.chunk_ms // 1000) * pcm_format.frame_bytes
+        events = []
+        for chunk in iter_chunks(data, chunk_bytes):
+            events.extend(endpointer.process(to_pcm16(bytes(chunk), pcm_format.sample_width, pcm_format.channels)))
+        events.extend(endpointer.flush())
+        phrases = [
+            {"event": event.kind, "at": round(event.at, 3),
+             **({"seconds": round(len(event.audio) / pcm_format.sample_rate, 3)} if event.audio is not None else {})}
+            for event in events
+        ]
+        print(json.dumps({"path": path, "events": phrases}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Voice Session Module
+Full-duplex speech-to-speech conversation over a WebSocket
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from src.audio_io import AudioBuffer, PCMFormat, iter_chunks, parse_wav
+from src.batch_scheduler import Priority
+from src.config import AUDIO_STREAM_CHUNK_BYTES, VOICE_MAX_UTTERANCE_SECONDS, VOICE_OUTBOX_SIZE, VOICE_PARTIAL_INTERVAL_MS
+from src.metrics import TIME_TO_FIRST_AUDIO, TURN_SECONDS
+from src.speech_to_text import transcribe_pcm
+from src.text_to_speech import render_voice
+from src.utils import split_sentences
+
+logger = logging.getLogger(__name__)
+
+# (player text, game context) -> NPC reply, streamed in pieces as the LLM generates it
+Responder = Callable[[str, Dict], AsyncIterator[str]]
+
+Outgoing = Union[Dict[str, Any], AudioBuffer]
+
+
+class VoiceSession:
+    """
+    One player's voice conversation, pipelined over a single WebSocket.
+
+    Client -> server:
+        binary frames            mic audio (headerless PCM in `pcm_format`) of the current utterance
+        {"type": "end_utterance"}  the player stopped talking; transcribe and reply
+        {"type": "barge_in"}       stop the NPC's current reply
+        {"type": "context", "context": {...}}  game context sent with later turns
+
+    Server -> client:
+        {"type": "transcript", "text": ..., "final": bool}
+        {"type": "dialogue", "text": ...}   one sentence of the reply, before its audio
+        {"type": "audio", "sample_rate": ..., "sample_width": ..., "channels": ..., "bytes": ...}
+                                 followed by that many bytes of PCM in binary frames
+        {"type": "turn_end"} / {"type": "interrupted"} / {"type": "error", "detail": ...}
+
+    Transcription, reply generation and synthesis of the next sentence run while
+    the previous sentence's audio is still being sent: each sentence of the
+    streamed reply goes to TTS as soon as it is complete. Outgoing messages pass
+    through a bounded outbox, so a slow client stalls the pipeline instead of
+    growing server memory. Audio arriving while the NPC is replying starts a new
+    utterance and interrupts the reply (barge-in).
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        respond: Responder,
+        lang: str = "en",
+        voice: Optional[str] = "female_hero",
+        pcm_format: PCMFormat = PCMFormat(16000),
+        max_utterance_seconds: float = VOICE_MAX_UTTERANCE_SECONDS,
+        partial_interval: float = VOICE_PARTIAL_INTERVAL_MS / 1000,
+        outbox_size: int = VOICE_OUTBOX_SIZE,
+    ):
+        """
+        Initialize the session.
+
+        Args:
+            websocket: Accepted WebSocket connection
+            respond: Streams the NPC reply for a transcript
+            lang: Speech recognition language
+            voice: TTS voice for replies
+            pcm_format: Format of the incoming mic audio
+            max_utterance_seconds: Longest utterance buffered before it is answered anyway
+            partial_interval: Seconds of new audio between partial transcripts
+            outbox_size: Outgoing messages buffered before producers wait for the client
+        """
+        self.websocket = websocket
+        self.respond = respond
+        self.lang = lang
+        self.voice = voice
+        self.pcm_format = pcm_format
+        self.context: Dict = {}
+        self._max_utterance_bytes = int(max_utterance_seconds * pcm_format.sample_rate) * pcm_format.frame_bytes
+        self._partial_bytes = max(1, int(partial_interval * pcm_format.sample_rate)) * pcm_format.frame_bytes
+        self._utterance = bytearray()
+        self._partial_at = 0
+        self._partial_task: Optional[asyncio.Task] = None
+        self._reply_task: Optional[asyncio.Task] = None
+        self._turn = 0  # bumped by barge-in; queued messages from older turns are dropped
+        self._outbox: "asyncio.Queue" = asyncio.Queue(maxsize=outbox_size)
+
+    @property
+    def replying(self) -> bool:
+        return self._reply_task is not None and not self._reply_task.done()
+
+    async def run(self):
+        """Serve the session until the client disconnects."""
+        writer = asyncio.ensure_future(self._write_loop())
+        try:
+            await self._read_loop()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in (self._partial_task, self._reply_task, writer):
+                if task is not None:
+                    task.cancel()
+
+    async def _read_loop(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                await self._on_audio(message["bytes"])
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    await self._send({"type": "error", "detail": "Control messages must be JSON"})
+                    continue
+                await self._on_control(control)
+
+    async def _on_audio(self, chunk: bytes):
+        if not self._utterance and self.replying:
+            # The player started talking over the NPC
+            await self._barge_in()
+        self._utterance += chunk
+
+        if len(self._utterance) >= self._max_utterance_bytes:
+            await self._end_utterance()
+        elif len(self._utterance) - self._partial_at >= self._partial_bytes and not self._partial_running():
+            self._partial_at = len(self._utterance)
+            self._partial_task = asyncio.ensure_future(self._partial_transcript(bytes(self._utterance)))
+
+    async def _on_control(self, control: Dict[str, Any]):
+        kind = control.get("type")
+        if kind == "end_utterance":
+            await self._end_utterance()
+        elif kind == "barge_in":
+            await self._barge_in()
+        elif kind == "context":
+            self.context = control.get("context") or {}
+        else:
+            await self._send({"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    async def _end_utterance(self):
+        if self._partial_running():
+            self._partial_task.cancel()
+        audio = bytes(self._utterance)
+        self._utterance.clear()
+        self._partial_at = 0
+        if not audio:
+            return
+        if self.replying:
+            await self._barge_in()
+        self._reply_task = asyncio.ensure_future(self._reply(audio, self._turn))
+
+    async def _barge_in(self):
+        if not self.replying:
+            return
+        self._reply_task.cancel()
+        self._reply_task = None
+        self._turn += 1
+        await self._send({"type": "interrupted"})
+
+    def _partial_running(self) -> bool:
+        return self._partial_task is not None and not self._partial_task.done()
+
+    async def _partial_transcript(self, audio: bytes):
+        # Partial transcripts wait behind any final transcript a player is waiting for
+        text = await run_in_threadpool(transcribe_pcm, audio, self.pcm_format, self.lang, Priority.AMBIENT)
+        if text:
+            await self._send({"type": "transcript", "text": text, "final": False})
+
+    async def _reply(self, audio: bytes, turn: int):
+        started_at = time.perf_counter()
+        try:
+            text = await run_in_threadpool(transcribe_pcm, audio, self.pcm_format, self.lang)
+            await self._send({"type": "transcript", "text": text, "final": True}, turn)
+            if text:
+                await self._speak(self.respond(text, self.context), turn, started_at)
+                # Only turns that produced a reply are timed, as with Timer
+                TURN_SECONDS.observe(time.perf_counter() - started_at)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Voice turn failed: {e}")
+            await self._send({"type": "error", "detail": "Failed to produce a reply"}, turn)
+        await self._send({"type": "turn_end"}, turn)
+
+    async def _speak(self, pieces: AsyncIterator[str], turn: int, started_at: float):
+        # Holds one rendered sentence, so the LLM and TTS stay at most two sentences ahead of the client
+        sentences: "asyncio.Queue" = asyncio.Queue(maxsize=1)
+        producer = asyncio.ensure_future(self._queue_sentences(pieces, sentences))
+        audio_task = None
+        try:
+            first = True
+            while True:
+                item = await sentences.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                sentence, audio_task = item
+                await self._send({"type": "dialogue", "text": sentence}, turn)
+                audio = await audio_task
+                if first:
+                    TIME_TO_FIRST_AUDIO.observe(time.perf_counter() - started_at)
+                    first = False
+                await self._send_audio(audio, turn)
+        finally:
+            producer.cancel()
+            if audio_task is not None:
+                audio_task.cancel()
+            while not sentences.empty():
+                item = sentences.get_nowait()
+                if isinstance(item, tuple):
+                    item[1].cancel()
+
+    async def _queue_sentences(self, pieces: AsyncIterator[str], sentences: "asyncio.Queue"):
+        """Splits the streamed reply into sentences and starts synthesizing each one as soon as it is complete."""
+        buffer = ""
+        try:
+            async for piece in pieces:
+                complete, buffer = split_sentences(buffer + piece)
+                for sentence in complete:
+                    await self._queue_render(sentences, sentence)
+            tail = buffer.strip()
+            if tail:
+                await self._queue_render(sentences, tail)
+            await sentences.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await sentences.put(e)
+        finally:
+            aclose = getattr(pieces, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def _queue_render(self, sentences: "asyncio.Queue", sentence: str):
+        audio_task = self._render(sentence)
+        try:
+            await sentences.put((sentence, audio_task))
+        except asyncio.CancelledError:
+            audio_task.cancel()
+            raise
+
+    def _render(self, sentence: str) -> asyncio.Future:
+        return asyncio.ensure_future(run_in_threadpool(render_voice, sentence, self.voice))
+
+    async def _send_audio(self, audio: AudioBuffer, turn: int):
+        try:
+            pcm_format, frames = parse_wav(audio)
+        except ValueError as e:
+            logger.error(f"TTS engine did not return PCM audio: {e}")
+            await self._send({"type": "error", "detail": "Speech synthesis failed"}, turn)
+            return
+        await self._send({
+            "type": "audio",
+            "sample_rate": pcm_format.sample_rate,
+            "sample_width": pcm_format.sample_width,
+            "channels": pcm_format.channels,
+            "bytes": len(frames),
+        }, turn)
+        for chunk in iter_chunks(frames, AUDIO_STREAM_CHUNK_BYTES):
+            await self._send(chunk, turn)
+
+    async def _send(self, message: Outgoing, turn: Optional[int] = None):
+        # Waits while the outbox is full: this is where a slow client pushes back
+        await self._outbox.put((turn, message))
+
+    async def _write_loop(self):
+        while True:
+            turn, message = await self._outbox.get()
+            if turn is not None and turn != self._turn:
+                continue  # belongs to a reply that was interrupted
+            try:
+                if isinstance(message, dict):
+                    await self.websocket.send_json(message)
+                else:
+                    await self.websocket.send_bytes(message)
+            except Exception as e:
+                logger.info(f"Voice session closed while sending: {e}")
+                return
@@ -0,0 +1,57 @@
+"""
+Writes the WAV fixtures for tests/test_vad.py
+
+Speech-like phrases (a 140 Hz voice with decaying harmonics and a syllable
+envelope) over low background noise, 16 kHz 16-bit mono. The onset and end of
+each phrase are listed in PHRASES, which the tests check the VAD against.
+
+Run from the repository root after changing them:
+
+    python -m tests.fixtures.make_vad_fixtures
+"""
+
+import os
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FIXTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# file -> (total seconds, [(phrase start, phrase end), ...])
+PHRASES = {
+    "phrase_after_noise.wav": (3.0, [(1.0, 2.0)]),
+    "phrase_at_start.wav": (2.5, [(0.0, 1.0)]),
+    "two_phrases.wav": (4.0, [(0.5, 1.4), (2.4, 3.2)]),
+}
+
+
+def voice(seconds: float, rng: np.random.Generator) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 * (1 + 0.05 * np.sin(2 * np.pi * 0.7 * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    signal = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = 0.6 + 0.4 * np.abs(np.sin(2 * np.pi * 2.5 * t))
+    return 0.15 * signal * syllables + 0.002 * rng.standard_normal(len(t))
+
+
+def render(seconds: float, phrases) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    audio = 0.003 * rng.standard_normal(int(seconds * SAMPLE_RATE))
+    for start, end in phrases:
+        begin = int(start * SAMPLE_RATE)
+        audio[begin:begin + int((end - start) * SAMPLE_RATE)] += voice(end - start, rng)
+    return (np.clip(audio, -1, 1) * 32767).astype("<i2")
+
+
+def main():
+    for name, (seconds, phrases) in PHRASES.items():
+        with wave.open(os.path.join(FIXTURE_DIR, name), "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(render(seconds, phrases).tobytes())
+
+
+if __name__ == "__main__":
+    main()
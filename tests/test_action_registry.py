@@ -0,0 +1,88 @@
+"""
+Tests for action signature parsing and validation
+"""
+
+import pytest
+
+from src.action_registry import IDLE_ACTION, ActionCall, ActionRegistry, get_action_registry, parse_signature
+from src.backend_server import AIResponse
+
+
+def test_parse_signature_fixes_literals_and_types():
+    name, parameters = parse_signature("offer_trade(item_to_give='Sword', quantity=int, price=2.5)")
+
+    assert name == "offer_trade"
+    assert {key: (p.type, p.allowed) for key, p in parameters.items()} == {
+        "item_to_give": (str, frozenset(["Sword"])),
+        "quantity": (int, frozenset()),
+        "price": (float, frozenset([2.5])),
+    }
+    assert parse_signature("  idle ") == ("idle", {})
+
+
+@pytest.mark.parametrize("signature", ["give_item(", "give_item('Sword')", "give_item(item=list)", "a.b(x=1)", "1 + 2"])
+def test_parse_signature_rejects_malformed(signature):
+    with pytest.raises(ValueError):
+        parse_signature(signature)
+
+
+def test_validate_matches_names_case_insensitively_and_checks_parameters():
+    registry = ActionRegistry([
+        "give_item(item_name='Sword')", "give_item(item_name='Shield')", "offer_trade(quantity=int)", "bad(",
+    ])
+
+    valid, rejected = registry.validate([
+        ActionCall(action_type="GIVE_ITEM", parameters={"item_name": "Shield"}),
+        ActionCall(action_type="give_item", parameters={"item_name": "Axe"}),
+        ActionCall(action_type="offer_trade", parameters={"quantity": True}),
+        ActionCall(action_type="offer_trade", parameters={}),
+        ActionCall(action_type="Idle"),
+        ActionCall(action_type="fly"),
+    ])
+
+    # Canonical names come back, and idle is always allowed
+    assert valid == [
+        ActionCall(action_type="give_item", parameters={"item_name": "Shield"}),
+        ActionCall(action_type=IDLE_ACTION),
+    ]
+    assert len(rejected) == 4
+    assert "quantity must be int, got bool" in rejected[1]
+    assert "missing parameter quantity" in rejected[2]
+    assert registry.invalid_signatures == ["bad("]
+    assert "Give_Item" in registry
+
+
+def test_open_signature_widens_a_literal_one():
+    registry = ActionRegistry(["give_item(item_name='Sword')", "give_item(item_name=str)"])
+
+    valid, rejected = registry.validate([ActionCall(action_type="give_item", parameters={"item_name": "Axe"})])
+
+    assert len(valid) == 1 and rejected == []
+
+
+def test_json_schema_has_one_variant_per_action():
+    schema = ActionRegistry(["give_item(item_name='Sword')", "give_item(item_name='Shield')", "wave"]).json_schema()
+
+    variants = {variant["properties"]["action_type"]["const"]: variant for variant in schema["anyOf"]}
+    assert set(variants) == {IDLE_ACTION, "give_item", "wave"}
+    parameters = variants["give_item"]["properties"]["parameters"]
+    assert parameters["properties"] == {"item_name": {"type": "string", "enum": ["Shield", "Sword"]}}
+    assert parameters["required"] == ["item_name"] and parameters["additionalProperties"] is False
+    assert variants["wave"]["properties"]["parameters"]["properties"] == {}
+
+
+def test_registries_are_shared_per_signature_set():
+    assert get_action_registry(["wave", "bow"]) is get_action_registry(["bow", "wave", "bow"])
+
+
+def test_ai_response_mirrors_the_first_action_into_the_legacy_fields():
+    response = AIResponse(dialogue="Here.", emotion="happy", actions=[
+        ActionCall(action_type="give_item", parameters={"item_name": "Sword"}), ActionCall(action_type="wave"),
+    ])
+    assert (response.action, response.action_params) == ("give_item", {"item_name": "Sword"})
+
+    legacy = AIResponse(dialogue="Here.", emotion="happy", action="give_item", action_params={"item_name": "Sword"})
+    assert legacy.actions == [ActionCall(action_type="give_item", parameters={"item_name": "Sword"})]
+
+    idle = AIResponse(dialogue="Hm.", emotion="neutral")
+    assert (idle.action, idle.action_params, idle.actions) == (IDLE_ACTION, {}, [])
@@ -0,0 +1,93 @@
+"""
+Tests for the AI NPC pipeline, with stand-in components
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from src.ai_npc import AINPC
+from src.metrics import TURN_SECONDS
+
+
+class FakeRecognizer:
+    def __init__(self):
+        self.phrase_ended_at = None
+
+    def listen(self):
+        # The phrase ended a while ago; recognition took the rest
+        self.phrase_ended_at = time.perf_counter() - 0.5
+        return "hello"
+
+
+class FakeGenerator:
+    def generate_response(self, user_input):
+        return "Well met."
+
+
+class FakeSynthesizer:
+    is_speaking = False
+
+    def __init__(self):
+        self.playing = []
+
+    def speak_async(self, text, on_start=None):
+        future = Future()
+        self.playing.append(future)
+        return future
+
+
+@pytest.fixture
+def npc(monkeypatch):
+    monkeypatch.setattr(AINPC, "_init_speech_recognizer", lambda self, language: FakeRecognizer())
+    monkeypatch.setattr(AINPC, "_init_text_generator", lambda self, model_tier: FakeGenerator())
+    monkeypatch.setattr(AINPC, "_init_speech_synthesizer", lambda self: FakeSynthesizer())
+    npc = AINPC(stream_responses=False, continuous_listening=True)
+    npc.wait_until_ready(timeout=5)
+    return npc
+
+
+def turns_recorded():
+    child = TURN_SECONDS.labels()
+    return sum(child.counts), child.sum
+
+
+@pytest.mark.parametrize("played", [True, False])
+def test_turn_is_timed_from_phrase_end_to_end_of_playback(npc, played):
+    count, total = turns_recorded()
+
+    assert npc.process_speech_to_response() == "Well met."
+    # Still playing: the turn is not over yet
+    assert turns_recorded()[0] == count
+
+    npc.speech_synthesizer.playing[-1].set_result(played)
+
+    if played:
+        recorded_count, recorded_total = turns_recorded()
+        assert recorded_count == count + 1
+        assert recorded_total - total >= 0.5
+    else:
+        # Interrupted or failed playback is not a completed turn
+        assert turns_recorded()[0] == count
+
+
+def test_wait_until_ready_names_components_still_initializing(monkeypatch):
+    loaded = threading.Event()
+
+    def slow_generator(self, model_tier):
+        loaded.wait(5)
+        return FakeGenerator()
+
+    monkeypatch.setattr(AINPC, "_init_speech_recognizer", lambda self, language: FakeRecognizer())
+    monkeypatch.setattr(AINPC, "_init_text_generator", slow_generator)
+    monkeypatch.setattr(AINPC, "_init_speech_synthesizer", lambda self: FakeSynthesizer())
+    npc = AINPC(stream_responses=False)
+
+    with pytest.raises(TimeoutError, match=r"still initializing: text_generator$"):
+        npc.wait_until_ready(timeout=0.05)
+
+    loaded.set()
+    npc.wait_until_ready(timeout=5)
+    assert isinstance(npc.text_generator, FakeGenerator)
@@ -0,0 +1,61 @@
+"""
+Tests for the /chat reply model, against a fake OpenAI-compatible server
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import ai_response_model
+from src.ai_response_model import FALLBACK_REPLY, stream_reply
+
+
+class FakeCompletions(BaseHTTPRequestHandler):
+    """Streams the server's `tokens` as chat-completion chunks (server-sent events)."""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(request)
+        if self.server.status != 200:
+            self.send_response(self.server.status)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for token in self.server.tokens:
+            chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def api(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCompletions)
+    server.tokens, server.requests, server.status = [], [], 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(ai_response_model, "MOCK_MODE", False)
+    monkeypatch.setattr(ai_response_model, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(ai_response_model, "OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(ai_response_model, "_reply_cache", None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_reply_yields_tokens_as_they_arrive(api):
+    api.tokens = ["Hello", ", traveler", ". Need a sword?"]
+
+    assert list(stream_reply("hello", {"npc_name": "Kaelen"})) == api.tokens
+    assert api.requests[0]["stream"] is True
+
+
+def test_stream_reply_falls_back_when_the_api_fails(api):
+    api.status = 500
+
+    assert list(stream_reply("hello", {})) == [FALLBACK_REPLY]
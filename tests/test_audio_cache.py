@@ -0,0 +1,60 @@
+"""
+Tests for the on-disk audio cache
+"""
+
+import os
+
+from src import audio_cache, speech_synthesizer, text_to_speech
+from src.audio_cache import AudioCache, audio_key, prewarm
+
+
+def test_least_recently_used_files_are_deleted_beyond_max_bytes(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=250)
+    cache.put("aa1", b"a" * 100)
+    cache.put("bb2", b"b" * 100)
+    assert cache.get("aa1") is not None
+    cache.put("cc3", b"c" * 100)
+
+    assert "bb2" not in cache and not os.path.exists(cache.path("bb2"))
+    assert "aa1" in cache and "cc3" in cache
+    assert cache.total_bytes == 200
+    assert cache.stats()["hits"] == 1
+
+
+def test_hits_are_read_only_memory_maps_that_outlive_eviction(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=150)
+    cache.put(audio_key("Hello.", "female_hero"), b"RIFF" + b"\x01" * 96)
+    audio = cache.get(audio_key("Hello.", "female_hero"))
+
+    assert isinstance(audio, memoryview) and audio.readonly
+    assert bytes(audio) == b"RIFF" + b"\x01" * 96
+
+    cache.put(audio_key("Goodbye.", "female_hero"), b"\x02" * 100)
+    assert audio_key("Hello.", "female_hero") not in cache
+    assert bytes(audio[:4]) == b"RIFF"
+    assert cache.get(audio_key("Hello.", None)) is None
+
+
+def test_recency_survives_a_restart(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    for key in ["new", "old", "mid"]:
+        cache.put(key, b"x" * 100)
+    for age, key in [(30, "old"), (20, "mid"), (10, "new")]:
+        modified = os.stat(cache.path(key)).st_mtime - age
+        os.utime(cache.path(key), (modified, modified))
+
+    reopened = AudioCache(str(tmp_path), max_bytes=200)
+
+    assert len(reopened) == 2 and "old" not in reopened
+    assert list(reopened._files) == ["mid", "new"]
+
+
+def test_local_prewarm_is_skipped_without_a_cache(monkeypatch):
+    def no_synthesizer(*args, **kwargs):
+        raise AssertionError("nothing should be rendered")
+
+    monkeypatch.setattr(audio_cache, "TTS_CACHE_ENABLED", False)
+    monkeypatch.setattr(text_to_speech, "tts_cache", None)
+    monkeypatch.setattr(speech_synthesizer, "SpeechSynthesizer", no_synthesizer)
+
+    assert prewarm(["Hello."], ["female_hero"], local=True) == 0
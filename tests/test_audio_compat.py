@@ -0,0 +1,92 @@
+"""
+Tests for the NumPy audioop, checked against the C audioop where it can still be imported
+"""
+
+import random
+
+import pytest
+
+from src import audio_compat
+from src.audio_compat import _import_or_none
+
+c_audioop = _import_or_none("audioop")
+if c_audioop is None or c_audioop.rms is audio_compat.rms:
+    pytest.skip("the C audioop is not available on this Python", allow_module_level=True)
+
+WIDTHS = [1, 2, 3, 4]
+CASES = 100
+
+
+def fragment(rng: random.Random, width: int, frames: int, channels: int = 1) -> bytes:
+    """Random samples, with full-scale extremes mixed in so clipping paths are hit."""
+    low, high = -(1 << (8 * width - 1)), (1 << (8 * width - 1)) - 1
+    samples = [rng.choice((low, high, 0, -1, rng.randint(low, high), rng.randint(low // 256, high // 256)))
+               for _ in range(frames * channels)]
+    return b"".join(sample.to_bytes(width, "little", signed=True) for sample in samples)
+
+
+def same(name: str, *args):
+    expected = getattr(c_audioop, name)(*args)
+    assert getattr(audio_compat, name)(*args) == expected, (name, args)
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+def test_matches_c_audioop(width):
+    rng = random.Random(width)
+    for _ in range(CASES):
+        frames = rng.randint(0, 64)
+        data = fragment(rng, width, frames)
+        other = fragment(rng, width, frames)
+        stereo = fragment(rng, width, frames, channels=2)
+        factor = rng.choice((0.0, 0.5, 1.0, 1.7, -1.3, rng.uniform(-3, 3)))
+
+        for name in ("rms", "max", "avg", "byteswap", "lin2ulaw", "lin2alaw"):
+            same(name, data, width)
+        same("mul", data, width, factor)
+        same("add", data, other, width)
+        same("bias", data, width, rng.randint(-(1 << (8 * width - 1)), (1 << (8 * width - 1)) - 1))
+        same("tomono", stereo, width, factor, rng.uniform(-2, 2))
+        same("tostereo", data, width, factor, rng.uniform(-2, 2))
+        for newwidth in WIDTHS:
+            same("lin2lin", data, width, newwidth)
+
+
+@pytest.mark.parametrize("width", WIDTHS)
+def test_companding_round_trip_matches_c_audioop(width):
+    codes = bytes(range(256))
+
+    same("ulaw2lin", codes, width)
+    same("alaw2lin", codes, width)
+    # Odd lengths and unaligned buffers take the single-byte path for the last code
+    for fragment in (codes[:7], codes[1:], memoryview(codes)[1:130], b""):
+        same("ulaw2lin", fragment, width)
+        same("alaw2lin", fragment, width)
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("width", WIDTHS)
+def test_chained_ratecv_matches_c_audioop(width, channels):
+    rng = random.Random(width * 10 + channels)
+    for inrate, outrate in [(44100, 16000), (8000, 16000), (16000, 16000), (22050, 48000), (48000, 11025)]:
+        weight_a, weight_b = rng.choice([(1, 0), (1, 1), (2, 3)])
+        expected_state = state = None
+        for _ in range(8):
+            data = fragment(rng, width, rng.randint(0, 200), channels)
+            expected, expected_state = c_audioop.ratecv(data, width, channels, inrate, outrate, expected_state,
+                                                        weight_a, weight_b)
+            converted, state = audio_compat.ratecv(data, width, channels, inrate, outrate, state, weight_a, weight_b)
+            assert converted == expected
+            assert state == expected_state
+
+
+@pytest.mark.parametrize("call", [
+    lambda audioop: audioop.rms(b"\x00" * 3, 2),
+    lambda audioop: audioop.rms(b"\x00" * 4, 5),
+    lambda audioop: audioop.add(b"\x00" * 4, b"\x00" * 2, 2),
+    lambda audioop: audioop.ratecv(b"\x00" * 4, 2, 1, 0, 16000, None),
+])
+def test_bad_arguments_raise_like_c_audioop(call):
+    with pytest.raises(c_audioop.error):
+        call(c_audioop)
+    with pytest.raises(audio_compat.error):
+        call(audio_compat)
@@ -0,0 +1,97 @@
+"""
+Tests for the NPC interaction endpoints, with the mock LLM client
+"""
+
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import backend_server
+from src.llm_client import MockLLMClient
+from src.response_cache import ResponseCache
+
+CONTEXT = {
+    "npc_id": "kaelen_the_smith",
+    "player_input": "Can I have that sword?",
+    "environment": {
+        "nearby_objects": [{"name": "Magic_Sword", "description": "A glowing blade."}],
+        "available_actions": ["give_item(item_name=str)", "unlock_door(door_name=str)"],
+    },
+}
+
+
+@pytest.fixture
+def npc(monkeypatch):
+    """A client for the backend whose LLM replies with whatever `npc.replies` yields, one per call."""
+    calls = []
+
+    def responder(prompt: str) -> str:
+        calls.append(prompt)
+        return next(npc.replies)
+
+    monkeypatch.setattr(backend_server, "llm_client", MockLLMClient(responder))
+    monkeypatch.setattr(backend_server, "response_cache", ResponseCache())
+    monkeypatch.setattr(backend_server, "knowledge_base", None)
+    with TestClient(backend_server.app) as client:
+        npc.client, npc.calls = client, calls
+        yield npc
+
+
+def reply(dialogue: str, emotion: str = "proud", actions=()) -> str:
+    return json.dumps({"emotion": emotion, "actions": list(actions), "dialogue": dialogue})
+
+
+def test_reply_that_matches_the_fallback_line_is_kept(npc, monkeypatch):
+    monkeypatch.setattr(backend_server, "NPC_INVALID_OUTPUT_RETRIES", 1)
+    fallback = backend_server.fallback_response()
+    npc.replies = iter([reply(fallback.dialogue, fallback.emotion)] * 2)
+    retries = backend_server.output_stats.retries
+
+    for _ in range(2):
+        assert npc.client.post("/interact", json=CONTEXT).json()["dialogue"] == fallback.dialogue
+
+    # A genuine reply: not retried, and the second request is served from the cache
+    assert len(npc.calls) == 1
+    assert backend_server.output_stats.retries == retries
+
+
+def test_unusable_output_is_retried_then_falls_back_uncached(npc, monkeypatch):
+    monkeypatch.setattr(backend_server, "NPC_INVALID_OUTPUT_RETRIES", 1)
+    npc.replies = iter(["not json"] * 4)
+
+    for _ in range(2):
+        assert npc.client.post("/interact", json=CONTEXT).json() == backend_server.fallback_response().model_dump()
+
+    assert len(npc.calls) == 4
+
+
+def sse_events(text: str):
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_emotion_then_actions_then_dialogue_then_response(npc):
+    action = {"action_type": "give_item", "parameters": {"item_name": "Magic_Sword"}}
+    npc.replies = iter([reply("Take it, traveller. It is yours.", "generous", [action])])
+
+    with npc.client.stream("POST", "/interact/stream", json=CONTEXT) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = sse_events(response.read().decode())
+
+    names = [name for name, _ in events]
+    assert names[:2] == ["emotion", "actions"] and names[-1] == "response"
+    assert set(names[2:-1]) == {"dialogue"} and len(names[2:-1]) > 1
+    assert events[0][1] == {"emotion": "generous"}
+    assert events[1][1]["actions"] == [action]
+    assert "".join(data["text"] for name, data in events if name == "dialogue") == "Take it, traveller. It is yours."
+    final = events[-1][1]
+    assert final["dialogue"] == "Take it, traveller. It is yours." and final["actions"] == [action]
+
+    # Replayed from the cache as one event per field
+    with npc.client.stream("POST", "/interact/stream", json=CONTEXT) as response:
+        assert [name for name, _ in sse_events(response.read().decode())] == ["emotion", "actions", "dialogue", "response"]
+    assert len(npc.calls) == 1
@@ -0,0 +1,126 @@
+"""
+Tests for micro-batching and priority lanes
+"""
+
+import asyncio
+
+from src.batch_scheduler import BatchScheduler, Priority
+
+
+class Backend:
+    """Records what runs and when; each request finishes once `release` is set."""
+
+    def __init__(self):
+        self.started = []
+        self.batches = []
+        self.cancelled = []
+        self.running = 0
+        self.peak = 0
+        self.release = asyncio.Event()
+
+    async def handler(self, item):
+        self.started.append(item)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(item)
+            raise
+        finally:
+            self.running -= 1
+        return item * 10
+
+    async def batch_handler(self, items):
+        self.batches.append(list(items))
+        return [ValueError(item) if item < 0 else item * 10 for item in items]
+
+
+def test_batch_closes_at_max_size_without_waiting_for_the_window():
+    async def run():
+        backend = Backend()
+        scheduler = BatchScheduler(backend.handler, backend.batch_handler, max_batch_size=3, window=60)
+        results = await asyncio.wait_for(asyncio.gather(*(scheduler.submit(i) for i in range(3))), 5)
+        await scheduler.stop()
+        return backend, results, scheduler.stats()
+
+    backend, results, stats = asyncio.run(run())
+
+    assert results == [0, 10, 20]
+    assert backend.batches == [[0, 1, 2]]
+    assert stats["batch_sizes"] == {3: 1}
+
+
+def test_window_closes_a_partial_batch_and_errors_reach_their_caller():
+    async def run():
+        backend = Backend()
+        scheduler = BatchScheduler(backend.handler, backend.batch_handler, max_batch_size=8, window=0.05)
+        results = await asyncio.gather(scheduler.submit(1), scheduler.submit(-1), return_exceptions=True)
+        await scheduler.stop()
+        return backend, results
+
+    backend, results = asyncio.run(run())
+
+    assert backend.batches == [[1, -1]]
+    assert results[0] == 10 and isinstance(results[1], ValueError)
+
+
+def test_dialogue_overtakes_queued_ambient_requests():
+    async def run():
+        backend = Backend()
+        backend.release.set()
+        scheduler = BatchScheduler(backend.handler, max_batch_size=1, window=0, max_in_flight=1)
+        barks = [asyncio.ensure_future(scheduler.submit(i, Priority.AMBIENT)) for i in range(3)]
+        await asyncio.sleep(0)
+        dialogue = asyncio.ensure_future(scheduler.submit(100, Priority.DIALOGUE))
+        await asyncio.gather(*barks, dialogue)
+        await scheduler.stop()
+        return backend.started
+
+    started = asyncio.run(run())
+
+    # The first bark was already dispatched; the dialogue goes before the rest
+    assert started == [0, 100, 1, 2]
+
+
+def test_max_in_flight_caps_concurrency():
+    async def run():
+        backend = Backend()
+        scheduler = BatchScheduler(backend.handler, max_batch_size=8, window=0.01, max_in_flight=2)
+        requests = [asyncio.ensure_future(scheduler.submit(i)) for i in range(5)]
+        await asyncio.sleep(0.1)
+        running = list(backend.started)
+        backend.release.set()
+        results = await asyncio.gather(*requests)
+        await scheduler.stop()
+        return backend, running, results
+
+    backend, running, results = asyncio.run(run())
+
+    assert running == [0, 1]
+    assert backend.peak == 2
+    assert results == [0, 10, 20, 30, 40]
+
+
+def test_cancelled_caller_cancels_its_running_request():
+    async def run():
+        backend = Backend()
+        scheduler = BatchScheduler(backend.handler, max_batch_size=2, window=0.01)
+        kept = asyncio.ensure_future(scheduler.submit(1))
+        abandoned = asyncio.ensure_future(scheduler.submit(2))
+        while len(backend.started) < 2:
+            await asyncio.sleep(0.01)
+        abandoned.cancel()
+        await asyncio.sleep(0.01)
+        backend.release.set()
+        result = await kept
+        await asyncio.sleep(0.01)
+        stats = scheduler.stats()
+        await scheduler.stop()
+        return backend, result, stats
+
+    backend, result, stats = asyncio.run(run())
+
+    assert backend.cancelled == [2]
+    assert result == 10
+    assert stats["in_flight"] == 0
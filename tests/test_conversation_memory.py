@@ -0,0 +1,85 @@
+"""
+Tests for the token-budgeted conversation memory
+"""
+
+import threading
+import time
+
+from src.conversation_memory import ConversationMemory, estimate_tokens
+
+TEN_TOKENS = "x" * 36
+
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition never became true"
+        time.sleep(0.01)
+
+
+class Summarizer:
+    """Joins message contents onto the summary, blocking each call until `release` is set."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, summary, messages):
+        self.calls.append((summary, [message["content"] for message in messages]))
+        assert self.release.wait(5)
+        return " ".join([summary, *(message["content"] for message in messages)])
+
+
+def test_oldest_messages_are_evicted_to_stay_within_budget():
+    assert estimate_tokens(TEN_TOKENS) == 10
+    memory = ConversationMemory(token_budget=25)
+    for i in range(4):
+        memory.append("user", f"{i}{TEN_TOKENS[1:]}")
+
+    assert [message["content"][0] for message in memory.messages()] == ["2", "3"]
+    assert memory.token_count == 20
+
+    # The newest message is kept even when it alone is over budget
+    memory.append("assistant", "y" * 400)
+    assert memory.messages() == [{"role": "assistant", "content": "y" * 400}]
+
+
+def test_evicted_messages_are_merged_into_the_summary_in_the_background():
+    summarizer = Summarizer()
+    memory = ConversationMemory(token_budget=25, summarizer=summarizer)
+    for content in ("a", "b", "c"):
+        memory.append("user", content + TEN_TOKENS[1:])
+    wait_for(lambda: summarizer.calls)
+
+    # Evictions while a summary is being written queue up for the next pass
+    memory.append("user", "d" + TEN_TOKENS[1:])
+    memory.append("user", "e" + TEN_TOKENS[1:])
+    assert len(summarizer.calls) == 1
+    summarizer.release.set()
+    wait_for(lambda: len(summarizer.calls) == 2 and not memory._summarizing)
+
+    first, second = summarizer.calls
+    assert [content[0] for content in first[1]] == ["a"]
+    # The second pass builds on the first summary; the longer summary pushed "d" out as well
+    assert second[0] == first[1][0]
+    assert [content[0] for content in second[1]] == ["b", "c", "d"]
+    summary, latest = memory.messages()
+    assert summary == {"role": "system", "content": f"Summary of the earlier conversation: {memory.summary}"}
+    assert memory.summary == " ".join([*first[1], *second[1]])
+    assert latest["content"][0] == "e"
+
+
+def test_clear_discards_a_summary_still_being_written():
+    summarizer = Summarizer()
+    memory = ConversationMemory(token_budget=15, summarizer=summarizer)
+    memory.append("user", "old" + TEN_TOKENS[3:])
+    memory.append("user", "older" + TEN_TOKENS[5:])
+    wait_for(lambda: summarizer.calls)
+
+    memory.clear()
+    memory.append("user", "fresh")
+    summarizer.release.set()
+    memory._executor.shutdown(wait=True)
+
+    assert memory.summary == ""
+    assert memory.messages() == [{"role": "user", "content": "fresh"}]
@@ -0,0 +1,95 @@
+"""
+Tests for incremental parsing and repair of streamed JSON
+"""
+
+import json
+
+import pytest
+
+from src.json_stream import IncrementalJSONParser, repair_truncated_json
+
+DOCUMENT = json.dumps({
+    "emotion": "happy",
+    "actions": [{"action_type": "give_item", "parameters": {"item_name": "Magic_Sword"}}],
+    "dialogue": 'He said "take it" \\ and left. Café \U0001F5E1 done.',
+    "gold": -12.5e1,
+    "angry": False,
+    "target": None,
+}, ensure_ascii=True)
+
+
+def feed_all(parser: IncrementalJSONParser, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def test_fields_parse_the_same_however_the_text_is_chunked():
+    expected = json.loads(DOCUMENT)
+    for chunks in ([DOCUMENT], list(DOCUMENT), [DOCUMENT[i:i + 7] for i in range(0, len(DOCUMENT), 7)]):
+        parser = IncrementalJSONParser()
+        events = feed_all(parser, chunks)
+
+        assert parser.done
+        assert {event.key: event.value for event in events if not event.partial} == expected
+        assert [event.key for event in events if not event.partial] == list(expected)
+        # The dialogue streams piecewise, and its pieces add up to the final value
+        partial = "".join(event.value for event in events if event.partial and event.key == "dialogue")
+        assert partial == expected["dialogue"]
+
+
+def test_character_by_character_streams_dialogue_before_it_closes():
+    parser = IncrementalJSONParser()
+    events = feed_all(parser, list('{"dialogue": "Hel'))
+
+    assert "".join(event.value for event in events) == "Hel"
+    assert all(event.partial for event in events)
+    assert not parser.done
+
+
+def test_escaped_quotes_do_not_end_the_string():
+    parser = IncrementalJSONParser()
+    events = feed_all(parser, ['{"dialogue": "a \\', '"quoted\\', '" word", "emotion": "sad"}'])
+
+    assert [(event.key, event.value) for event in events if not event.partial] == [
+        ("dialogue", 'a "quoted" word'), ("emotion", "sad"),
+    ]
+
+
+def test_preamble_before_the_object_is_ignored():
+    parser = IncrementalJSONParser()
+    events = parser.feed('Sure! Here is the JSON: {"emotion": "neutral"} trailing')
+
+    assert [(event.key, event.value) for event in events if not event.partial] == [("emotion", "neutral")]
+    assert parser.done
+
+
+def test_malformed_object_raises():
+    with pytest.raises(ValueError):
+        IncrementalJSONParser().feed('{"emotion" "happy"}')
+
+
+def test_truncation_at_every_offset_is_repaired():
+    for end in range(DOCUMENT.index("{") + 1, len(DOCUMENT) + 1):
+        repaired = repair_truncated_json(DOCUMENT[:end])
+
+        assert repaired is not None, DOCUMENT[:end]
+        # Every field that had fully arrived survives the repair unchanged
+        complete = {event.key: event.value for event in IncrementalJSONParser().feed(DOCUMENT[:end]) if not event.partial}
+        fields = json.loads(repaired)
+        assert {key: fields[key] for key in complete} == complete
+
+
+def test_repair_completes_partial_values():
+    assert json.loads(repair_truncated_json('{"emotion": "hap')) == {"emotion": "hap"}
+    assert json.loads(repair_truncated_json('{"angry": fal')) == {"angry": False}
+    assert json.loads(repair_truncated_json('{"gold": 12.')) == {"gold": 12}
+    assert json.loads(repair_truncated_json('{"actions": [{"action": "wave", ')) == {"actions": [{"action": "wave"}]}
+    assert json.loads(repair_truncated_json('{"dial')) == {"dial": None}
+    assert json.loads(repair_truncated_json('{"dialogue": "Caf\\u00')) == {"dialogue": "Caf"}
+
+
+def test_repair_keeps_complete_objects_and_rejects_non_objects():
+    assert repair_truncated_json('noise {"emotion": "sad"} more noise') == '{"emotion": "sad"}'
+    assert repair_truncated_json("no object here") is None
@@ -0,0 +1,52 @@
+"""
+Tests for knowledge retrieval
+"""
+
+import os
+
+from src import knowledge_base as kb
+from src.knowledge_base import KnowledgeBase
+
+PASSAGES = [
+    "The Ancient Door stands at the end of the sunken road below the city.",
+    "The Magic Sword lies sealed in the vault beneath the old forge.",
+    "Kaelen's apprentice left for the coastal cities five winters ago.",
+]
+
+
+def count_digests(monkeypatch):
+    calls = []
+    digest = kb.passages_digest
+    monkeypatch.setattr(kb, "passages_digest", lambda passages: calls.append(1) or digest(passages))
+    return calls
+
+
+def test_retrieve_finds_the_relevant_passage(tmp_path):
+    knowledge = KnowledgeBase(str(tmp_path))
+
+    found = knowledge.retrieve("kaelen", PASSAGES, "Where is the magic sword?", k=1, min_score=0.0, version=1)
+
+    assert found == [PASSAGES[1]]
+    assert os.path.exists(tmp_path / "kaelen.npy")
+
+
+def test_passages_are_hashed_once_per_profile_version(tmp_path, monkeypatch):
+    knowledge = KnowledgeBase(str(tmp_path))
+    knowledge.retrieve("kaelen", PASSAGES, "the door", version=1)
+    digests = count_digests(monkeypatch)
+
+    for _ in range(5):
+        knowledge.retrieve("kaelen", PASSAGES, "the door", version=1)
+    assert digests == []
+
+    # A new version is checked against the passages, and its index rebuilt if they changed
+    assert knowledge.retrieve("kaelen", PASSAGES[:2], "sunken road", k=1, min_score=0.0, version=2) == [PASSAGES[0]]
+    assert len(knowledge.index("kaelen", PASSAGES[:2], version=2).passages) == 2
+
+
+def test_index_built_offline_is_opened_not_rebuilt(tmp_path, monkeypatch):
+    KnowledgeBase(str(tmp_path)).build("kaelen", PASSAGES)
+    knowledge = KnowledgeBase(str(tmp_path))
+    monkeypatch.setattr(knowledge, "build", lambda *args: (_ for _ in ()).throw(AssertionError("rebuilt")))
+
+    assert knowledge.index("kaelen", PASSAGES, version=1).passages == PASSAGES
@@ -0,0 +1,123 @@
+"""
+Tests for the Ollama client's persona prefix reuse
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.llm_client import AsyncLLMClient, LLMRequest, MockLLMClient, OllamaLLMClient
+
+MISTRAL_TEMPLATE = "[INST] {{ if .System }}{{ .System }} {{ end }}{{ .Prompt }} [/INST]"
+
+
+def generate_payloads(model_template: str, raw_template: str = ""):
+    """Sends two keyed completions through a fake Ollama; returns the /api/generate payloads it received."""
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/show":
+            return httpx.Response(200, json={"template": model_template})
+        payload = json.loads(request.content)
+        received.append(payload)
+        if payload["options"] == {"num_predict": 1}:
+            return httpx.Response(200, json={"response": "x", "context": [1, 2, 3, 99], "eval_count": 1})
+        return httpx.Response(200, json={"response": "{}"})
+
+    async def run():
+        client = OllamaLLMClient(raw_template=raw_template)
+        client._client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+        for _ in range(2):
+            await client.complete("Player: hi\n", prefix="You are Kaelen.\n", cache_key="kaelen:v1")
+        await client.aclose()
+
+    asyncio.run(run())
+    return received
+
+
+def test_instruct_model_gets_full_prompt_in_its_own_template():
+    payloads = generate_payloads(MISTRAL_TEMPLATE)
+
+    assert len(payloads) == 2
+    for payload in payloads:
+        assert payload["prompt"] == "You are Kaelen.\nPlayer: hi\n"
+        assert "raw" not in payload and "context" not in payload
+
+
+def test_completion_model_reuses_primed_prefix():
+    prime, *requests = generate_payloads("{{ .Prompt }}")
+
+    assert prime["raw"] and prime["prompt"] == "You are Kaelen.\n"
+    assert len(requests) == 2
+    for payload in requests:
+        assert payload["raw"] and payload["context"] == [1, 2, 3]
+        assert payload["prompt"] == "Player: hi\n"
+
+
+def test_raw_template_wraps_prefix_and_prompt():
+    prime, *requests = generate_payloads(MISTRAL_TEMPLATE, raw_template="[INST] {prompt} [/INST]")
+
+    assert prime["prompt"] == "[INST] You are Kaelen.\n"
+    for payload in requests:
+        assert payload["raw"] and payload["context"] == [1, 2, 3]
+        assert payload["prompt"] == "Player: hi\n [/INST]"
+
+
+def test_raw_template_needs_placeholder():
+    with pytest.raises(ValueError):
+        OllamaLLMClient(raw_template="[INST]")
+
+
+def test_schema_is_sent_as_format():
+    schema = {"type": "object", "properties": {"dialogue": {"type": "string"}}, "required": ["dialogue"]}
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": '{"dialogue": "Hail."}'})
+
+    async def run():
+        client = OllamaLLMClient()
+        client._client = httpx.AsyncClient(base_url="http://ollama", transport=httpx.MockTransport(handler))
+        replies = [await client.complete("Player: hi\n", format=schema), await client.complete("Player: hi\n")]
+        await client.aclose()
+        return replies
+
+    assert asyncio.run(run()) == ['{"dialogue": "Hail."}'] * 2
+    # Without a schema Ollama is still held to well-formed JSON
+    assert [payload["format"] for payload in received] == [schema, "json"]
+
+
+def test_mock_client_streams_and_batches():
+    def responder(prompt: str) -> str:
+        if "fail" in prompt:
+            raise ValueError("no reply")
+        return f'{{"dialogue": "{prompt}"}}'
+
+    async def run():
+        client = MockLLMClient(responder)
+        pieces = [piece async for piece in client.stream("hi", prefix="Kaelen: ")]
+        batch = await client.complete_batch([LLMRequest("one"), LLMRequest("fail"), LLMRequest("two", prefix="> ")])
+        return pieces, batch
+
+    pieces, batch = asyncio.run(run())
+
+    assert "".join(pieces) == '{"dialogue": "Kaelen: hi"}'
+    assert all(len(piece) <= MockLLMClient.STREAM_PIECE_CHARS for piece in pieces)
+    assert batch[0] == '{"dialogue": "one"}' and batch[2] == '{"dialogue": "> two"}'
+    assert isinstance(batch[1], ValueError)
+
+
+def test_default_batch_completes_each_request():
+    class Echo(AsyncLLMClient):
+        async def complete(self, prompt, prefix="", cache_key=None, format=None):
+            if not prompt:
+                raise ValueError("empty prompt")
+            return prefix + prompt
+
+    results = asyncio.run(Echo().complete_batch([LLMRequest("hi", prefix="> "), LLMRequest("")]))
+
+    assert results[0] == "> hi"
+    assert isinstance(results[1], ValueError)
@@ -0,0 +1,44 @@
+"""
+Tests for the Prometheus metrics
+"""
+
+import pytest
+
+from src.metrics import Counter, Histogram
+
+
+def test_timer_records_only_successful_blocks():
+    histogram = Histogram("npc_test_timer_seconds", "Things timed.")
+
+    @histogram.time()
+    def work(fail: bool):
+        if fail:
+            raise ValueError("failed")
+
+    work(False)
+    with pytest.raises(ValueError):
+        work(True)
+    with histogram.time():
+        pass
+    with pytest.raises(ValueError):
+        with histogram.time():
+            raise ValueError("failed")
+
+    assert sum(histogram.labels().counts) == 2
+
+
+def test_render_counter_and_histogram():
+    counter = Counter("npc_test_total", "Things counted.", ["reason"])
+    counter.inc(reason="empty")
+    counter.inc(2, reason="empty")
+    histogram = Histogram("npc_test_seconds", "Things timed.", buckets=(0.1, 1.0))
+    histogram.observe(0.5)
+
+    assert counter.render().splitlines()[-1] == 'npc_test_total{reason="empty"} 3'
+    assert histogram.render().splitlines()[2:] == [
+        'npc_test_seconds_bucket{le="0.1"} 0',
+        'npc_test_seconds_bucket{le="1"} 1',
+        'npc_test_seconds_bucket{le="+Inf"} 1',
+        "npc_test_seconds_sum 0.5",
+        "npc_test_seconds_count 1",
+    ]
@@ -0,0 +1,79 @@
+"""
+Tests for routing across Ollama endpoints and tiers
+"""
+
+import pytest
+
+from src.model_router import DEFAULT_TIER, ModelEndpoint, ModelRouter, parse_endpoints
+
+
+def router(*endpoints, **options) -> ModelRouter:
+    options.setdefault("fallback_tier", "small")
+    return ModelRouter(list(endpoints), health_interval=0, **options)
+
+
+def test_parse_endpoints():
+    endpoints = parse_endpoints(" quest=mistral@http://gpu1:11434/, tinyllama@http://gpu2:11434 ,")
+
+    assert [(e.tier, e.model, e.base_url) for e in endpoints] == [
+        ("quest", "mistral", "http://gpu1:11434"),
+        (DEFAULT_TIER, "tinyllama", "http://gpu2:11434"),
+    ]
+    with pytest.raises(ValueError):
+        parse_endpoints("quest=mistral")
+
+
+def test_least_outstanding_endpoint_is_picked():
+    big = router(ModelEndpoint("big", "mistral", "http://a"), ModelEndpoint("big", "mistral", "http://b"),
+                 fallback_tier=None)
+
+    with big.acquire() as first, big.acquire() as second:
+        assert {first.base_url, second.base_url} == {"http://a", "http://b"}
+        with big.acquire() as third:
+            assert third.endpoint.outstanding == 2
+    assert [e.outstanding for e in big.endpoints] == [0, 0]
+
+
+def test_saturated_tier_fails_over_to_the_fallback():
+    routed = router(ModelEndpoint("big", "mistral", "http://a"), ModelEndpoint("small", "tinyllama", "http://a"),
+                    max_outstanding=1, latency_slo=0)
+
+    with routed.acquire() as first, routed.acquire() as second:
+        assert first.model == "mistral" and not first.failover
+        assert second.model == "tinyllama" and second.failover
+    assert routed.failovers == 1
+
+
+def test_slow_tier_fails_over_while_busy():
+    routed = router(ModelEndpoint("big", "mistral", "http://a"), ModelEndpoint("small", "tinyllama", "http://a"),
+                    latency_slo=1.0)
+    with routed.acquire() as lease:
+        lease.observe_latency(3.0)
+
+    # Slow but idle: still used, so its average can recover
+    with routed.acquire() as idle:
+        assert idle.model == "mistral"
+        with routed.acquire() as busy:
+            assert busy.model == "tinyllama"
+
+
+def test_failed_endpoint_recovers_after_a_successful_request():
+    routed = router(ModelEndpoint("big", "mistral", "http://a"), ModelEndpoint("small", "tinyllama", "http://b"))
+    with routed.acquire() as lease:
+        lease.fail()
+    assert not routed.endpoints[0].healthy
+
+    with routed.acquire() as lease:
+        assert lease.model == "tinyllama"
+    routed.endpoints[1].healthy = False
+    # Nothing healthy: the requested tier is tried again, and answering puts it back in rotation
+    with routed.acquire() as lease:
+        assert lease.model == "mistral"
+    assert routed.endpoints[0].healthy
+
+    # A request that raised does not count as an answer
+    routed.endpoints[0].healthy = False
+    with pytest.raises(RuntimeError):
+        with routed.acquire():
+            raise RuntimeError("request failed")
+    assert not routed.endpoints[0].healthy
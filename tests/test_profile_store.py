@@ -0,0 +1,83 @@
+"""
+Tests for the NPC profile stores
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from src.profile_store import DirectoryProfileStore, SQLiteProfileStore
+
+KAELEN = {"name": "Kaelen", "backstory": "A blacksmith.", "personality_traits": ["gruff"], "core_knowledge": "Swords."}
+
+
+def write_profiles(directory, count: int):
+    for i in range(count):
+        (directory / f"npc{i}.json").write_text(json.dumps({**KAELEN, "name": f"NPC {i}"}))
+
+
+def test_profiles_are_parsed_on_first_use(tmp_path):
+    write_profiles(tmp_path, 3)
+    store = DirectoryProfileStore(str(tmp_path), reload_interval=0)
+
+    assert len(store) == 3 and store.loads == 0
+    profile = store.get("npc1")
+    assert profile.name == "NPC 1"
+    assert store.get("npc1") is profile
+    assert store.get("missing") is None
+    assert store.stats() == {"indexed": 3, "hot": 1, "loads": 1, "reloads": 0}
+
+
+def test_least_recently_used_profile_is_evicted(tmp_path):
+    write_profiles(tmp_path, 3)
+    store = DirectoryProfileStore(str(tmp_path), cache_size=2, reload_interval=0)
+
+    first = store.get("npc0")
+    store.get("npc1")
+    store.get("npc0")
+    store.get("npc2")  # evicts npc1, the least recently used
+
+    assert store.get("npc0") is first
+    assert store.loads == 3
+    store.get("npc1")
+    assert store.loads == 4
+
+
+def test_edit_notifies_listeners_and_rebuilds_prompt_prefix(tmp_path):
+    path = tmp_path / "kaelen.json"
+    path.write_text(json.dumps(KAELEN))
+    store = DirectoryProfileStore(str(tmp_path), reload_interval=0)
+    changed = []
+    store.on_change(changed.append)
+    assert "A blacksmith." in store.get("kaelen").prompt_prefix
+
+    path.write_text(json.dumps({**KAELEN, "backstory": "A retired blacksmith."}))
+    os.utime(path, ns=(0, 0))
+
+    assert store.reload() == ["kaelen"] and changed == ["kaelen"]
+    profile = store.get("kaelen")
+    assert profile.version == 2
+    assert "A retired blacksmith." in profile.prompt_prefix
+
+
+def test_sqlite_store_rescans_only_after_a_write(tmp_path):
+    path = str(tmp_path / "profiles.db")
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE npc_profiles (npc_id TEXT PRIMARY KEY, profile TEXT NOT NULL, updated_at REAL NOT NULL)")
+        db.execute("INSERT INTO npc_profiles VALUES (?, ?, ?)", ("kaelen", json.dumps(KAELEN), time.time()))
+    store = SQLiteProfileStore(path, reload_interval=0)
+    scans = []
+    scan = store._scan
+    store._scan = lambda: scans.append(1) or scan()
+
+    assert store.get("kaelen").backstory == "A blacksmith."
+    store.reload()
+    assert store.reload() == [] and len(scans) == 1  # data_version unchanged: no scan
+
+    with sqlite3.connect(path) as db:
+        db.execute("UPDATE npc_profiles SET profile = ?, updated_at = ? WHERE npc_id = 'kaelen'",
+                   (json.dumps({**KAELEN, "backstory": "A retired blacksmith."}), time.time() + 1))
+    assert store.reload() == ["kaelen"]
+    assert store.get("kaelen").backstory == "A retired blacksmith."
+    store.close()
@@ -0,0 +1,63 @@
+"""
+Tests for the exact and semantic response cache
+"""
+
+from src.response_cache import ResponseCache
+
+ACTIONS = ["give_item(item_name=str)"]
+HISTORY = ["Player: Hello", "Kaelen: Well met."]
+
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = ResponseCache(semantic=False)
+    cache.put("kaelen", "Where can I buy a sword?", "reply", ACTIONS, HISTORY)
+
+    assert cache.get("kaelen", "where can i  buy a SWORD", ACTIONS, HISTORY) == "reply"
+    # The NPC, the action set and the history are all part of the key
+    assert cache.get("mira", "Where can I buy a sword?", ACTIONS, HISTORY) is None
+    assert cache.get("kaelen", "Where can I buy a sword?", [], HISTORY) is None
+    assert cache.get("kaelen", "Where can I buy a sword?", ACTIONS, HISTORY[:1]) is None
+    assert cache.get("kaelen", "Where can I buy a sword please?", ACTIONS, HISTORY) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 4
+
+
+def test_semantic_hit_above_the_threshold_only():
+    cache = ResponseCache(semantic=True, similarity_threshold=0.85)
+    cache.put("kaelen", "Where can I buy a sword?", "reply", ACTIONS, HISTORY)
+
+    assert cache.get("kaelen", "Where can I buy a sword, please?", ACTIONS, HISTORY) == "reply"
+    assert cache.get("kaelen", "Where could I buy swords?", ACTIONS, HISTORY) is None
+    # Paraphrases only match within the same context
+    assert cache.get("kaelen", "Where can I buy a sword, please?", ACTIONS, []) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+    strict = ResponseCache(semantic=True, similarity_threshold=0.95)
+    strict.put("kaelen", "Where can I buy a sword?", "reply", ACTIONS, HISTORY)
+    assert strict.get("kaelen", "Where can I buy a sword, please?", ACTIONS, HISTORY) is None
+
+
+def test_invalidate_npc_drops_only_that_npc():
+    cache = ResponseCache(semantic=True)
+    cache.put("kaelen", "hello", "k1")
+    cache.put("kaelen", "goodbye", "k2")
+    cache.put("mira", "hello", "m1")
+
+    assert cache.invalidate_npc("kaelen") == 2
+    assert cache.invalidate_npc("kaelen") == 0
+    assert len(cache) == 1
+    assert cache.get("kaelen", "hello") is None
+    assert cache.get("kaelen", "hello there") is None  # gone from the semantic tier too
+    assert cache.get("mira", "hello") == "m1"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, semantic=True)
+    cache.put("kaelen", "first question", 1)
+    cache.put("kaelen", "second question", 2)
+    cache.get("kaelen", "first question")
+    cache.put("kaelen", "third question", 3)
+
+    assert len(cache) == 2
+    assert cache.get("kaelen", "second question") is None
+    assert cache.get("kaelen", "first question") == 1
+    assert cache.get("kaelen", "third question") == 3
@@ -0,0 +1,30 @@
+"""
+Tests for the server-side session store
+"""
+
+from src.session_store import SessionStore
+
+
+def test_append_after_close_does_not_count_bytes():
+    store = SessionStore(max_bytes=10_000)
+    session = store.open("kaelen_the_smith", "player-1")
+    store.append(session, "x" * 100)
+    store.close(session.session_id)
+
+    # /interact appends after awaiting the LLM, by which time the session may be gone
+    store.append(session, "y" * 1000)
+
+    assert len(store) == 0
+    assert store._total_bytes == 0
+
+
+def test_byte_cap_evicts_idle_sessions_first():
+    store = SessionStore(max_bytes=250)
+    idle = store.open("kaelen_the_smith", "player-1")
+    store.append(idle, "x" * 100)
+    active = store.open("kaelen_the_smith", "player-2")
+    store.append(active, "y" * 200)
+
+    assert store.get(idle.session_id) is None
+    assert store.get(active.session_id) is active
+    assert store._total_bytes == 200
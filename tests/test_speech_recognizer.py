@@ -0,0 +1,43 @@
+"""
+Tests for continuous capture, played from the WAV fixtures in tests/fixtures
+"""
+
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from src.speech_recognizer import SpeechRecognizer, WavFileSource
+from src.stt_engine import STTBackend
+from tests.fixtures.make_vad_fixtures import FIXTURE_DIR, PHRASES
+
+
+class RecordingBackend(STTBackend):
+    """Transcribes every phrase as its duration, so the test sees what capture handed over."""
+
+    def submit(self, pcm, pcm_format, lang="en", priority=None) -> Future:
+        future = Future()
+        future.set_result(f"{len(pcm) / pcm_format.frame_bytes / pcm_format.sample_rate:.3f}")
+        return future
+
+
+@pytest.mark.parametrize("use_vad", [True, False])
+@pytest.mark.parametrize("name", sorted(PHRASES))
+def test_stream_returns_each_phrase_once(name, use_vad):
+    _, phrases = PHRASES[name]
+    recognizer = SpeechRecognizer(use_vad=use_vad, stt_engine="stub")
+    recognizer.stt = RecordingBackend("recording")
+
+    recognizer.start_stream(lambda: WavFileSource([os.path.join(FIXTURE_DIR, name)]))
+    durations = []
+    while True:
+        text = recognizer.listen()
+        if text is None:
+            break
+        durations.append(float(text))
+    recognizer.stop_stream()
+
+    assert len(durations) == len(phrases)
+    for (start, end), duration in zip(phrases, durations):
+        # Whole phrase, plus at most the pre-roll and the pause that ended it
+        assert end - start <= duration <= end - start + 1.0
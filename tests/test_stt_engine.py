@@ -0,0 +1,115 @@
+"""
+Tests for the STT backends, with the deterministic stub engine
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+import pytest
+
+from src.audio_io import PCMFormat
+from src.batch_scheduler import Priority
+from src.stt_engine import STUB_TRANSCRIPT, InlineBackend, ProcessPoolBackend, STTUnavailable, pcm_to_float
+
+SHM_DIR = "/dev/shm"
+PCM_FORMAT = PCMFormat(16000)
+
+
+def speech(seconds: float = 0.5) -> bytes:
+    t = np.arange(int(seconds * 16000)) / 16000
+    return (np.sin(2 * np.pi * 220 * t) * 8000).astype("<i2").tobytes()
+
+
+def shm_segments():
+    return set(os.listdir(SHM_DIR)) if os.path.isdir(SHM_DIR) else set()
+
+
+def test_pcm_to_float_reads_8_bit_as_unsigned():
+    audio = pcm_to_float(bytes([128, 255, 0]), PCMFormat(8000, 1))
+
+    assert audio[0] == 0.0
+    assert audio[1] == pytest.approx(127 / 128)
+    assert audio[2] == -1.0
+
+
+def test_pcm_to_float_mixes_channels_down():
+    stereo = np.array([1000, 3000, -2000, -4000], dtype="<i2").tobytes()
+
+    assert pcm_to_float(stereo, PCMFormat(16000, 2, 2)).tolist() == [2000 / 32768, -3000 / 32768]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    backend = ProcessPoolBackend("stub", workers=2)
+    assert backend.wait_ready(timeout=60)
+    yield backend
+    backend.close()
+
+
+def test_pool_starts_every_worker(pool):
+    assert len({future.result() for future in pool.ready}) == 2
+    assert pool.stats()["ready"] == 2
+
+
+def test_pool_transcribes_through_shared_memory(pool):
+    before = shm_segments()
+
+    futures = [pool.submit(speech(), PCM_FORMAT) for _ in range(8)]
+
+    assert [future.result(timeout=30) for future in futures] == [STUB_TRANSCRIPT] * 8
+    assert pool.transcribe(b"", PCM_FORMAT) == ""
+    # Every job's segment is unlinked once it is done
+    assert shm_segments() == before
+
+
+def test_pool_serves_dialogue_before_queued_ambient():
+    backend = ProcessPoolBackend("stub", workers=1, latency=0.2)
+    try:
+        assert backend.wait_ready(timeout=60)
+        finished = []
+        jobs = [("first", Priority.AMBIENT), ("ambient-1", Priority.AMBIENT), ("ambient-2", Priority.AMBIENT),
+                ("dialogue", Priority.DIALOGUE)]
+        futures = []
+        for name, priority in jobs:
+            future = backend.submit(speech(0.1), PCM_FORMAT, priority=priority)
+            future.add_done_callback(lambda _, name=name: finished.append(name))
+            futures.append(future)
+        for future in futures:
+            future.result(timeout=30)
+
+        # The first job was already running; the dialogue one overtakes the queued ambient ones
+        assert finished == ["first", "dialogue", "ambient-1", "ambient-2"]
+        assert backend.stats()["max_queue_depth"] == 3
+    finally:
+        backend.close()
+
+
+def test_close_cancels_queued_requests():
+    backend = ProcessPoolBackend("stub", workers=1, latency=0.2)
+    assert backend.wait_ready(timeout=60)
+    running = backend.submit(speech(0.1), PCM_FORMAT)
+    queued = backend.submit(speech(0.1), PCM_FORMAT)
+
+    backend.close()
+
+    assert running.result(timeout=30) == STUB_TRANSCRIPT
+    assert queued.cancelled()
+    with pytest.raises(STTUnavailable):
+        backend.submit(speech(0.1), PCM_FORMAT)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("faster_whisper") is not None, reason="faster-whisper is installed")
+def test_engine_that_cannot_load_is_unavailable():
+    inline = InlineBackend("whisper")
+    assert not inline.wait_ready()
+    with pytest.raises(STTUnavailable):
+        inline.transcribe(speech(), PCM_FORMAT)
+
+    pool = ProcessPoolBackend("whisper", workers=1)
+    try:
+        assert not pool.wait_ready(timeout=60)
+        with pytest.raises(STTUnavailable):
+            pool.transcribe(speech(), PCM_FORMAT)
+    finally:
+        pool.close()
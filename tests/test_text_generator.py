@@ -0,0 +1,117 @@
+"""
+Tests for streamed generation, against a fake Ollama serving NDJSON
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src import model_router
+from src.http_transport import HTTPTransport
+from src.model_router import DEFAULT_TIER, ModelEndpoint, ModelRouter
+from src.text_generator import TextGenerator
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    """Streams the server's `tokens` as /api/chat chunks, splitting each NDJSON line across two HTTP chunks."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"models": [{"name": "test:latest"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        lines = [{"message": {"role": "assistant", "content": token}, "done": False} for token in self.server.tokens]
+        lines.append({"message": {"role": "assistant", "content": ""}, "done": True})
+        for line in lines:
+            data = json.dumps(line).encode() + b"\n"
+            for part in (data[:len(data) // 2], data[len(data) // 2:]):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(part), part))
+                self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllama)
+    server.tokens = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def generator(server) -> TextGenerator:
+    base_url = url(server)
+    router = ModelRouter([ModelEndpoint(DEFAULT_TIER, "test", base_url)], fallback_tier=None, health_interval=0)
+    return TextGenerator(system_prompt="You are Kaelen.", router=router)
+
+
+def test_sentences_split_across_chunks(ollama):
+    ollama.tokens = ["Welc", "ome, trav", "eller! The sword", " costs 3", ".", "5 gold", " coins. Is", " that fair", "?\nIt is", " yours"]
+
+    sentences = list(generator(ollama).generate_response_stream("How much?"))
+
+    assert sentences == ["Welcome, traveller!", "The sword costs 3.5 gold coins.", "Is that fair?", "It is yours"]
+
+
+def test_cancel_stops_stream_mid_reply(ollama):
+    ollama.tokens = ["First sentence. ", "Second sentence. ", "Third sentence."]
+    npc = generator(ollama)
+    cancel = threading.Event()
+
+    sentences = []
+    for sentence in npc.generate_response_stream("Hello", cancel_event=cancel):
+        sentences.append(sentence)
+        cancel.set()
+
+    assert sentences == ["First sentence."]
+    # Only what was generated before the cancel is remembered
+    assert npc.conversation_history[-1] == {"role": "assistant", "content": "First sentence."}
+
+
+@pytest.fixture
+def pinned_routers():
+    """Stops and forgets the process-wide pinned routers a test created."""
+    before = dict(model_router._pinned_routers)
+    yield
+    for key in set(model_router._pinned_routers) - set(before):
+        model_router._pinned_routers.pop(key).stop()
+
+
+def test_pinned_generators_share_one_router(ollama, pinned_routers):
+    def health_threads():
+        return sum(thread.name == "ollama-health" for thread in threading.enumerate())
+
+    ollama.tokens = ["Hello there."]
+    before = health_threads()
+    npcs = [TextGenerator(model="test", base_url=url(ollama)) for _ in range(3)]
+
+    assert len({id(npc.router) for npc in npcs}) == 1
+    assert health_threads() == before + 1
+    assert list(npcs[2].generate_response_stream("Hi")) == ["Hello there."]
+
+    # Health checks go through the generator's own transport
+    transport = HTTPTransport()
+    own = TextGenerator(model="test", base_url=url(ollama), transport=transport)
+    assert own.router is not npcs[0].router and own.router.transport is transport
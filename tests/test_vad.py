@@ -0,0 +1,49 @@
+"""
+Tests for the VAD endpointer, against the WAV fixtures in tests/fixtures
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from src.audio_io import iter_chunks, parse_wav
+from src.vad import PHRASE_END, SPEECH_START, Endpointer, to_pcm16
+from tests.fixtures.make_vad_fixtures import FIXTURE_DIR, PHRASES
+
+START_MS = 60
+HANGOVER_MS = 180
+
+
+def detect(name: str, chunk_ms: int):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        pcm_format, data = parse_wav(f.read())
+    endpointer = Endpointer(pcm_format.sample_rate, start_ms=START_MS, hangover_ms=HANGOVER_MS)
+    chunk_bytes = pcm_format.sample_rate * chunk_ms // 1000 * pcm_format.frame_bytes
+    events = []
+    for chunk in iter_chunks(data, chunk_bytes):
+        events.extend(endpointer.process(to_pcm16(bytes(chunk), pcm_format.sample_width)))
+    return events + endpointer.flush()
+
+
+@pytest.mark.parametrize("chunk_ms", [20, 64, 1000])
+@pytest.mark.parametrize("name", sorted(PHRASES))
+def test_phrase_start_and_end_times(name, chunk_ms):
+    _, phrases = PHRASES[name]
+    events = detect(name, chunk_ms)
+
+    assert [event.kind for event in events] == [SPEECH_START, PHRASE_END] * len(phrases)
+    for (start, end), (started, ended) in zip(phrases, zip(events[::2], events[1::2])):
+        # Start once START_MS of speech was heard; end once HANGOVER_MS of quiet followed it
+        assert start + START_MS / 1000 - 1e-6 <= started.at <= start + START_MS / 1000 + 0.04
+        assert end + HANGOVER_MS / 1000 - 1e-6 <= ended.at <= end + HANGOVER_MS / 1000 + 0.06
+        # The phrase keeps the pre-roll, so it is never clipped at the start
+        assert len(ended.audio) / 16000 >= end - start
+
+
+def test_noise_alone_is_not_speech():
+    rng = np.random.default_rng(1)
+    noise = (rng.standard_normal(16000 * 3) * 3000).astype(np.int16)
+    endpointer = Endpointer(16000)
+
+    assert endpointer.process(noise) + endpointer.flush() == []
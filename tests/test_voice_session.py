@@ -0,0 +1,173 @@
+"""
+Tests for the full-duplex voice session, over a TestClient WebSocket
+"""
+
+import asyncio
+import io
+import json
+import wave
+
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from src import voice_session
+from src.voice_session import VoiceSession
+
+TRANSCRIPT = "hello there"
+UTTERANCE = b"\x00\x01" * 1600
+
+
+def wav(text: str) -> bytes:
+    """Stands in for TTS: one frame of 8 kHz 8-bit audio per character of the sentence."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(1)
+        f.setframerate(8000)
+        f.writeframes(b"\x80" * len(text))
+    return out.getvalue()
+
+
+def client(monkeypatch, respond, rendered=None) -> TestClient:
+    def render_voice(sentence, voice=None):
+        if rendered is not None:
+            rendered.append(sentence)
+        return wav(sentence)
+
+    monkeypatch.setattr(voice_session, "transcribe_pcm", lambda audio, pcm_format, lang, priority=None: TRANSCRIPT)
+    monkeypatch.setattr(voice_session, "render_voice", render_voice)
+    app = FastAPI()
+
+    @app.websocket("/voice")
+    async def voice(websocket: WebSocket):
+        await websocket.accept()
+        await VoiceSession(websocket, respond).run()
+
+    return TestClient(app)
+
+
+def receive(ws):
+    message = ws.receive()
+    if message.get("bytes") is not None:
+        return bytes(message["bytes"])
+    return json.loads(message["text"])
+
+
+def receive_turn(ws):
+    """Messages up to and including the next turn_end, with each sentence's audio frames joined."""
+    messages = []
+    while True:
+        message = receive(ws)
+        if isinstance(message, bytes):
+            messages[-1]["audio"] += message
+            continue
+        if message["type"] == "audio":
+            message["audio"] = b""
+        messages.append(message)
+        if message["type"] == "turn_end":
+            return messages
+
+
+def speak(ws):
+    ws.send_bytes(UTTERANCE)
+    ws.send_json({"type": "end_utterance"})
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition never became true")
+
+
+def test_reply_is_spoken_sentence_by_sentence_while_it_streams(monkeypatch):
+    rendered = []
+
+    async def respond(text, context):
+        assert text == TRANSCRIPT
+        yield "Welcome, trav"
+        yield "eller. The forge"
+        # Only continues once the first sentence is being synthesized, so the LLM overlaps TTS
+        await wait_for(lambda: rendered)
+        yield " is hot."
+
+    with client(monkeypatch, respond, rendered).websocket_connect("/voice") as ws:
+        speak(ws)
+        messages = receive_turn(ws)
+
+    assert [message["type"] for message in messages] == [
+        "transcript", "dialogue", "audio", "dialogue", "audio", "turn_end",
+    ]
+    assert messages[0] == {"type": "transcript", "text": TRANSCRIPT, "final": True}
+    assert [message["text"] for message in messages if message["type"] == "dialogue"] == [
+        "Welcome, traveller.", "The forge is hot.",
+    ]
+    for dialogue, audio in zip(messages[1::2], messages[2::2]):
+        assert audio["bytes"] == len(audio["audio"]) == len(dialogue["text"])
+
+
+def test_barge_in_stops_the_reply(monkeypatch):
+    turns, finished, closed = [], [], []
+
+    async def respond(text, context):
+        turns.append(text)
+        turn = len(turns)
+        try:
+            yield "Let me tell you a story. "
+            if turn == 1:
+                await asyncio.sleep(60)
+            yield "The end."
+            finished.append(turn)
+        finally:
+            closed.append(turn)
+
+    with client(monkeypatch, respond).websocket_connect("/voice") as ws:
+        speak(ws)
+        assert [receive(ws)["type"] for _ in range(3)] == ["transcript", "dialogue", "audio"]
+        receive(ws)  # the audio frames
+        ws.send_json({"type": "barge_in"})
+        assert receive(ws) == {"type": "interrupted"}
+
+        speak(ws)
+        messages = receive_turn(ws)
+
+    # The interrupted reply stopped generating; nothing more of it was sent
+    assert finished == [2] and sorted(closed) == [1, 2]
+    # The next turn is answered in full
+    assert [message["type"] for message in messages] == [
+        "transcript", "dialogue", "audio", "dialogue", "audio", "turn_end",
+    ]
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def send_bytes(self, message):
+        self.sent.append(message)
+
+
+def test_messages_queued_for_an_interrupted_turn_are_dropped():
+    async def respond(text, context):
+        yield "unused"
+
+    async def run():
+        websocket = RecordingWebSocket()
+        session = VoiceSession(websocket, respond)
+        session._reply_task = asyncio.ensure_future(asyncio.sleep(60))
+        await session._send({"type": "dialogue", "text": "Old news."}, 0)
+        await session._send(b"old audio", 0)
+        await session._barge_in()
+        await session._send({"type": "dialogue", "text": "Fresh news."}, 1)
+
+        writer = asyncio.ensure_future(session._write_loop())
+        await wait_for(session._outbox.empty)
+        await asyncio.sleep(0)
+        writer.cancel()
+        return websocket.sent
+
+    assert asyncio.run(run()) == [{"type": "interrupted"}, {"type": "dialogue", "text": "Fresh news."}]